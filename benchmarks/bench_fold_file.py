@@ -0,0 +1,38 @@
+'''
+Reading of FOLD files with polygonal faces. A quad grid crease pattern
+is written with increasing size and read back into the triangulated
+mesh with its boundary lines.
+
+Run as ``python benchmarks/bench_fold_file.py``.
+'''
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bmcs_shell.folding.geometry.fold_file import read_fold_file
+
+
+def write_quad_grid(path, n):
+    x, y = np.meshgrid(np.arange(n + 1, dtype=np.float_), np.arange(n + 1, dtype=np.float_))
+    I_xy = np.arange((n + 1) ** 2).reshape(n + 1, n + 1)
+    I_Fi = np.stack([I_xy[:-1, :-1], I_xy[:-1, 1:], I_xy[1:, 1:], I_xy[1:, :-1]], axis=-1)
+    with open(path, 'w') as f:
+        json.dump({'vertices_coords': np.column_stack([x.ravel(), y.ravel()]).tolist(),
+                   'faces_vertices': I_Fi.reshape(-1, 4).tolist()}, f)
+
+
+if __name__ == '__main__':
+    print(f'{"vertices":>9s} {"triangles":>10s} {"MB":>6s} {"read [ms]":>10s}')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'grid.fold')
+        for n in [40, 100, 200, 400]:
+            write_quad_grid(path, n)
+            t = time.perf_counter()
+            fold_pattern = read_fold_file(path)
+            t_read = time.perf_counter() - t
+            assert len(fold_pattern.I_B_Li) == 4 * n
+            print(f'{len(fold_pattern.X_Ia):9d} {len(fold_pattern.I_Fi):10d} '
+                  f'{os.path.getsize(path) / 1e6:6.1f} {t_read * 1e3:10.1f}')
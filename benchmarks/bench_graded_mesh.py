@@ -0,0 +1,29 @@
+'''
+Graded refinement of WBTessellation4P towards the crease lines compared
+with the uniform refinement to the same element size at the creases.
+
+Run as ``python benchmarks/bench_graded_mesh.py``.
+'''
+import time
+
+import numpy as np
+
+from bmcs_shell.folding.analysis.fem.graded_mesh import get_graded_mesh, get_uniform_n_elems
+from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p import WBTessellation4P
+
+
+if __name__ == '__main__':
+    print(f'{"cells":>6s} {"h_min":>6s} {"graded":>9s} {"uniform":>9s} {"ratio":>6s} {"time [ms]":>10s}')
+    for n_plus in [2, 4, 8]:
+        wbt = WBTessellation4P(n_phi_plus=n_plus, n_x_plus=n_plus)
+        X_Ia, I_Fi = wbt.X_Ia, wbt.I_Fi
+        X_Lia = X_Ia[np.vstack([wbt.I_V_Li, wbt.I_M_Li])]
+        h_max = np.linalg.norm(X_Ia[1] - X_Ia[0]) / 3
+        for refinement in [4, 8, 16]:
+            h_min = h_max / refinement
+            t = time.perf_counter()
+            _, I_Fi_graded = get_graded_mesh(X_Ia, I_Fi, X_Lia, h_min, h_max, grading=0.5)
+            t_graded = time.perf_counter() - t
+            n_uniform = get_uniform_n_elems(X_Ia, I_Fi, h_min)
+            print(f'{wbt.n_cells:6d} {h_min:6.1f} {len(I_Fi_graded):9d} {n_uniform:9d} '
+                  f'{len(I_Fi_graded) / n_uniform:6.2f} {t_graded * 1e3:10.1f}')
@@ -0,0 +1,98 @@
+'''
+Matrix-free conjugate gradient solution of the membrane stiffness system
+of subdivided WBTessellation4P meshes compared with the solution with the
+assembled sparse matrix.
+
+The stiffness is applied as the assembled CSR matrix ('sparse'), element
+by element with the cached element matrices ('matrix') and element by
+element with the products B^T D B of the strain operator ('product'). The
+table lists the memory of the operator, the time of one product K @ U and
+the number of iterations and the time of the conjugate gradient solution
+with the Jacobi and the block Jacobi (nodal 3 x 3 blocks) preconditioner.
+The meshes are supported at all nodes of their boundary, which removes
+the folding mechanism of the membrane model, so that the systems are
+regular. The springs of the flat nodes are kept as a sparse matrix in all
+variants. A solution which does not converge raises a RuntimeError.
+
+Run as ``python benchmarks/bench_matrix_free.py``.
+'''
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator, aslinearoperator, cg
+
+from bmcs_shell.folding.analysis.fem.matrix_free import (ElementMatrixOperator, ElementProductOperator,
+                                                         get_block_jacobi, get_nodal_blocks)
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.wb_shell_adaptive_analysis import WBShellAdaptiveAnalysis
+from bmcs_shell.folding.analysis.wb_shell_analysis import WBShellAnalysis
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+
+def get_free_operator(K, free):
+    '''Operator K restricted to the free dofs'''
+    def dot(U_f):
+        U = np.zeros(K.shape[0])
+        U[free] = np.ravel(U_f)
+        return (K @ U)[free]
+
+    n_f = int(np.sum(free))
+    return LinearOperator(shape=(n_f, n_f), matvec=dot, rmatvec=dot, dtype=np.float_)
+
+
+if __name__ == '__main__':
+    print(f'{"cells":>6s} {"n":>3s} {"dofs":>8s} {"operator":>9s} {"mem [MB]":>9s} {"K @ U [ms]":>11s} '
+          f'{"precond.":>9s} {"iter":>6s} {"time [ms]":>10s}')
+    for n_plus, n in [(2, 4), (4, 4), (4, 8)]:
+        analysis = WBShellAnalysis()
+        analysis.geo.trait_set(n_phi_plus=n_plus, n_x_plus=n_plus)
+        geo = analysis.geo
+        ada = WBShellAdaptiveAnalysis(analysis=analysis)
+        xdomain = ada.get_xdomain(*get_subdivision_mesh(geo.X_Ia, geo.I_Fi, n))
+        n_dofs = xdomain.n_dofs
+        K_el = ada.get_element_K(xdomain)
+        k_n = np.mean(K_el.diagonal())
+        K_s = ada.get_spring_K(xdomain, k_n).tocsr()
+        K_Eff = xdomain.map_field_to_K(ada.D_st[np.newaxis, ...]).mtx_arr
+        B_Empf, w_Em, o_Ef = xdomain.strain_operator
+        K_sparse = (K_el + K_s).tocsr()
+        operators = [
+            ('sparse', K_sparse, K_sparse.data.nbytes + K_sparse.indices.nbytes + K_sparse.indptr.nbytes),
+            ('matrix', ElementMatrixOperator(K_Eff, o_Ef, n_dofs), K_Eff.nbytes + o_Ef.nbytes),
+            ('product', ElementProductOperator(B_Empf, w_Em, ada.D_st, o_Ef, n_dofs),
+             B_Empf.nbytes + w_Em.nbytes + o_Ef.nbytes),
+        ]
+        # supports at the boundary nodes, unit vertical load at all nodes
+        I_Ei, E_Fi = get_facet_edges(xdomain.I_Ei)
+        I_boundary = np.unique(I_Ei[np.bincount(E_Fi.ravel()) == 1])
+        fixed_dofs = (I_boundary[:, np.newaxis] * 3 + np.arange(3)).ravel()
+        free = np.ones(n_dofs, dtype=np.bool_)
+        free[fixed_dofs] = False
+        F = np.zeros(n_dofs)
+        F[2::3] = -1
+        K_Iab = get_nodal_blocks(K_sparse, 3)
+        d_f = np.einsum('Iaa->Ia', K_Iab).ravel()[free]
+        preconditioners = [('jacobi', sp.diags(1 / d_f)), ('block', get_block_jacobi(K_Iab, free))]
+        U = np.random.default_rng(0).random(n_dofs)
+        for name, K, n_bytes in operators:
+            if name != 'sparse':
+                K = K + aslinearoperator(K_s)
+            t = time.perf_counter()
+            for _ in range(10):
+                K @ U
+            t_dot = (time.perf_counter() - t) / 10
+            K_ff = K_sparse[free][:, free] if name == 'sparse' else get_free_operator(K, free)
+            for precond, M in preconditioners:
+                n_iter = [0]
+
+                def count(_):
+                    n_iter[0] += 1
+
+                t = time.perf_counter()
+                _, info = cg(K_ff, F[free], rtol=1e-8, maxiter=10 * n_dofs, M=M, callback=count)
+                t = time.perf_counter() - t
+                if info != 0:
+                    raise RuntimeError('conjugate gradient solver did not converge in %d iterations' % info)
+                print(f'{geo.n_cells:6d} {n:3d} {n_dofs:8d} {name:>9s} {n_bytes / 1e6:9.2f} {t_dot * 1e3:11.2f} '
+                      f'{precond:>9s} {n_iter[0]:6d} {t * 1e3:10.1f}')
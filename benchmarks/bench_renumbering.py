@@ -0,0 +1,60 @@
+'''
+Sparse factorization of the shell stiffness matrix with the nodes of the
+mesh in the order of the tessellation and renumbered by the reverse
+Cuthill-McKee ordering (WBShellFETriangularMesh.renumber_nodes).
+
+The membrane stiffness matrices of uniformly subdivided WBTessellation4P
+meshes are factorized by SuperLU without a column permutation (NATURAL),
+where the fill-in is given by the node numbering alone, and with the
+default fill reducing COLAMD permutation of spsolve. The meshes are
+supported at all nodes of their boundary, which removes the folding
+mechanism of the membrane model, and the regular matrices of the free
+dofs are factorized. The table lists the bandwidth of the node numbering,
+the number of the free dofs, the factorization time and the number of the
+nonzeros of the factors L + U with their memory (values and row indices).
+
+Run as ``python benchmarks/bench_renumbering.py``.
+'''
+import time
+
+import numpy as np
+from scipy.sparse.linalg import splu
+
+from bmcs_shell.folding.analysis.fem.node_renumbering import get_bandwidth, get_rcm_order, renumber_mesh
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.wb_shell_linear_analysis import WBShellLinearAnalysis
+from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p import WBTessellation4P
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+
+def factorize(K, permc_spec):
+    t = time.perf_counter()
+    lu = splu(K, permc_spec=permc_spec)
+    t = time.perf_counter() - t
+    nnz = lu.L.nnz + lu.U.nnz
+    return t, nnz, nnz * (8 + 4) / 1e6
+
+
+if __name__ == '__main__':
+    linear = WBShellLinearAnalysis()
+    print(f'{"cells":>6s} {"n":>3s} {"dofs":>7s} {"order":>9s} {"band":>6s} {"permc":>8s} '
+          f'{"factor [ms]":>12s} {"nnz(L+U)":>10s} {"mem [MB]":>9s}')
+    # the natural order of the largest original mesh takes minutes and gigabytes
+    for n_plus, levels in [(2, [2, 4, 8]), (4, [2, 4])]:
+        wbt = WBTessellation4P(n_phi_plus=n_plus, n_x_plus=n_plus)
+        for n in levels:
+            X_Id, I_Fi = get_subdivision_mesh(wbt.X_Ia, wbt.I_Fi, n)
+            meshes = [('original', X_Id, I_Fi),
+                      ('RCM', *renumber_mesh(X_Id, I_Fi, get_rcm_order(I_Fi, len(X_Id)))[:2])]
+            for order, X, I in meshes:
+                K = linear.get_K(linear.get_xdomain(X, I))
+                # supports at the boundary nodes
+                I_Ei, E_Fi = get_facet_edges(I)
+                I_boundary = np.unique(I_Ei[np.bincount(E_Fi.ravel()) == 1])
+                free = np.ones(K.shape[0], dtype=np.bool_)
+                free[I_boundary[:, np.newaxis] * 3 + np.arange(3)] = False
+                K = K[free][:, free].tocsc()
+                for permc_spec in ['NATURAL', 'COLAMD']:
+                    t, nnz, mem = factorize(K, permc_spec)
+                    print(f'{wbt.n_cells:6d} {n:3d} {K.shape[0]:7d} {order:>9s} {get_bandwidth(I):6d} '
+                          f'{permc_spec:>8s} {t * 1e3:12.1f} {nnz:10d} {mem:9.1f}')
@@ -0,0 +1,39 @@
+'''
+Rigid folding of WBTessellation4P crease patterns by the sparse
+kinematic solver driven by the fold angles of the analytic tessellation.
+Reports the number of creases, the time per step of the folding path and
+the deviation of the nodal distances from the analytic configurations.
+
+Run as ``python benchmarks/bench_rigid_folding.py``.
+'''
+import time
+
+import numpy as np
+
+from bmcs_shell.folding.geometry.rigid_folding import RigidFoldingSolver, get_fold_angles
+from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p import WBTessellation4P
+
+
+def get_distance_error(X_Ia, X_ref_Ia, I_Fi):
+    '''Maximum deviation of the distances of the facet nodes to the first node
+    (independent of the rigid body motion)'''
+    I_i = np.unique(I_Fi)
+    d_I = np.linalg.norm(X_Ia[I_i] - X_Ia[I_i[0]], axis=-1)
+    d_ref_I = np.linalg.norm(X_ref_Ia[I_i] - X_ref_Ia[I_i[0]], axis=-1)
+    return np.max(np.abs(d_I - d_ref_I))
+
+
+if __name__ == '__main__':
+    gamma_t = np.linspace(1.2, 0.6, 13)
+    print(f'{"creases":>8s} {"nodes":>8s} {"ms/step":>9s} {"residuum":>9s} {"dist. err":>9s}')
+    for n_plus in [2, 4, 8, 16]:
+        wbt = WBTessellation4P(n_phi_plus=n_plus, n_x_plus=n_plus)
+        I_Fi, I_Li = wbt.I_Fi, np.vstack([wbt.I_V_Li, wbt.I_M_Li])
+        X_tIa_ref = np.array([wbt.get_X_Ia(gamma) for gamma in gamma_t])
+        solver = RigidFoldingSolver(X_tIa_ref[0], I_Fi, I_Li)
+        rho_tH = np.array([get_fold_angles(X_Ia, solver.I_Hi) for X_Ia in X_tIa_ref[1:]])
+        t = time.perf_counter()
+        X_tIa, norm_g_t = solver.fold(rho_tH)
+        t = (time.perf_counter() - t) / len(rho_tH)
+        err = max(get_distance_error(X_Ia, X_Ia_ref, I_Fi) for X_Ia, X_Ia_ref in zip(X_tIa, X_tIa_ref[1:]))
+        print(f'{len(solver.I_Hi):8d} {len(X_tIa_ref[0]):8d} {t * 1e3:9.2f} {np.max(norm_g_t):9.2e} {err:9.2e}')
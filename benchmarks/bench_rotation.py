@@ -0,0 +1,106 @@
+'''
+Benchmark of the batched float64 rotation helpers in
+``bmcs_shell.folding.utils.rotation`` against the float32 quaternion
+helpers previously duplicated in ``wb_cell_4p.py`` and
+``wb_cell_5p_xur.py`` (reproduced below as the reference).
+
+Run as ``python benchmarks/bench_rotation.py``.
+'''
+import timeit
+
+import numpy as np
+
+from bmcs_shell.folding.utils.rotation import \
+    axis_angle_to_q, qv_mult, rotate_points
+
+
+# --- previous float32 implementation (reference only) ---
+
+def q_normalize_f32(q, axis=1):
+    sq = np.sqrt(np.sum(q * q, axis=axis))
+    sq[np.where(sq == 0)] = 1.e-19
+    return q / sq[:, np.newaxis]
+
+
+def v_normalize_f32(q, axis=1):
+    sq = np.einsum('...a,...a->...', q, q)
+    sq[np.where(sq == 0)] = 1.e-19
+    return q / sq[..., np.newaxis]
+
+
+def q_mult_f32(q1, q2):
+    w1, x1, y1, z1 = q1
+    w2, x2, y2, z2 = q2
+    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+    y = w1 * y2 + y1 * w2 + z1 * x2 - x1 * z2
+    z = w1 * z2 + z1 * w2 + x1 * y2 - y1 * x2
+    return np.array([w, x, y, z], dtype='f')
+
+
+def q_conjugate_f32(q):
+    qn = q_normalize_f32(q.T).T
+    w, x, y, z = qn
+    return np.array([w, -x, -y, -z], dtype='f')
+
+
+def qv_mult_f32(q1, u):
+    zero_re = np.zeros((u.shape[0], u.shape[1]), dtype='f')
+    q2 = np.concatenate([zero_re[:, :, np.newaxis], u], axis=2)
+    q2 = np.rollaxis(q2, 2)
+    q12 = q_mult_f32(q1[:, :, np.newaxis], q2[:, :, :])
+    q_con = q_conjugate_f32(q1)
+    q = q_mult_f32(q12, q_con[:, :, np.newaxis])
+    q = np.rollaxis(np.rollaxis(q, 2), 2)
+    return q[:, :, 1:]
+
+
+def axis_angle_to_q_f32(v, theta):
+    v_ = v_normalize_f32(v, axis=1)
+    x, y, z = v_.T
+    theta = theta / 2
+    w = np.cos(theta)
+    x = x * np.sin(theta)
+    y = y * np.sin(theta)
+    z = z * np.sin(theta)
+    return np.array([w, x, y, z], dtype='f')
+
+
+def rotate_exact(X_pa, theta):
+    '''Rotation around the x axis evaluated directly as reference.'''
+    c, s = np.cos(theta)[:, np.newaxis], np.sin(theta)[:, np.newaxis]
+    x, y, z = X_pa.T
+    return np.stack([np.broadcast_to(x, (len(theta), len(x))),
+                     c * y - s * z, s * y + c * z], axis=-1)
+
+
+def run(n_c, n_p, number=20):
+    '''Rotate ``n_p`` points around the x axis by ``n_c`` angles.
+    '''
+    rng = np.random.default_rng(0)
+    X_pa = rng.uniform(-1000, 1000, (n_p, 3)) + np.array([0, 0, 5000])
+    theta = rng.uniform(-np.pi, np.pi, n_c)
+    axes = np.array([[1, 0, 0]], dtype=np.float_)
+    X_ref = rotate_exact(X_pa, theta)
+
+    def old():
+        return qv_mult_f32(axis_angle_to_q_f32(axes, theta), X_pa[np.newaxis])
+
+    def new_q():
+        return qv_mult(axis_angle_to_q(axes, theta), X_pa[np.newaxis])
+
+    def new_R():
+        return rotate_points(X_pa, axes, theta)
+
+    print(f'n_c = {n_c:6d}, n_p = {n_p:5d}')
+    for name, fn in [('float32 quaternion (old)', old),
+                     ('float64 quaternion', new_q),
+                     ('float64 matrix', new_R)]:
+        t = timeit.timeit(fn, number=number) / number
+        err = np.max(np.abs(fn() - X_ref))
+        print(f'  {name:26s} {t * 1e3:9.3f} ms   max. error {err:.2e}')
+
+
+if __name__ == '__main__':
+    for n_c, n_p in [(11, 7), (101, 7), (1001, 7), (100, 1000), (10000, 100)]:
+        run(n_c, n_p)
@@ -0,0 +1,42 @@
+'''
+Self-intersection check of the folding path of WBTessellation4P.
+Compares the time per fold angle of the refitted bounding volume
+hierarchy with the check of all facet pairs not sharing an edge.
+
+Run as ``python benchmarks/bench_self_intersection.py``.
+'''
+import time
+
+import numpy as np
+
+from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p import WBTessellation4P
+from bmcs_shell.folding.utils.self_intersection import FacetBVH, get_triangles_intersect
+
+
+def get_all_intersecting_pairs(X_Ia, I_Fi):
+    F_1m, F_2m = np.triu_indices(len(I_Fi), 1)
+    adjacent_m = np.sum(I_Fi[F_1m][:, :, np.newaxis] == I_Fi[F_2m][:, np.newaxis, :], axis=(1, 2)) > 1
+    F_1m, F_2m = F_1m[~adjacent_m], F_2m[~adjacent_m]
+    X_Fia = X_Ia[I_Fi]
+    intersect_m = get_triangles_intersect(X_Fia[F_1m], X_Fia[F_2m])
+    return np.column_stack([F_1m[intersect_m], F_2m[intersect_m]])
+
+
+if __name__ == '__main__':
+    gamma_range = np.linspace(0.3, 1.5, 20)
+    print(f'{"facets":>8s} {"BVH [ms]":>9s} {"all [ms]":>9s} {"pairs":>6s}')
+    for n_plus in [2, 4, 8, 16]:
+        wbt = WBTessellation4P(n_phi_plus=n_plus, n_x_plus=n_plus)
+        I_Fi = wbt.I_Fi_trimmed
+        X_gIa = [wbt.get_X_Ia_trimmed(gamma) for gamma in gamma_range]
+        bvh = FacetBVH(X_gIa[0], I_Fi)
+        t = time.perf_counter()
+        n_pairs = sum(len(bvh.get_intersecting_pairs(X_Ia)) for X_Ia in X_gIa)
+        t_bvh = (time.perf_counter() - t) / len(gamma_range)
+        t_all = np.nan
+        if len(I_Fi) <= 2000:
+            t = time.perf_counter()
+            n_all = sum(len(get_all_intersecting_pairs(X_Ia, I_Fi)) for X_Ia in X_gIa)
+            t_all = (time.perf_counter() - t) / len(gamma_range)
+            assert n_all == n_pairs
+        print(f'{len(I_Fi):8d} {t_bvh * 1e3:9.2f} {t_all * 1e3:9.2f} {n_pairs:6d}')
@@ -0,0 +1,278 @@
+'''
+Accuracy versus cost of the shell element formulations.
+
+The formulations are run on standard linear shell problems over a series
+of meshes:
+
+- cantilever plate under tip tension and under tip shear (Bernoulli
+  beam references, rotations clamped for the shell elements), simple
+  sanity checks of the membrane and the bending response,
+- Scordelis-Lo roof, vertical displacement at the midside of the free
+  edge, reference 0.3024,
+- pinched cylinder with end diaphragms, displacement under the load,
+  reference 1.8248e-5,
+- waterbomb shell supported at its lowest and loaded at its highest
+  nodes, mean vertical displacement of the loaded nodes, reference is the
+  finest mesh of the same formulation.
+
+For each formulation and mesh level the table lists the number of dofs,
+the assembly time (strains, material and element stiffness matrices,
+sparse matrix), the solve time, the peak memory of the numpy arrays
+allocated during the assembly and the solve (tracemalloc) and the
+relative error. Singular systems are reported as such. The membrane
+element has no bending stiffness, the displacements of its nodes
+perpendicular to flat regions are held by springs. It is not run on the
+bending dominated problems (cantilever bending, pinched cylinder). The
+summary lists the error and the cost on the finest mesh of each problem.
+
+The MITC3 variants differ in the integration points of FETS2DMITC
+(production) and of the experiments in analysis/fem/temp.
+
+Run as ``python benchmarks/bench_shell_elements.py``.
+'''
+import contextlib
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+
+from bmcs_shell.folding.analysis.fem.fe_triangular_mesh import FETriangularMesh
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.fem.temp.fets2d_mitc_1gp import FETS2DMITC as FETS2DMITC1GP
+from bmcs_shell.folding.analysis.fem.temp.fets2d_mitc_2_gp_in_t_direction import FETS2DMITC as FETS2DMITC2GP
+from bmcs_shell.folding.analysis.fem.temp.fets2d_mitc_7gp import FETS2DMITC as FETS2DMITC7GP
+from bmcs_shell.folding.analysis.fem.tri_xdomain_fe import TriXDomainFE
+from bmcs_shell.folding.analysis.fem.tri_xdomain_fe_mitc import TriXDomainMITC
+from bmcs_shell.folding.analysis.fem.vmats2D_elastic import MATS2DElastic
+from bmcs_shell.folding.analysis.fem.vmats_shell_elastic import MATSShellElastic
+from bmcs_shell.folding.analysis.fem.zz_error_estimator import get_flat_nodes
+from bmcs_shell.folding.analysis.fets2d_mitc import FETS2DMITC
+from bmcs_shell.folding.geometry.wb_shell_geometry import WBShellGeometry4P
+
+
+def get_cst_domain(X_Id, I_Fi, t, E, nu):
+    mesh = FETriangularMesh(X_Id=X_Id, I_Fi=I_Fi)
+    return TriXDomainFE(mesh=mesh, integ_factor=t), MATS2DElastic(E=E, nu=nu)
+
+
+def get_mitc_domain_factory(fets_class):
+    def get_mitc_domain(X_Id, I_Fi, t, E, nu):
+        mesh = FETriangularMesh(X_Id=X_Id, I_Fi=I_Fi, fets=fets_class(a=t))
+        return TriXDomainMITC(mesh=mesh), MATSShellElastic(E=E, nu=nu)
+    return get_mitc_domain
+
+
+# name, domain factory, bending stiffness
+FORMULATIONS = [
+    ('CST membrane', get_cst_domain, False),
+    ('MITC3 1gp', get_mitc_domain_factory(FETS2DMITC), True),
+    ('MITC3 1gp t=0', get_mitc_domain_factory(FETS2DMITC1GP), True),
+    ('MITC3 1x2gp', get_mitc_domain_factory(FETS2DMITC2GP), True),
+    ('MITC3 7x2gp', get_mitc_domain_factory(FETS2DMITC7GP), True),
+]
+
+
+def get_grid_mesh(X_ij_a, closed=False):
+    '''Triangles of the structured grid of nodes X_ij_a (n_i, n_j, 3),
+    closed in the j direction if closed is True
+    '''
+    n_i, n_j, _ = X_ij_a.shape
+    I_ij = np.arange(n_i * n_j).reshape(n_i, n_j)
+    if closed:
+        I_ij = np.hstack([I_ij, I_ij[:, :1]])
+    I_0, I_1 = I_ij[:-1, :-1].ravel(), I_ij[1:, :-1].ravel()
+    I_2, I_3 = I_ij[1:, 1:].ravel(), I_ij[:-1, 1:].ravel()
+    I_Fi = np.vstack([np.column_stack([I_0, I_1, I_2]), np.column_stack([I_0, I_2, I_3])])
+    return X_ij_a.reshape(-1, 3), I_Fi
+
+
+def get_cylinder_mesh(R, L, phi_0, phi_1, n_x, n_phi, closed=False):
+    '''Cylinder with the x axis, the angle phi is measured from the z axis'''
+    x = np.linspace(-L / 2, L / 2, n_x + 1)
+    phi = np.linspace(phi_0, phi_1, n_phi + (0 if closed else 1), endpoint=not closed)
+    x_ij, phi_ij = np.meshgrid(x, phi, indexing='ij')
+    return get_grid_mesh(np.stack([x_ij, R * np.sin(phi_ij), R * np.cos(phi_ij)], axis=-1), closed)
+
+
+def get_lumped_load(X_Ia, I_Fi, q_a):
+    '''Nodal forces of the surface load q_a (per area) distributed by thirds'''
+    X_Fia = X_Ia[I_Fi]
+    A_F = np.linalg.norm(np.cross(X_Fia[:, 1] - X_Fia[:, 0], X_Fia[:, 2] - X_Fia[:, 0]), axis=-1) / 2
+    F_Ia = np.zeros_like(X_Ia)
+    np.add.at(F_Ia, I_Fi.ravel(), np.repeat(A_F / 3, 3)[:, np.newaxis] * q_a)
+    return F_Ia
+
+
+def cantilever_plate(n, a_load):
+    L, b, t, E, nu = 10., 1., 0.1, 1000., 0.
+    x, y = np.meshgrid(np.linspace(0, L, 10 * n + 1), np.linspace(0, b, n + 1), indexing='ij')
+    X_Ia, I_Fi = get_grid_mesh(np.stack([x, y, np.zeros_like(x)], axis=-1))
+    root = np.where(np.isclose(X_Ia[:, 0], 0))[0]
+    tip = np.where(np.isclose(X_Ia[:, 0], L))[0]
+    fixed = [(root, a) for a in range(5)]
+    F_Ia = np.zeros_like(X_Ia)
+    F_Ia[tip, a_load] = 1. / len(tip)
+    u_ref = L / (E * b * t) if a_load == 0 else L ** 3 / (3 * E * b * t ** 3 / 12)
+    return X_Ia, I_Fi, t, E, nu, fixed, F_Ia, lambda U_Ia: np.mean(U_Ia[tip, a_load]), u_ref
+
+
+def cantilever_tension(n):
+    return cantilever_plate(n, 0)
+
+
+def cantilever_bending(n):
+    return cantilever_plate(n, 2)
+
+
+def scordelis_lo_roof(n):
+    R, L, t, E, nu = 25., 50., 0.25, 4.32e8, 0.
+    X_Ia, I_Fi = get_cylinder_mesh(R, L, -np.radians(40), np.radians(40), 2 * n, n)
+    x, phi = X_Ia[:, 0], np.arctan2(X_Ia[:, 1], X_Ia[:, 2])
+    # diaphragms at the ends, symmetry of the longitudinal displacement
+    diaphragm = np.where(np.isclose(np.fabs(x), L / 2))[0]
+    fixed = [(diaphragm, 1), (diaphragm, 2), (np.where(np.isclose(x, 0))[0], 0)]
+    F_Ia = get_lumped_load(X_Ia, I_Fi, np.array([0, 0, -90.]))
+    I_A = np.where(np.isclose(x, 0) & np.isclose(phi, np.radians(40)))[0][0]
+    return X_Ia, I_Fi, t, E, nu, fixed, F_Ia, lambda U_Ia: -U_Ia[I_A, 2], 0.3024
+
+
+def pinched_cylinder(n):
+    R, L, t, E, nu, P = 300., 600., 3., 3e6, 0.3, 1.
+    X_Ia, I_Fi = get_cylinder_mesh(R, L, 0, 2 * np.pi, n, 2 * n, closed=True)
+    x = X_Ia[:, 0]
+    diaphragm = np.where(np.isclose(np.fabs(x), L / 2))[0]
+    fixed = [(diaphragm, 1), (diaphragm, 2), (np.where(np.isclose(x, 0))[0], 0)]
+    mid = np.where(np.isclose(x, 0))[0]
+    I_top, I_bottom = mid[np.argmax(X_Ia[mid, 2])], mid[np.argmin(X_Ia[mid, 2])]
+    F_Ia = np.zeros_like(X_Ia)
+    F_Ia[I_top, 2], F_Ia[I_bottom, 2] = -P, P
+    return X_Ia, I_Fi, t, E, nu, fixed, F_Ia, lambda U_Ia: -U_Ia[I_top, 2], 1.8248e-5
+
+
+def waterbomb_shell(n):
+    geo = WBShellGeometry4P(n_phi_plus=2, n_x_plus=2)
+    X_Ia, I_Fi = geo.X_Ia, geo.I_Fi
+    z_I = X_Ia[:, 2]
+    supported = np.where(np.isclose(z_I, np.min(z_I)))[0]
+    loaded = np.where(np.isclose(z_I, np.max(z_I)))[0]
+    X_Ia, I_Fi = get_subdivision_mesh(X_Ia, I_Fi, n)
+    fixed = [(supported, 0), (supported, 1), (supported, 2)]
+    F_Ia = np.zeros_like(X_Ia)
+    F_Ia[loaded, 2] = -1000.
+    return X_Ia, I_Fi, 10., 28000., 0.2, fixed, F_Ia, lambda U_Ia: -np.mean(U_Ia[loaded, 2]), None
+
+
+# name, problem, mesh levels, bending dominated
+PROBLEMS = [
+    ('cantilever tension', cantilever_tension, [1, 2, 4], False),
+    ('cantilever bending', cantilever_bending, [1, 2, 4], True),
+    ('Scordelis-Lo roof', scordelis_lo_roof, [2, 4, 8, 16], False),
+    ('pinched cylinder', pinched_cylinder, [4, 8, 16, 32], True),
+    ('waterbomb shell', waterbomb_shell, [1, 2, 4, 8], False),
+]
+
+
+def assemble(xdomain, tmodel):
+    '''Sparse stiffness matrix of the domain'''
+    eps_Emp = xdomain.map_U_to_field(np.zeros(xdomain.n_dofs))
+    _, D_Est = tmodel.get_corr_pred(eps_Emp, 0)
+    K = xdomain.map_field_to_K(D_Est)
+    K_Eij, o_Ei = K.mtx_arr, K.dof_map_arr
+    n_i = o_Ei.shape[1]
+    rows = np.repeat(o_Ei, n_i, axis=1).ravel()
+    cols = np.tile(o_Ei, (1, n_i)).ravel()
+    K = sp.csr_matrix((K_Eij.ravel(), (rows, cols)), shape=(xdomain.n_dofs, xdomain.n_dofs))
+    n_o = xdomain.mesh.n_nodal_dofs
+    if n_o == 3:
+        # membrane elements: springs perpendicular to the flat regions
+        I_flat, n_Ia = get_flat_nodes(xdomain.mesh.X_Id, xdomain.mesh.I_Fi)
+        o_Ia = I_flat[:, np.newaxis] * n_o + np.arange(3)
+        rows = np.repeat(o_Ia, 3, axis=1).ravel()
+        cols = np.tile(o_Ia, (1, 3)).ravel()
+        K_n = np.mean(K.diagonal()) * np.einsum('Ia,Ib->Iab', n_Ia, n_Ia)
+        K = K + sp.csr_matrix((K_n.ravel(), (rows, cols)), shape=K.shape)
+    return K
+
+
+def solve(K, n_o, fixed, F_Ia):
+    '''Displacements U_Ia of the translations with the fixed node
+    components (translations and, for the shell elements, rotations)
+    set to zero, None if the system is singular
+    '''
+    F = np.zeros(K.shape[0])
+    F.reshape(-1, n_o)[:, :3] = F_Ia
+    free = np.ones(K.shape[0], dtype=np.bool_)
+    for I_S, a in fixed:
+        if a < n_o:
+            free[I_S * n_o + a] = False
+    K_ff = K[free][:, free].tocsc()
+    U = np.zeros_like(F)
+    with np.errstate(all='ignore'):
+        U[free] = spsolve(K_ff, F[free])
+    residual = np.linalg.norm(K_ff @ U[free] - F[free]) / np.linalg.norm(F[free])
+    if not np.all(np.isfinite(U)) or residual > 1e-6:
+        return None
+    return U.reshape(-1, n_o)[:, :3]
+
+
+def run(problem, levels, get_domain):
+    '''Rows of the mesh levels and the flag whether the finest mesh is
+    the reference (the problem has no reference solution)
+    '''
+    rows = []
+    for n in levels:
+        X_Ia, I_Fi, t, E, nu, fixed, F_Ia, get_value, value_ref = problem(n)
+        tracemalloc.start()
+        t_0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            xdomain, tmodel = get_domain(X_Ia, I_Fi, t, E, nu)
+            K = assemble(xdomain, tmodel)
+        t_1 = time.perf_counter()
+        U_Ia = solve(K, xdomain.mesh.n_nodal_dofs, fixed, F_Ia)
+        t_2 = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        value = np.nan if U_Ia is None else get_value(U_Ia)
+        rows.append([n, K.shape[0], t_1 - t_0, t_2 - t_1, peak / 2 ** 20, value, value_ref])
+    self_referenced = value_ref is None
+    if self_referenced:
+        # the finest mesh of the formulation is the reference
+        for row in rows:
+            row[-1] = rows[-1][-2]
+    return rows, self_referenced
+
+
+def format_error(value, value_ref):
+    if np.isnan(value) or np.isnan(value_ref):
+        return '-'
+    return f'{abs(value - value_ref) / abs(value_ref):.2%}'
+
+
+if __name__ == '__main__':
+    np.seterr(all='ignore')
+    summary = {}
+    for problem_name, problem, levels, bending_dominated in PROBLEMS:
+        print(f'\n{problem_name}')
+        print(f'{"formulation":>14s} {"n":>3s} {"dofs":>7s} {"asm [ms]":>9s} {"solve [ms]":>10s} '
+              f'{"mem [MB]":>9s} {"value":>11s} {"error":>9s}')
+        for name, get_domain, bending in FORMULATIONS:
+            if bending_dominated and not bending:
+                print(f'{name:>14s}   no bending stiffness')
+                summary[name, problem_name] = 'n/a'
+                continue
+            rows, self_referenced = run(problem, levels, get_domain)
+            for n, n_dofs, t_asm, t_solve, mem, value, value_ref in rows:
+                value_str = 'singular' if np.isnan(value) else f'{value:.4e}'
+                print(f'{name:>14s} {n:3d} {n_dofs:7d} {t_asm * 1e3:9.1f} {t_solve * 1e3:10.1f} '
+                      f'{mem:9.1f} {value_str:>11s} {format_error(value, value_ref):>9s}')
+            # the finest mesh without the reference solution of the formulation itself
+            _, _, t_asm, t_solve, _, value, value_ref = rows[-2] if self_referenced else rows[-1]
+            summary[name, problem_name] = '%s / %.0f' % (format_error(value, value_ref), (t_asm + t_solve) * 1e3)
+    print('\nsummary: error / time [ms] on the finest mesh (next to finest for the self-referenced problems)')
+    print(f'{"formulation":>14s} ' + ' '.join(f'{problem_name:>22s}' for problem_name, _, _, _ in PROBLEMS))
+    for name, _, _ in FORMULATIONS:
+        print(f'{name:>14s} ' + ' '.join(
+            f'{summary[name, problem_name]:>22s}' for problem_name, _, _, _ in PROBLEMS))
@@ -0,0 +1,69 @@
+'''
+Substructured solution of the membrane stiffness system of subdivided
+WBTessellation4P meshes compared with the direct sparse solution of the
+whole system.
+
+The subdomains are single cells and blocks of 2 x 2 cells, condensed in
+one process and in os.cpu_count() processes. The table lists the number
+of the subdomains and of the interface dofs, the largest interior of a
+subdomain with the memory of its dense condensed coupling (the largest
+array of a worker process), the solution time and the deviation from the
+direct solution. The meshes are supported at all nodes of their boundary,
+which removes the folding mechanism of the membrane model, so that the
+systems are regular without any shift of the matrices.
+
+Run as ``python benchmarks/bench_substructuring.py``.
+'''
+import os
+import time
+
+import numpy as np
+from scipy.sparse.linalg import spsolve
+
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.fem.substructuring import get_interface_dofs, solve_substructured
+from bmcs_shell.folding.analysis.wb_shell_analysis import WBShellAnalysis
+from bmcs_shell.folding.analysis.wb_shell_substructured_analysis import WBShellSubstructuredAnalysis
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+
+if __name__ == '__main__':
+    n_cpus = os.cpu_count()
+    print(f'{"cells":>6s} {"dofs":>7s} {"block":>6s} {"jobs":>5s} {"subdom.":>8s} {"interface":>10s} '
+          f'{"interior":>9s} {"mem [MB]":>9s} {"time [ms]":>10s} {"deviation":>10s}')
+    for n_plus, n in [(2, 8), (4, 6), (6, 4)]:
+        analysis = WBShellAnalysis()
+        analysis.geo.trait_set(n_phi_plus=n_plus, n_x_plus=n_plus)
+        geo = analysis.geo
+        sub = WBShellSubstructuredAnalysis(analysis=analysis)
+        xdomain = sub.get_xdomain(*get_subdivision_mesh(geo.X_Ia, geo.I_Fi, n))
+        K = sub.get_K(xdomain).tocsr()
+        # supports at the boundary nodes, unit vertical load at all nodes
+        I_Ei, E_Fi = get_facet_edges(xdomain.I_Ei)
+        I_boundary = np.unique(I_Ei[np.bincount(E_Fi.ravel()) == 1])
+        fixed_dofs = (I_boundary[:, np.newaxis] * 3 + np.arange(3)).ravel()
+        F = np.zeros(xdomain.n_dofs)
+        F[2::3] = -1
+        free = np.ones(xdomain.n_dofs, dtype=np.bool_)
+        free[fixed_dofs] = False
+        t = time.perf_counter()
+        U_ref = np.zeros(xdomain.n_dofs)
+        U_ref[free] = spsolve(K[free][:, free].tocsc(), F[free])
+        t = time.perf_counter() - t
+        print(f'{geo.n_cells:6d} {xdomain.n_dofs:7d} {"-":>6s} {1:5d} {1:8d} {0:10d} '
+              f'{np.sum(free):9d} {"-":>9s} {t * 1e3:10.1f} {"-":>10s}')
+        o_Ei = xdomain.o_Ia[xdomain.I_Ei].reshape(len(xdomain.I_Ei), -1)
+        for block in [1, 2]:
+            sub.cells_per_subdomain = block
+            S_E = sub.get_subdomains(xdomain)
+            B_dofs, i_s = get_interface_dofs(o_Ei, S_E, xdomain.n_dofs, fixed_dofs)
+            # dense coupling of the largest interior with its interface columns
+            n_i = max(len(i) for i in i_s)
+            n_b = max(len(np.unique(K[i][:, B_dofs].indices)) for i in i_s)
+            for n_jobs in sorted({1, n_cpus}):
+                t = time.perf_counter()
+                U, _ = solve_substructured(K, F, np.zeros(xdomain.n_dofs), fixed_dofs, o_Ei, S_E, n_jobs)
+                t = time.perf_counter() - t
+                deviation = np.max(np.abs(U - U_ref)) / np.max(np.abs(U_ref))
+                print(f'{geo.n_cells:6d} {xdomain.n_dofs:7d} {block:6d} {n_jobs:5d} {len(i_s):8d} '
+                      f'{len(B_dofs):10d} {n_i:9d} {n_i * n_b * 8 / 1e6:9.2f} {t * 1e3:10.1f} {deviation:10.1e}')
@@ -0,0 +1,38 @@
+'''
+Assembly of the stiffness matrix of uniformly subdivided regular
+WBTessellation4P meshes element by element compared with the assembly
+from the rotated condensed cell stiffness (super-element).
+
+The table lists the number of dofs of the mesh and the time of the
+element assembly, and the number of the retained dofs and the time of
+the super-element assembly, which includes the location of the cells in
+the mesh, the assembly and condensation of the cell and the scatter of
+the rotated blocks.
+
+Run as ``python benchmarks/bench_super_element.py``.
+'''
+import time
+
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.wb_shell_analysis import WBShellAnalysis
+from bmcs_shell.folding.analysis.wb_shell_super_element_analysis import WBShellSuperElementAnalysis
+
+
+if __name__ == '__main__':
+    print(f'{"cells":>6s} {"n":>3s} {"dofs":>8s} {"elements [ms]":>14s} {"retained":>9s} '
+          f'{"super-element [ms]":>19s} {"speedup":>8s}')
+    for n_plus in [4, 8, 16]:
+        analysis = WBShellAnalysis()
+        analysis.geo.trait_set(n_phi_plus=n_plus, n_x_plus=n_plus)
+        geo = analysis.geo
+        for n in [2, 4, 8]:
+            sea = WBShellSuperElementAnalysis(analysis=analysis, initial_subdivision=n)
+            xdomain = sea.get_xdomain(*get_subdivision_mesh(geo.X_Ia, geo.I_Fi, n))
+            t = time.perf_counter()
+            sea.get_K(xdomain)
+            t_elements = time.perf_counter() - t
+            t = time.perf_counter()
+            K, _, _, _, _, _ = sea.get_condensed_K(xdomain)
+            t_super = time.perf_counter() - t
+            print(f'{geo.n_cells:6d} {n:3d} {xdomain.n_dofs:8d} {t_elements * 1e3:14.1f} {K.shape[0]:9d} '
+                  f'{t_super * 1e3:19.1f} {t_elements / t_super:8.1f}')
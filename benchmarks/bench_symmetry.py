@@ -0,0 +1,52 @@
+'''
+Symmetry reduced solution of uniformly subdivided regular WBTessellation4P
+meshes supported at the nodes of their boundary and loaded at their
+highest nodes. The supports along the whole boundary remove the folding
+mechanism of the membrane model, the supports at the lowest nodes alone
+leave the system singular.
+
+The full model (no symmetry planes), the half model (y-z plane) and the
+quarter model (y-z and x-z planes) are solved by the same reduction,
+the table lists the number of the free dofs of the solved system, the
+time of the assembly and the solution and the deviation of the
+displacements from the full model.
+
+Run as ``python benchmarks/bench_symmetry.py``.
+'''
+import time
+
+import numpy as np
+
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.wb_shell_analysis import WBShellAnalysis
+from bmcs_shell.folding.analysis.wb_shell_symmetric_analysis import WBShellSymmetricAnalysis
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+MODELS = [('full', False, False), ('half', True, False), ('quarter', True, True)]
+
+if __name__ == '__main__':
+    print(f'{"cells":>6s} {"n":>3s} {"model":>8s} {"dofs":>8s} {"time [ms]":>10s} {"deviation":>10s}')
+    for n_plus in [4, 8]:
+        analysis = WBShellAnalysis()
+        analysis.geo.trait_set(n_phi_plus=n_plus, n_x_plus=n_plus)
+        geo = analysis.geo
+        I_Ei, E_Fi = get_facet_edges(geo.I_Fi)
+        fixed_nodes = np.unique(I_Ei[np.bincount(E_Fi.ravel()) == 1])
+        z_I = geo.X_Ia[:, 2]
+        loaded_nodes = np.where(z_I > np.max(z_I) - 1e-6)[0]
+        analysis.bcs.bc_fixed_array = np.array([[I, 0, 0, 0] for I in fixed_nodes], dtype=np.float_)
+        analysis.bcs.bc_loaded_array = np.array([[I, np.nan, np.nan, -1000] for I in loaded_nodes],
+                                                dtype=np.float_)
+        for n in [2, 4, 8]:
+            sym = WBShellSymmetricAnalysis(analysis=analysis)
+            xdomain = sym.get_xdomain(*get_subdivision_mesh(geo.X_Ia, geo.I_Fi, n))
+            for model, symmetry_yz, symmetry_xz in MODELS:
+                sym.trait_set(symmetry_yz=symmetry_yz, symmetry_xz=symmetry_xz)
+                t = time.perf_counter()
+                U = sym.solve(xdomain)
+                t = time.perf_counter() - t
+                if model == 'full':
+                    U_full = U
+                deviation = np.max(np.abs(U - U_full)) / np.max(np.abs(U_full))
+                print(f'{geo.n_cells:6d} {n:3d} {model:>8s} {sym.n_reduced_dofs:8d} {t * 1e3:10.1f} '
+                      f'{deviation:10.1e}')
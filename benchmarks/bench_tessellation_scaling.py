@@ -0,0 +1,38 @@
+'''
+Scaling of the WBTessellation4P pipeline generating the merged nodes
+and the facets (with and without trimming) for 10^2 to 10^5 cells.
+The time and the peak memory per cell should stay nearly constant.
+
+Run as ``python benchmarks/bench_tessellation_scaling.py``.
+'''
+import time
+
+import numpy as np
+
+from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p import WBTessellation4P
+from bmcs_shell.folding.utils.memory import PeakMemory
+
+
+def build(n_plus, trim):
+    wbt = WBTessellation4P(n_phi_plus=n_plus, n_x_plus=n_plus, gamma=1.2,
+                           trim_half_cells_along_y=trim,
+                           trim_half_cells_along_x=trim)
+    # exclude the evaluation of the symbolic cell model
+    wbt.wb_cell.X_Ia, wbt.wb_cell.delta_x, wbt.wb_cell.delta_phi, wbt.wb_cell.R_0
+    with PeakMemory() as mem:
+        t = time.perf_counter()
+        X_Ia, I_Fi = wbt.X_Ia_trimmed, wbt.I_Fi_trimmed
+        t = time.perf_counter() - t
+    return wbt.n_cells, len(X_Ia), len(I_Fi), I_Fi.dtype, t, mem.peak
+
+
+if __name__ == '__main__':
+    for trim in [False, True]:
+        print(f'trimmed = {trim}')
+        print(f'{"cells":>8s} {"nodes":>8s} {"facets":>8s} {"idx":>6s} '
+              f'{"time [s]":>9s} {"us/cell":>8s} {"peak [MB]":>10s} {"B/cell":>7s}')
+        for n_cells in [1e2, 1e3, 1e4, 1e5]:
+            n_plus = int(round((np.sqrt(2 * n_cells) + 1) / 2))
+            n_c, n_I, n_F, dtype, t, peak = build(n_plus, trim)
+            print(f'{n_c:8d} {n_I:8d} {n_F:8d} {str(dtype):>6s} {t:9.3f} '
+                  f'{t / n_c * 1e6:8.1f} {peak / 1e6:10.2f} {peak / n_c:7.0f}')
@@ -9,6 +9,11 @@
 # from bmcs_shell.folding.analysis.fem.vmats2D_elastic import MATS2DElastic
 # from bmcs_shell.folding.analysis.fem.vmats_shell_elastic import MATSShellElastic
 # from bmcs_shell.folding.analysis.abaqus.abaqus_link_simple import AbaqusLink
+# from bmcs_shell.folding.analysis.wb_shell_linear_analysis import WBShellLinearAnalysis
+# from bmcs_shell.folding.analysis.wb_shell_adaptive_analysis import WBShellAdaptiveAnalysis
+# from bmcs_shell.folding.analysis.wb_shell_substructured_analysis import WBShellSubstructuredAnalysis
+# from bmcs_shell.folding.analysis.wb_shell_super_element_analysis import WBShellSuperElementAnalysis
+# from bmcs_shell.folding.analysis.wb_shell_symmetric_analysis import WBShellSymmetricAnalysis
 
 from bmcs_shell.folding.geometry.wb_cell.wb_cell import WBCell
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p import WBCell4Param, WBCellSymb4Param
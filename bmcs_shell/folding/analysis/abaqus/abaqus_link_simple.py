@@ -21,19 +21,28 @@ class AbaqusLink(HasTraits):
         # return np.array([[0, 1, 2]])
         return self.shell_analysis.xdomain.mesh.I_Fi
 
+    def _map_nodes(self, bc_array):
+        # the conditions refer to the nodes before the renumbering of the mesh
+        mesh = self.shell_analysis.xdomain.mesh
+        if bc_array.size == 0 or not getattr(mesh, 'renumber_nodes', False):
+            return bc_array
+        bc_array = np.copy(bc_array)
+        bc_array[:, 0] = mesh.node_map[bc_array[:, 0].astype(np.int_)]
+        return bc_array
+
     bc_fixed = Property
     def _get_bc_fixed(self):
         """
         :return: [[node_idx, bc_x, bc_y, bc_z...]]
         """
-        return self.shell_analysis.bcs.bc_fixed_array
+        return self._map_nodes(self.shell_analysis.bcs.bc_fixed_array)
 
     bc_loaded = Property
     def _get_bc_loaded(self):
         """
         :return: [[node_idx, f_x, f_y, f_z...]]
         """
-        return self.shell_analysis.bcs.bc_loaded_array
+        return self._map_nodes(self.shell_analysis.bcs.bc_loaded_array)
 
     thickness = Property
     def _get_thickness(self):
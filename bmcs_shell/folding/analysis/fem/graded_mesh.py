@@ -0,0 +1,174 @@
+'''
+Graded refinement of triangular meshes towards crease lines and supports.
+
+The target element size grows linearly with the distance from the
+crease lines and the supported nodes, ``h = min(h_max, h_min + grading * d)``.
+Elements longer than the target size at their centroid are refined by
+bisection of their edges. The set of the bisected edges is closed by
+adding the longest edge of each element with a marked edge, which keeps
+the shape of the elements, and each marked edge is split in all its
+elements, which keeps the mesh conforming. The nodes of the coarse mesh
+keep their numbers, the midpoints are appended.
+
+The distances of the element centroids from the crease segments are
+evaluated for the nearest candidate segments found by a k-d tree over
+the segments split into pieces not longer than h_max.
+
+Indices: I - node, a - dimension, F - facet (element), i - facet node,
+L - line (segment), P - point, S - support node
+'''
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# keys of the node pairs (edges) are composed as I_0 * KEY_BASE + I_1
+KEY_BASE = np.int64(1) << 32
+
+
+def get_point_segment_distance(X_Pa, X_Pia):
+    '''Distances of the points X_Pa from the segments X_Pia (paired)
+    '''
+    d_Pa = X_Pia[:, 1] - X_Pia[:, 0]
+    r_Pa = X_Pa - X_Pia[:, 0]
+    dd_P = np.einsum('Pa,Pa->P', d_Pa, d_Pa)
+    t_P = np.clip(np.einsum('Pa,Pa->P', r_Pa, d_Pa) / np.where(dd_P > 0, dd_P, 1), 0, 1)
+    return np.linalg.norm(r_Pa - t_P[:, np.newaxis] * d_Pa, axis=-1)
+
+
+def get_segment_pieces(X_Lia, h):
+    '''Segments X_Lia split into pieces X_pia not longer than h
+    '''
+    n_L = np.maximum(np.ceil(np.linalg.norm(X_Lia[:, 1] - X_Lia[:, 0], axis=-1) / h), 1).astype(np.int_)
+    L_p = np.repeat(np.arange(len(X_Lia)), n_L)
+    k_p = np.arange(len(L_p)) - np.repeat(np.cumsum(n_L) - n_L, n_L)
+    t_pi = (k_p[:, np.newaxis] + np.array([0, 1])) / n_L[L_p][:, np.newaxis]
+    return (X_Lia[L_p, 0][:, np.newaxis, :] * (1 - t_pi)[..., np.newaxis] +
+            X_Lia[L_p, 1][:, np.newaxis, :] * t_pi[..., np.newaxis])
+
+
+def get_pieces_distance(X_Pa, X_pia, tree, k=8):
+    '''Distances of the points X_Pa from the nearest of the segment pieces X_pia,
+    the candidates are the k pieces with the nearest midpoints in the tree
+    '''
+    k = min(k, len(X_pia))
+    _, p_Pk = tree.query(X_Pa, k=k, workers=-1)
+    p_Pk = p_Pk.reshape(len(X_Pa), k)
+    d_Pk = get_point_segment_distance(np.repeat(X_Pa, k, axis=0), X_pia[p_Pk.ravel()])
+    return np.min(d_Pk.reshape(-1, k), axis=1)
+
+
+def get_lines_distance(X_Pa, X_Lia, h, k=8):
+    '''Distances of the points X_Pa from the nearest of the segments X_Lia,
+    the candidates are the k segment pieces not longer than h with the
+    nearest midpoints
+    '''
+    if len(X_Lia) == 0:
+        return np.full(len(X_Pa), np.inf)
+    X_pia = get_segment_pieces(X_Lia, h)
+    return get_pieces_distance(X_Pa, X_pia, cKDTree(np.mean(X_pia, axis=1)), k)
+
+
+def _get_side_keys(I_Fi):
+    I_Fsi = np.stack([I_Fi, np.roll(I_Fi, -1, axis=1)], axis=-1).astype(np.int64)
+    return np.min(I_Fsi, axis=-1) * KEY_BASE + np.max(I_Fsi, axis=-1)
+
+
+def _get_side_lengths(X_Ia, I_Fi):
+    return np.linalg.norm(X_Ia[np.roll(I_Fi, -1, axis=1)] - X_Ia[I_Fi], axis=-1)
+
+
+def get_bisection_edges(X_Ia, I_Fi, F_marked):
+    '''Edges I_Mi (sorted by their keys) to bisect in the conforming refinement
+    of the facets F_marked (boolean or indices) of the mesh X_Ia, I_Fi,
+    closed by the longest edges of all facets with a bisected edge
+    '''
+    key_Fs = _get_side_keys(I_Fi)
+    s_F = np.argmax(_get_side_lengths(X_Ia, I_Fi), axis=1)
+    key_marked = np.unique(key_Fs[F_marked, s_F[F_marked]])
+    # closure: facets with a marked side bisect their longest side first
+    while True:
+        F_closure = np.any(np.isin(key_Fs, key_marked), axis=1)
+        key_closure = np.union1d(key_marked, key_Fs[F_closure, s_F[F_closure]])
+        if len(key_closure) == len(key_marked):
+            break
+        key_marked = key_closure
+    return np.column_stack([key_marked // KEY_BASE, key_marked % KEY_BASE])
+
+
+def bisect_edges(X_Ia, I_Fi, I_Mi):
+    '''Bisection of the edges I_Mi (as returned by get_bisection_edges) in all
+    facets of the mesh X_Ia, I_Fi. Returns the refined nodes (the original
+    ones first, followed by the midpoints of I_Mi), the facets and the flags
+    of the facets created by the bisection.
+    '''
+    I_Mi = np.asarray(I_Mi, dtype=np.int64)
+    key_marked = I_Mi[:, 0] * KEY_BASE + I_Mi[:, 1]
+    X_Ia = np.vstack([X_Ia, np.mean(X_Ia[I_Mi], axis=1)])
+    I_mid_0 = len(X_Ia) - len(key_marked)
+    new_F = np.zeros(len(I_Fi), dtype=np.bool_)
+    # bisect the marked sides, the longest marked side of each facet first
+    while True:
+        key_Fs = _get_side_keys(I_Fi)
+        marked_Fs = np.isin(key_Fs, key_marked)
+        F_split = np.where(np.any(marked_Fs, axis=1))[0]
+        if len(F_split) == 0:
+            return X_Ia, I_Fi, new_F
+        L_Fs = np.where(marked_Fs[F_split], _get_side_lengths(X_Ia, I_Fi[F_split]), -1)
+        s_F = np.argmax(L_Fs, axis=1)
+        # rotate the facet nodes so that the bisected side runs from node 0 to node 1
+        I_Fi_split = np.take_along_axis(I_Fi[F_split], (s_F[:, np.newaxis] + np.arange(3)) % 3, axis=1)
+        I_m = I_mid_0 + np.searchsorted(key_marked, key_Fs[F_split, s_F])
+        I_0, I_1, I_2 = I_Fi_split.T
+        keep_F = np.ones(len(I_Fi), dtype=np.bool_)
+        keep_F[F_split] = False
+        I_Fi = np.vstack([I_Fi[keep_F], np.column_stack([I_0, I_m, I_2]), np.column_stack([I_m, I_1, I_2])])
+        new_F = np.hstack([new_F[keep_F], np.ones(2 * len(F_split), dtype=np.bool_)])
+
+
+def bisect_facets(X_Ia, I_Fi, F_marked):
+    '''Conforming bisection of the facets F_marked (boolean or indices) of the
+    mesh X_Ia, I_Fi and of their neighbours required for the conformity.
+    Returns the refined nodes (the original ones first), the facets and
+    the flags of the facets created by the bisection.
+    '''
+    return bisect_edges(X_Ia, I_Fi, get_bisection_edges(X_Ia, I_Fi, F_marked))
+
+
+def get_graded_mesh(X_Ia, I_Fi, X_Lia, h_min, h_max, grading=0.5, X_Sa=None, max_levels=12):
+    '''Mesh of the facets I_Fi with the nodes X_Ia refined towards the crease
+    segments X_Lia and the supports X_Sa with the element size (longest edge)
+    growing from h_min at the creases by grading times the distance up to h_max
+    '''
+    X_Id = np.asarray(X_Ia, dtype=np.float_)
+    I_Fi = np.asarray(I_Fi, dtype=np.int_)
+    X_Lia = np.asarray(X_Lia, dtype=np.float_).reshape(-1, 2, X_Id.shape[1])
+    X_pia = get_segment_pieces(X_Lia, h_max)
+    pieces_tree = cKDTree(np.mean(X_pia, axis=1)) if len(X_pia) else None
+    support_tree = None if X_Sa is None or len(X_Sa) == 0 else cKDTree(X_Sa)
+    # the facets not bisected in the previous level keep their size
+    check_F = np.ones(len(I_Fi), dtype=np.bool_)
+    for level in range(max_levels):
+        # only the facets longer than h_min can require a refinement
+        F_F = np.where(check_F)[0]
+        L_F = np.max(_get_side_lengths(X_Id, I_Fi[F_F]), axis=1)
+        F_F, L_F = F_F[L_F > h_min], L_F[L_F > h_min]
+        X_Fa = np.mean(X_Id[I_Fi[F_F]], axis=1)
+        d_F = np.full(len(F_F), np.inf)
+        if pieces_tree is not None:
+            d_F = get_pieces_distance(X_Fa, X_pia, pieces_tree)
+        if support_tree is not None:
+            d_F = np.minimum(d_F, support_tree.query(X_Fa, workers=-1)[0])
+        h_F = np.minimum(h_max, h_min + grading * d_F)
+        F_marked = F_F[L_F > h_F]
+        if len(F_marked) == 0:
+            break
+        X_Id, I_Fi, check_F = bisect_facets(X_Id, I_Fi, F_marked)
+    return X_Id, I_Fi
+
+
+def get_uniform_n_elems(X_Ia, I_Fi, h):
+    '''Number of elements of the uniform subdivision of the facets I_Fi
+    with the longest edge not exceeding h
+    '''
+    n = int(np.ceil(np.max(_get_side_lengths(np.asarray(X_Ia), np.asarray(I_Fi))) / h))
+    return len(I_Fi) * n ** 2
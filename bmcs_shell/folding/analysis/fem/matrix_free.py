@@ -0,0 +1,152 @@
+'''
+Matrix-free application of the stiffness matrix for the Krylov solvers.
+
+The product K @ U is evaluated element by element: the element dofs are
+gathered from U through the dof map o_Ef, multiplied by the element
+matrices and scattered back. The element matrices are either cached
+(K_Eff, n_f^2 values per element) or replaced by the products
+B^T D B of the strain operator B_Empf with the integration weights w_Em
+(n_m n_p n_f values per element, 27 instead of 81 for the constant
+strain triangle). The elements are processed in chunks bounding the
+temporary arrays.
+
+The (block) Jacobi preconditioners are assembled from the diagonals or
+the diagonal nodal blocks of the element matrices.
+
+Indices: E - element, m - integration point, p, q - strain component,
+f, g - element dof, I - node, a, b - nodal dof
+'''
+
+import numpy as np
+from scipy.sparse.linalg import LinearOperator
+
+
+class ElementOperator(LinearOperator):
+    '''Stiffness matrix of the elements with the dofs o_Ef applied element
+    by element in chunks of chunk_size elements. Subclasses implement
+    the product of the element matrices with the element displacements.
+    '''
+
+    def __init__(self, o_Ef, n_dofs, chunk_size=65536):
+        self.o_Ef = np.asarray(o_Ef, dtype=np.int_)
+        self.chunk_size = chunk_size
+        super().__init__(dtype=np.float_, shape=(n_dofs, n_dofs))
+
+    def get_chunks(self):
+        return [slice(E_0, E_0 + self.chunk_size) for E_0 in range(0, len(self.o_Ef), self.chunk_size)]
+
+    def apply_elements(self, E, U_Ef):
+        '''Element forces of the elements E for the element displacements U_Ef'''
+        raise NotImplementedError
+
+    def get_element_blocks(self, E, n_a):
+        '''Diagonal nodal blocks K_Eiab (n_a dofs per node) of the elements E'''
+        raise NotImplementedError
+
+    def _matvec(self, U):
+        U = np.ravel(U)
+        F = np.zeros(self.shape[0], dtype=np.result_type(U, np.float_))
+        for E in self.get_chunks():
+            o_Ef = self.o_Ef[E]
+            F += np.bincount(o_Ef.ravel(), weights=self.apply_elements(E, U[o_Ef]).ravel(),
+                             minlength=self.shape[0])
+        return F
+
+    def _rmatvec(self, U):
+        return self._matvec(U)
+
+    def get_block_diagonal(self, n_a):
+        '''Diagonal nodal blocks K_Iab of the stiffness matrix, the dofs of
+        the node I are assumed to be n_a * I + a
+        '''
+        n_I = self.shape[0] // n_a
+        K_Iab = np.zeros((n_I, n_a * n_a))
+        for E in self.get_chunks():
+            I_Ei = self.o_Ef[E][:, ::n_a] // n_a
+            K_Eiab = self.get_element_blocks(E, n_a)
+            for ab in range(n_a * n_a):
+                K_Iab[:, ab] += np.bincount(I_Ei.ravel(), weights=K_Eiab.reshape(-1, n_a * n_a)[:, ab],
+                                            minlength=n_I)
+        return K_Iab.reshape(n_I, n_a, n_a)
+
+    def get_diagonal(self):
+        '''Diagonal of the stiffness matrix'''
+        return np.einsum('Iaa->Ia', self.get_block_diagonal(1)).ravel()
+
+
+class ElementMatrixOperator(ElementOperator):
+    '''Element by element product with the cached element matrices K_Eff'''
+
+    def __init__(self, K_Eff, o_Ef, n_dofs, chunk_size=65536):
+        self.K_Eff = np.asarray(K_Eff, dtype=np.float_)
+        super().__init__(o_Ef, n_dofs, chunk_size)
+
+    def apply_elements(self, E, U_Ef):
+        return np.einsum('Efg,Eg->Ef', self.K_Eff[E], U_Ef)
+
+    def get_element_blocks(self, E, n_a):
+        K_Eff = self.K_Eff[E]
+        n_E, n_f, _ = K_Eff.shape
+        n_i = n_f // n_a
+        K_Eiajb = K_Eff.reshape(n_E, n_i, n_a, n_i, n_a)
+        return np.einsum('Eiaib->Eiab', K_Eiajb)
+
+
+class ElementProductOperator(ElementOperator):
+    '''Element by element product B^T D B evaluated on the fly from the strain
+    operator B_Empf, the weights w_Em of the integration points and the
+    material matrix D_pq (constant)
+    '''
+
+    def __init__(self, B_Empf, w_Em, D_pq, o_Ef, n_dofs, chunk_size=65536):
+        self.B_Empf = np.asarray(B_Empf, dtype=np.float_)
+        self.w_Em = np.asarray(w_Em, dtype=np.float_)
+        self.D_pq = np.asarray(D_pq, dtype=np.float_)
+        super().__init__(o_Ef, n_dofs, chunk_size)
+
+    def apply_elements(self, E, U_Ef):
+        B_Empf = self.B_Empf[E]
+        eps_Emp = np.einsum('Empf,Ef->Emp', B_Empf, U_Ef)
+        sig_Emp = np.einsum('pq,Emq,Em->Emp', self.D_pq, eps_Emp, self.w_Em[E])
+        return np.einsum('Empf,Emp->Ef', B_Empf, sig_Emp)
+
+    def get_element_blocks(self, E, n_a):
+        B_Empf = self.B_Empf[E]
+        n_E, n_m, n_p, n_f = B_Empf.shape
+        B_Empia = B_Empf.reshape(n_E, n_m, n_p, n_f // n_a, n_a)
+        DB_Empia = np.einsum('pq,Emqia,Em->Empia', self.D_pq, B_Empia, self.w_Em[E])
+        return np.einsum('Empia,Empib->Eiab', B_Empia, DB_Empia)
+
+
+def get_nodal_blocks(K, n_a):
+    '''Diagonal nodal blocks K_Iab of the sparse matrix K, the dofs of the
+    node I are assumed to be n_a * I + a
+    '''
+    n_I = K.shape[0] // n_a
+    o_Ia = np.arange(n_I * n_a).reshape(n_I, n_a)
+    rows = np.repeat(o_Ia, n_a, axis=1).ravel()
+    cols = np.tile(o_Ia, (1, n_a)).ravel()
+    return np.asarray(K.tocsr()[rows, cols]).reshape(n_I, n_a, n_a)
+
+
+def get_block_jacobi(K_Iab, free=None, tol=1e-12):
+    '''Preconditioner applying the inverses of the nodal blocks K_Iab to
+    the free dofs (all dofs if not given), the blocks singular within the
+    relative tolerance tol are inverted on their range
+    '''
+    n_I, n_a, _ = K_Iab.shape
+    if free is None:
+        free = np.ones(n_I * n_a, dtype=np.bool_)
+    # the fixed dofs are decoupled from the free dofs of their node
+    fixed_Ia = ~free.reshape(n_I, n_a)
+    K_Iab = np.where(fixed_Ia[:, :, np.newaxis] | fixed_Ia[:, np.newaxis, :], 0, K_Iab)
+    K_Iab += np.einsum('Ia,ab->Iab', fixed_Ia, np.identity(n_a))
+    K_inv_Iab = np.linalg.pinv(K_Iab, rcond=tol, hermitian=True)
+    n_f = int(np.sum(free))
+
+    def apply(R_f):
+        R_Ia = np.zeros((n_I, n_a))
+        R_Ia[~fixed_Ia] = np.ravel(R_f)
+        return np.einsum('Iab,Ib->Ia', K_inv_Iab, R_Ia)[~fixed_Ia]
+
+    return LinearOperator(shape=(n_f, n_f), matvec=apply, rmatvec=apply, dtype=np.float_)
@@ -0,0 +1,48 @@
+'''
+Bandwidth reducing renumbering of the mesh nodes.
+
+The nodes of the tessellations follow the order of the cell generation
+and the nodes of gmsh are numbered arbitrarily, the stiffness matrices
+have a large bandwidth. The reverse Cuthill-McKee ordering of the node
+adjacency graph keeps the neighbouring nodes close in the numbering,
+which reduces the profile of the matrix and the fill-in of its
+factorization.
+
+The permutations are given as I_new_old (the original node of each new
+number) and I_old_new (the new number of each original node).
+
+Indices: I - node, a - dimension, F - facet, i - facet node
+'''
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+
+def get_node_adjacency(I_Fi, n_I):
+    '''Symmetric sparse adjacency matrix of the nodes connected by the facets I_Fi'''
+    I_Fi = np.asarray(I_Fi)
+    n_i = I_Fi.shape[1]
+    rows = np.repeat(I_Fi, n_i, axis=1).ravel()
+    cols = np.tile(I_Fi, (1, n_i)).ravel()
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n_I, n_I))
+
+
+def get_rcm_order(I_Fi, n_I):
+    '''Reverse Cuthill-McKee order I_new_old of the nodes of the facets I_Fi'''
+    return reverse_cuthill_mckee(get_node_adjacency(I_Fi, n_I), symmetric_mode=True).astype(np.int_)
+
+
+def renumber_mesh(X_Ia, I_Fi, I_new_old):
+    '''Nodes and facets renumbered by the order I_new_old and the new
+    numbers I_old_new of the original nodes
+    '''
+    I_old_new = np.empty_like(I_new_old)
+    I_old_new[I_new_old] = np.arange(len(I_new_old))
+    return X_Ia[I_new_old], I_old_new[I_Fi], I_old_new
+
+
+def get_bandwidth(I_Fi):
+    '''Largest difference of the node numbers within a facet'''
+    I_Fi = np.asarray(I_Fi)
+    return int(np.max(np.max(I_Fi, axis=1) - np.min(I_Fi, axis=1)))
@@ -0,0 +1,77 @@
+'''
+Uniform subdivision of triangular facets without gmsh.
+
+Each facet is split into n x n congruent triangles on the lattice of
+the barycentric coordinates (i/n, j/n). All facets are processed at
+once: the nodes on the facet edges are numbered by the unique edges of
+the coarse mesh and their position along the edge, so that neighbouring
+facets share them, the interior nodes are numbered per facet. The
+refined nodes are ordered as coarse nodes, edge nodes and interior
+nodes, so that the coarse node I keeps its number in the refined mesh
+and the supports and loads specified at the coarse nodes apply directly.
+
+Indices: I - coarse node, a - dimension, F - coarse facet, i - facet node,
+E - coarse edge, L - lattice point of a facet, T - lattice triangle,
+d - refined node
+'''
+
+import numpy as np
+
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+
+def get_lattice(n):
+    '''Lattice points ij_L (i + j <= n) and triangles L_Ti of a facet
+    subdivided into n x n triangles
+    '''
+    i, j = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing='ij')
+    ij_L = np.column_stack([i[i + j <= n], j[i + j <= n]])
+    L_ij = np.full((n + 1, n + 1), -1)
+    L_ij[ij_L[:, 0], ij_L[:, 1]] = np.arange(len(ij_L))
+    i_T, j_T = ij_L[ij_L.sum(axis=1) < n].T
+    up_Ti = np.column_stack([L_ij[i_T, j_T], L_ij[i_T + 1, j_T], L_ij[i_T, j_T + 1]])
+    down = i_T + j_T < n - 1
+    i_T, j_T = i_T[down], j_T[down]
+    down_Ti = np.column_stack([L_ij[i_T + 1, j_T], L_ij[i_T + 1, j_T + 1], L_ij[i_T, j_T + 1]])
+    return ij_L, np.vstack([up_Ti, down_Ti])
+
+
+def get_subdivision_mesh(X_Ia, I_Fi, n):
+    '''Nodes X_Id and triangles I_Ti of the facets I_Fi with the nodes X_Ia
+    uniformly subdivided into n x n triangles each, the coarse nodes keep
+    their numbers
+    '''
+    X_Ia = np.asarray(X_Ia, dtype=np.float_)
+    I_Fi = np.asarray(I_Fi, dtype=np.int_)
+    n_I, n_F = len(X_Ia), len(I_Fi)
+    I_Ei, E_Fi = get_facet_edges(I_Fi)
+    n_E = len(I_Ei)
+    ij_L, L_Ti = get_lattice(n)
+    i_L, j_L = ij_L.T
+    lam_Li = np.column_stack([n - i_L - j_L, i_L, j_L]) / n
+    # classify the lattice points: corner, side (from corner s to s + 1) or interior
+    corner_L = np.where(i_L == n, 1, np.where(j_L == n, 2, np.where(i_L + j_L == 0, 0, -1)))
+    side_L = np.where(j_L == 0, 0, np.where(i_L + j_L == n, 1, np.where(i_L == 0, 2, -1)))
+    side_L[corner_L >= 0] = -1
+    # position along the side counted from its first corner
+    p_L = np.choose(np.maximum(side_L, 0), [i_L, j_L, n - j_L])
+    inner_L = (corner_L < 0) & (side_L < 0)
+    n_inner = np.count_nonzero(inner_L)
+    # refined node numbers of the lattice points of all facets
+    d_FL = np.empty((n_F, len(ij_L)), dtype=np.int_)
+    c_L = np.where(corner_L >= 0)[0]
+    d_FL[:, c_L] = I_Fi[:, corner_L[c_L]]
+    s_L = np.where(side_L >= 0)[0]
+    E_FL = E_Fi[:, side_L[s_L]]
+    forward_FL = I_Fi[:, side_L[s_L]] == I_Ei[E_FL, 0]
+    p_FL = np.where(forward_FL, p_L[s_L], n - p_L[s_L])
+    d_FL[:, s_L] = n_I + E_FL * (n - 1) + p_FL - 1
+    d_FL[:, inner_L] = (n_I + n_E * (n - 1) +
+                        np.arange(n_F * n_inner).reshape(n_F, n_inner))
+    # nodal coordinates
+    t_p = np.arange(1, n)[np.newaxis, :, np.newaxis] / n
+    X_Epa = (1 - t_p) * X_Ia[I_Ei[:, 0]][:, np.newaxis, :] + t_p * X_Ia[I_Ei[:, 1]][:, np.newaxis, :]
+    X_FLa = np.einsum('Li,Fia->FLa', lam_Li[inner_L], X_Ia[I_Fi])
+    X_Id = np.vstack([X_Ia, X_Epa.reshape(-1, X_Ia.shape[1]), X_FLa.reshape(-1, X_Ia.shape[1])])
+    I_Ti = d_FL[:, L_Ti].reshape(-1, 3)
+    return X_Id, I_Ti
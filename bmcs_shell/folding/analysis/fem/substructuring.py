@@ -0,0 +1,101 @@
+'''
+Direct solution of the linear system by substructuring with the Schur
+complement condensation of the subdomains.
+
+The elements are grouped into subdomains. The free dofs of elements of
+several subdomains form the interface, the remaining free dofs are the
+interiors of the subdomains, which are coupled only with the interface.
+The interiors are condensed independently (in parallel processes if
+n_jobs > 1), the condensed interface system
+
+    (K_BB - sum_s K_Bs K_ss^-1 K_sB) U_B = R_B - sum_s K_Bs K_ss^-1 R_s
+
+is assembled and solved. Each interior is factorized once, the
+condensation returns the solutions X_sB = K_ss^-1 K_sB and
+y_s = K_ss^-1 R_s, so that the back substitution
+
+    U_s = y_s - X_sB U_B
+
+is a dense product without a further factorization. The worker processes
+get only the sparse blocks of their subdomain, which bounds the memory
+per process, the main process keeps the dense X_sB of all subdomains.
+
+Indices: E - element, i - element dof, s - subdomain, B - interface dof
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu, spsolve
+
+
+def get_interface_dofs(o_Ei, S_E, n_dofs, fixed_dofs=()):
+    '''Interface dofs B and the interior dofs i_s of the subdomains S_E of the
+    elements with the dofs o_Ei, the fixed dofs are excluded from both and
+    the subdomains without interior dofs are omitted
+    '''
+    S_Ei = np.repeat(S_E[:, np.newaxis], o_Ei.shape[1], axis=1)
+    S_min = np.full(n_dofs, np.max(S_E) + 1)
+    np.minimum.at(S_min, o_Ei.ravel(), S_Ei.ravel())
+    S_max = np.full(n_dofs, -1)
+    np.maximum.at(S_max, o_Ei.ravel(), S_Ei.ravel())
+    free = S_max >= 0
+    free[np.asarray(fixed_dofs, dtype=np.int_)] = False
+    B_dofs = np.where(free & (S_min != S_max))[0]
+    interior = free & (S_min == S_max)
+    i_s = [np.where(interior & (S_min == s))[0] for s in np.unique(S_E)]
+    return B_dofs, [i for i in i_s if len(i) > 0]
+
+
+def condense_subdomain(K_ss, K_sB, R_s):
+    '''Contributions of the subdomain with the interior stiffness K_ss, its
+    coupling K_sB to the interface columns and the interior residual R_s
+    to the interface matrix and right hand side (to be subtracted) and the
+    solutions X_sB, y_s of the interior for the back substitution
+    '''
+    lu = splu(sp.csc_matrix(K_ss))
+    X_sB = lu.solve(K_sB.toarray())
+    y_s = lu.solve(R_s)
+    return K_sB.T @ X_sB, K_sB.T @ y_s, X_sB, y_s
+
+
+def _map(function, n_jobs, *args):
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(function, *args))
+    return list(map(function, *args))
+
+
+def solve_substructured(K, F, U, fixed_dofs, o_Ei, S_E, n_jobs=1):
+    '''Displacements of the system K U = F with the values U of the fixed
+    dofs prescribed, substructured by the subdomains S_E of the elements o_Ei.
+    Returns the displacements and the number of interface dofs.
+    '''
+    K = sp.csr_matrix(K)
+    U = np.copy(U)
+    fixed_dofs = np.asarray(fixed_dofs, dtype=np.int_)
+    U_fixed = np.zeros_like(U)
+    U_fixed[fixed_dofs] = U[fixed_dofs]
+    R = F - K @ U_fixed
+    B_dofs, i_s = get_interface_dofs(o_Ei, S_E, len(U), fixed_dofs)
+    # interface columns coupled with each subdomain
+    K_iB = K[:, B_dofs]
+    K_s = [K[i][:, i] for i in i_s]
+    B_s = [np.unique(K_iB[i].indices) for i in i_s]
+    K_sB = [K_iB[i][:, B] for i, B in zip(i_s, B_s)]
+    R_s = [R[i] for i in i_s]
+    S_BB = K[B_dofs][:, B_dofs].tocoo()
+    rows, cols, data = [S_BB.row], [S_BB.col], [S_BB.data]
+    R_B = np.copy(R[B_dofs])
+    condensed_s = _map(condense_subdomain, n_jobs, K_s, K_sB, R_s)
+    for B, (C_BB, C_B, _, _) in zip(B_s, condensed_s):
+        rows.append(np.repeat(B, len(B))), cols.append(np.tile(B, len(B)))
+        data.append(-C_BB.ravel())
+        R_B[B] -= C_B
+    S_BB = sp.csc_matrix((np.hstack(data), (np.hstack(rows), np.hstack(cols))), shape=(len(B_dofs),) * 2)
+    U_B = np.atleast_1d(spsolve(S_BB, R_B)) if len(B_dofs) > 0 else R_B
+    U[B_dofs] = U_B
+    for i, B, (_, _, X_sB, y_s) in zip(i_s, B_s, condensed_s):
+        U[i] = y_s - X_sB @ U_B[B]
+    return U, len(B_dofs)
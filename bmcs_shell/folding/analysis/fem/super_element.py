@@ -0,0 +1,44 @@
+'''
+Static condensation of the stiffness matrix of a cell into a super-element
+and its rigid rotation into the congruent cells of a tessellation.
+
+The stiffness matrix in the global frame of a rigidly rotated cell is
+obtained by rotating the 3 x 3 nodal blocks of the matrix of the reference
+cell, K_c = R_c K R_c^T, and the same holds for its condensed matrix, so
+that the condensation is done once for all cells.
+
+Indices: c - cell, b, B - retained (boundary) dof, i - interior dof,
+I, J - node, a, k, l - dimension
+'''
+
+import numpy as np
+
+
+def condense(K_ij, b_dofs):
+    '''Condensed stiffness S_bB of the dense matrix K_ij onto the retained
+    dofs b_dofs and the operator X_ib recovering the interior displacements
+    U_i = X_ib U_b (for no interior loads) of the interior dofs i_dofs
+    '''
+    b_dofs = np.asarray(b_dofs, dtype=np.int_)
+    i_dofs = np.setdiff1d(np.arange(len(K_ij)), b_dofs)
+    K_bb, K_bi = K_ij[np.ix_(b_dofs, b_dofs)], K_ij[np.ix_(b_dofs, i_dofs)]
+    X_ib = -np.linalg.solve(K_ij[np.ix_(i_dofs, i_dofs)], K_bi.T)
+    return K_bb + K_bi @ X_ib, X_ib, i_dofs
+
+
+def rotate_nodal_blocks(K_ij, R_cab):
+    '''Matrices K_cij of the cells rotated by R_cab obtained from the matrix
+    K_ij with three translational dofs per node
+    '''
+    n_I = len(K_ij) // 3
+    K_IkJl = K_ij.reshape(n_I, 3, n_I, 3)
+    return np.einsum('cak,IkJl,cbl->cIaJb', R_cab, K_IkJl, R_cab,
+                     optimize=True).reshape(len(R_cab), len(K_ij), len(K_ij))
+
+
+def rotate_nodal_vectors(U_i, R_cab):
+    '''Vectors U_ci of the cells (three translational dofs per node) rotated
+    by R_cab, the transposed rotations map back to the reference cell
+    '''
+    n_c = len(R_cab)
+    return np.einsum('cab,cIb->cIa', R_cab, U_i.reshape(n_c, -1, 3)).reshape(n_c, -1)
@@ -0,0 +1,79 @@
+'''
+Reduction of mirror symmetric meshes to the half or quarter model.
+
+The symmetry planes are perpendicular to the coordinate axes and pass
+through the center of the bounding box of the mesh. Each node and facet
+of the full mesh is the image of a node or facet of the reduced model,
+with the centroid on the positive side of all planes, under one of the
+mirrorings M_g of the group G generated by the planes. The facets of
+the waterbomb cells crossing a plane are mapped onto themselves, their
+nodes on the negative side are represented by their mirror images.
+
+For symmetric loads, the solution of the full model restricted to the
+symmetric displacements U_I = M_g U_r reduces to the system of the
+facets of the reduced model. The quantities of the nodes and facets
+with a smaller orbit (on or crossing the planes) are weighted by
+orbit / |G|. The displacement components of the nodes on a plane
+perpendicular to it vanish.
+
+Indices: I - node, r - node of the reduced model, E - facet, i - facet
+node, g - mirroring, a, b - dimension
+'''
+
+import itertools
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def get_mirror_matrices(axes):
+    '''Mirroring matrices M_gab of the group generated by the planes
+    perpendicular to the axes, the identity first
+    '''
+    M_gab = []
+    for n_mirrored in range(len(axes) + 1):
+        for mirrored in itertools.combinations(axes, n_mirrored):
+            M_ab = np.identity(3)
+            M_ab[list(mirrored), list(mirrored)] = -1
+            M_gab.append(M_ab)
+    return np.array(M_gab)
+
+
+def get_symmetry_map(X_Ia, I_Ei, axes, rel_tol=1e-6):
+    '''Reduced model of the mesh X_Ia, I_Ei symmetric with respect to the
+    planes perpendicular to the axes. Returns the nodes I_r and the facets
+    E_r of the reduced model with the weights w_r and w_E, the reduced node
+    r_I and the mirroring M_Iab of each node of the full mesh (r_I = -1 for
+    the nodes without facets) and the flags fixed_ra of the displacement
+    components of the reduced nodes fixed by the symmetry.
+    '''
+    X_Ia, I_Ei = np.asarray(X_Ia), np.asarray(I_Ei)
+    axes = list(axes)
+    X_used = X_Ia[np.unique(I_Ei)]
+    tol = rel_tol * np.max(np.ptp(X_used, axis=0))
+    X_c = (np.min(X_used, axis=0) + np.max(X_used, axis=0)) / 2
+    M_gab = get_mirror_matrices(axes)
+    # the orbit of a point has 2 ** n images for n planes not containing the point
+    d_Ea = np.mean(X_Ia[I_Ei], axis=1)[:, axes] - X_c[axes]
+    E_r = np.where(np.all(d_Ea > -tol, axis=1))[0]
+    orbit_E = 2 ** np.sum(d_Ea[E_r] > tol, axis=1)
+    if np.sum(orbit_E) != len(I_Ei):
+        raise ValueError('the mesh is not symmetric')
+    d_Ia = X_Ia[:, axes] - X_c[axes]
+    I_r = np.intersect1d(np.where(np.all(d_Ia > -tol, axis=1))[0], np.unique(I_Ei))
+    orbit_r = 2 ** np.sum(d_Ia[I_r] > tol, axis=1)
+    # images of the reduced nodes
+    d_gr, I_gr = cKDTree(X_Ia).query(
+        (np.einsum('gab,rb->gra', M_gab, X_Ia[I_r] - X_c) + X_c).reshape(-1, 3), workers=-1)
+    I_gr = I_gr.reshape(len(M_gab), -1)
+    r_I = np.full(len(X_Ia), -1)
+    g_I = np.zeros(len(X_Ia), dtype=np.int_)
+    # the identity is assigned last
+    for g in range(len(M_gab))[::-1]:
+        r_I[I_gr[g]], g_I[I_gr[g]] = np.arange(len(I_r)), g
+    if np.max(d_gr) > tol or np.any(r_I[np.unique(I_Ei)] < 0):
+        raise ValueError('the mesh is not symmetric')
+    fixed_ra = np.zeros((len(I_r), 3), dtype=np.bool_)
+    fixed_ra[:, axes] = np.fabs(d_Ia[I_r]) <= tol
+    n_G = len(M_gab)
+    return I_r, orbit_r / n_G, E_r, orbit_E / n_G, r_I, M_gab[g_I], fixed_ra
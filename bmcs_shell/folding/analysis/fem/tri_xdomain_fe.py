@@ -225,9 +225,19 @@ class TriXDomainFE(XDomainFE):
         B_Eso = np.einsum('soE,E->Eso', B_soE, 1 / det_J_E)
         return B_Eso, det_J_E
 
+    strain_operator = tr.Property
+    '''Strain operator B_Empf of the element dofs o_Ef in the global frame
+    with the weights w_Em of the single integration point (matrix-free solver)
+    '''
+
+    def _get_strain_operator(self):
+        B_Eso, det_J_E = self.B_Eso
+        n_E = len(B_Eso)
+        B_Esia = np.einsum('Esie,Eea->Esia', B_Eso.reshape(n_E, 3, 3, 2), self.T_Fab[:, :2, :])
+        w_Em = (self.integ_factor * det_J_E / 2)[:, np.newaxis]
+        return B_Esia.reshape(n_E, 1, 3, 9), w_Em, self.o_Eia.reshape(n_E, -1)
+
     def map_U_to_field(self, U_o):
-        print('')
-        print('U_o,', U_o)
         U_Eia = U_o[self.o_Eia]
         # coordinate transform to local
         u_Eia = self.xU2u(U_Eia)
@@ -237,7 +247,6 @@ class TriXDomainFE(XDomainFE):
             'Eso,Eo->Es',
             B_Eso, u_Eo
         )
-        print('eps_Eso,', eps_Eso)
         return eps_Eso
 
     def map_field_to_F(self, sig_Es):
@@ -268,7 +277,6 @@ class TriXDomainFE(XDomainFE):
         K_Eij = K_Eicjd.reshape(-1, n_i * n_c, n_j * n_d)
         o_Ei = self.o_Eia.reshape(-1, n_i * n_c)
         # print('K_Eij:', K_Eij)
-        print('o_Ei:', o_Ei)
         return SysMtxArray(mtx_arr=K_Eij, dof_map_arr=o_Ei)
 
 
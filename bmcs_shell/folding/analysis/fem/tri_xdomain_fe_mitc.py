@@ -11,6 +11,8 @@
 # c: coordinates (x, y, z)
 # d: coordinates (x, y, z)
 
+import hashlib
+
 import traits.api as tr
 from ibvpy.mathkit.tensor import DELTA23_ab
 import numpy as np
@@ -26,11 +28,11 @@ INPUT = '+cp_input'
 
 
 # Kronecker delta
-DELTA = np.zeros((3, 3,), dtype='f')
+DELTA = np.zeros((3, 3,), dtype=np.float_)
 DELTA[(0, 1, 2), (0, 1, 2)] = 1
 
 # Levi Civita symbol
-EPS = np.zeros((3, 3, 3), dtype='f')
+EPS = np.zeros((3, 3, 3), dtype=np.float_)
 EPS[(0, 1, 2), (1, 2, 0), (2, 0, 1)] = 1
 EPS[(2, 1, 0), (1, 0, 2), (0, 2, 1)] = -1
 
@@ -53,6 +55,19 @@ class TriXDomainMITC(XDomainFE):
 
     change = tr.Event(GEO=True)
 
+    geometry_key = tr.Any(GEO=True)
+    '''Nodes, facets and thickness of the cached kinematic operators,
+    a new key invalidates them'''
+
+    def check_geometry(self):
+        '''Update the geometry key if the nodes, the facets or the thickness
+        differ from those of the cached kinematic operators
+        '''
+        X_Id = np.ascontiguousarray(self.mesh.X_Id, dtype=np.float_)
+        I_Fi = np.ascontiguousarray(self.mesh.I_Fi)
+        self.geometry_key = (X_Id.shape, I_Fi.shape, self.fets.a,
+                             hashlib.sha1(X_Id).digest(), hashlib.sha1(I_Fi).digest())
+
     plot_backend = 'k3d'
 
     n_dofs = tr.Property
@@ -260,16 +275,18 @@ class TriXDomainMITC(XDomainFE):
     #     dN_dr_Emrco[..., :, [4, 9, 14]] = N5_Fmrai
     #     return dN_dr_Emrco
 
-    B_Emiabo = tr.Property(depends_on='+GEO')
-    # @tr.cached_property
+    B_Emiabo = tr.Property
+    '''Kinematic operator of the strain tensor and the Jacobian determinant,
+    evaluated once per geometry by the cached B_Empf
+    '''
     def _get_B_Emiabo(self):
-        delta35_co = np.zeros((3, 5), dtype='f')
+        delta35_co = np.zeros((3, 5), dtype=np.float_)
         delta35_co[(0, 1, 2), (0, 1, 2)] = 1
-        delta25_vo = np.zeros((2, 5), dtype='f')
+        delta25_vo = np.zeros((2, 5), dtype=np.float_)
         delta25_vo[(0, 1), (3, 4)] = 1
 
         _, v1_Fid, v2_Fid = self.v_vectors
-        V_Ficv = np.zeros((*v2_Fid.shape, 2), dtype='f')
+        V_Ficv = np.zeros((*v2_Fid.shape, 2), dtype=np.float_)
         # TODO, one of these maybe should be multiplied with -1 and they might need to be flipped, see x formula
         V_Ficv[..., 0] = v1_Fid
         V_Ficv[..., 1] = -v2_Fid
@@ -289,21 +306,25 @@ class TriXDomainMITC(XDomainFE):
 
         inv_J_Fmrd = np.linalg.inv(J_Fmrd)
         det_J_Fm = np.linalg.det(J_Fmrd)
-        B1_Emiabo = np.einsum('abcd, imr, co, Emrd -> Emiabo', Diff1_abcd, dN_imr, delta35_co, inv_J_Fmrd)
+        B1_Emiabo = np.einsum('abcd, imr, co, Emrd -> Emiabo', Diff1_abcd, dN_imr, delta35_co, inv_J_Fmrd,
+                              optimize=True)
         B2_Emiabo = np.einsum('abcd, imr, Eicv, vo, Emrd -> Emiabo', Diff1_abcd, dNt_imr, 0.5 * a * V_Ficv, delta25_vo,
-                              inv_J_Fmrd)
+                              inv_J_Fmrd, optimize=True)
         B_Emiabo = B1_Emiabo + B2_Emiabo
 
         # B_Emiabo = np.flip(B_Emiabo, 2)
 
         return B_Emiabo, det_J_Fm
 
-    B_Empf = tr.Property(depends_on='+GEO')
-    # @tr.cached_property
-    def _get_B_Empf(self):
+    kinematics = tr.Property(depends_on='+GEO')
+    '''Cached strain operator B_Empf and Jacobian determinants det_J_Fm,
+    call check_geometry to invalidate them after a change of the mesh
+    '''
+    @tr.cached_property
+    def _get_kinematics(self):
         # TODO: here we're eliminating eps_33 because this is the assumption for shell (for eps IN ELEMENT LEVEL)
         #  therefore, B_Empf must be already converted to element coords system and not using the global one
-        B_Emiabo, _ = self.B_Emiabo
+        B_Emiabo, det_J_Fm = self.B_Emiabo
         # Mapping ab to p (3x3 -> 5)
         B_Emipo = B_Emiabo[:, :, :, (0, 1, 0, 1, 2), (0, 1, 1, 2, 0), :]
         # What follows is to adjust shear strains: [e_xx, e_yy, e_xy + e_yx, e_yz + e_zy, e_zx + e_xz]
@@ -312,10 +333,28 @@ class TriXDomainMITC(XDomainFE):
 
         E, m, i, p, o = B_Emipo.shape
         B_Empio = np.einsum('Emipo->Empio', B_Emipo)
-        B_Empf = B_Empio.reshape((E, m, p, i * o))
+        B_Empf = np.ascontiguousarray(B_Empio.reshape((E, m, p, i * o)))
         # p: index with max value 5
         # f: index with max value 15
-        return B_Empf
+        return B_Empf, det_J_Fm
+
+    B_Empf = tr.Property
+
+    def _get_B_Empf(self):
+        return self.kinematics[0]
+
+    det_J_Fm = tr.Property
+
+    def _get_det_J_Fm(self):
+        return self.kinematics[1]
+
+    o_Ef = tr.Property(depends_on='+GEO')
+    '''Dofs of the elements'''
+    @tr.cached_property
+    def _get_o_Ef(self):
+        n_o = self.fets.n_nodal_dofs
+        o_Eio = self.mesh.dof_offset + self.F_N[..., np.newaxis] * n_o + np.arange(n_o)
+        return o_Eio.reshape(-1, 3 * n_o)
 
     # Transformation matrix, see P. 475 (Zienkiewicz FEM book)
     def get_theta(self):
@@ -344,7 +383,7 @@ class TriXDomainMITC(XDomainFE):
         v2_Fmd = self._normalize(V2_Fmd)
         v3_Fmd = self._normalize(V3_Fmd)
 
-        theta_Fmdj = np.zeros((*v1_Fmd.shape, 3), dtype='f')
+        theta_Fmdj = np.zeros((*v1_Fmd.shape, 3), dtype=np.float_)
         theta_Fmdj = np.einsum('Fmdj->Fmjd', theta_Fmdj)
         theta_Fmdj[..., 0, :] = v1_Fmd
         theta_Fmdj[..., 1, :] = v2_Fmd
@@ -357,53 +396,38 @@ class TriXDomainMITC(XDomainFE):
         # U_io = np.array([[1, 0, 0, 0, 0],
         #                  [0, 0, 0.5, 0, 0],
         #                  [0, 1, 0, 0, 0]], dtype=np.float_)
-        print('U_o:', U_o)
-
-        # TODO: check if the transformation caused by following line is needed
-        # U_Eio = U_o[self.o_Eia]
-        U_Eio = U_o.reshape((-1, self.fets.n_nodal_dofs))[self.F_N]
-
-        B_Emiabo, _ = self.B_Emiabo
-
-        eps_Emab = np.einsum('Emiabo, Eio -> Emab', B_Emiabo, U_Eio)
-        eps_Emp = eps_Emab[:, :, (0, 1, 0, 1, 2), (0, 1, 1, 2, 0)]
-
-        # What follows is to adjust shear strains: [e_xx, e_yy, e_xy + e_yx, e_yz + e_zy, e_zx + e_xz]
-        eps_Emp[:, :, 2:] = eps_Emp[:, :, 2:] + eps_Emab[:, :, (1, 2, 0), (0, 1, 2)]
-        # eps_Emp[:, :, 2:] = 2 * eps_Emp[:, :, 2:]
-
-        return eps_Emp
+        self.check_geometry()
+        # strains [e_xx, e_yy, e_xy + e_yx, e_yz + e_zy, e_zx + e_xz]
+        U_Ef = U_o[self.o_Ef]
+        return np.einsum('Empf, Ef -> Emp', self.B_Empf, U_Ef)
 
     def map_field_to_F(self, sig_Ems):
         # print('map_field_to_F')
-        print('sig_Es', sig_Ems)
-
-        _, det_J_Fm = self.B_Emiabo
-
-        f_Emf = self.integ_factor * np.einsum('m, Emsf, Ems, Em -> Emf', self.fets.w_m, self.B_Empf, sig_Ems, det_J_Fm)
-        f_Ef = np.sum(f_Emf, axis=1)
-
-        # o_Ei = self.o_Eia.reshape(-1, 3 * 5)
-        # print('o_Ei:', o_Ei)
-        o_Ei = self.o_Ia[self.F_N].reshape(-1, 3 * self.fets.n_nodal_dofs)
+        self.check_geometry()
+        f_Ef = self.integ_factor * np.einsum('m, Emsf, Ems, Em -> Ef', self.fets.w_m, self.B_Empf, sig_Ems,
+                                             self.det_J_Fm, optimize=True)
+        return self.o_Ef.flatten(), f_Ef.flatten()
+
+    strain_operator = tr.Property
+    '''Strain operator B_Empf of the element dofs o_Ef with the weights w_Em
+    of the integration points (matrix-free solver)
+    '''
 
-        return o_Ei.flatten(), f_Ef.flatten()
+    def _get_strain_operator(self):
+        self.check_geometry()
+        w_Em = self.integ_factor * self.fets.w_m[np.newaxis, :] * self.det_J_Fm
+        return self.B_Empf, w_Em, self.o_Ef
 
     def map_field_to_K(self, D_Est):
         # print('map_field_to_K')
+        self.check_geometry()
         w_m = self.fets.w_m  # Gauss points weights
-        _, det_J_Fm = self.B_Emiabo
-
         B_Empf = self.B_Empf
-        k2_Emop = self.integ_factor * np.einsum('m, Empf, Ept, Emtq, Em -> Emfq', w_m, B_Empf, D_Est, B_Empf,
-                                                   det_J_Fm)
-        k2_Eop = np.sum(k2_Emop, axis=1)
-
-        # o_Ei = self.o_Eia.reshape(-1, 3 * 5)
-        # print('o_Ei:', o_Ei)
-        o_Ei = self.o_Ia[self.F_N].reshape(-1, 3 * self.fets.n_nodal_dofs)
-
-        return SysMtxArray(mtx_arr=k2_Eop, dof_map_arr=o_Ei)
+        # weighted operator, the material matrix is constant or given per element
+        wB_Empf = np.einsum('m, Em, Empf -> Empf', self.integ_factor * w_m, self.det_J_Fm, B_Empf)
+        DB_Emtq = np.einsum('Ept, Emtq -> Empq', D_Est, B_Empf)
+        k2_Eop = np.einsum('Empf, Empq -> Efq', wB_Empf, DB_Emtq, optimize=True)
+        return SysMtxArray(mtx_arr=k2_Eop, dof_map_arr=self.o_Ef)
 
     # O_Eo = tr.Property(tr.Array, depends_on='X, L, F')
     # @tr.cached_property
@@ -413,7 +437,7 @@ class TriXDomainMITC(XDomainFE):
     # =========================================================================
     # Property operators for initial configuration
     # =========================================================================
-    F0_normals_Fk = tr.Property(tr.Array, depends_on='X, L, F')
+    F0_normals_Fk = tr.Property(tr.Array, depends_on='+GEO')
     r'''Normals of the facets in the initial state (before reordering indices).'''
     @tr.cached_property
     def _get_F0_normals_Fk(self):
@@ -432,7 +456,7 @@ class TriXDomainMITC(XDomainFE):
         r_deta_Fmdr = np.einsum('mri, Fid->Fmdr', dh_mri, X_Fid)
         return np.einsum('Fmi,Fmj,ijk->Fmk', r_deta_Fmdr[..., 0], r_deta_Fmdr[..., 1], EPS)
 
-    sign_normals_F = tr.Property(tr.Array, depends_on='X,L,F')
+    sign_normals_F = tr.Property(tr.Array, depends_on='+GEO')
     r'''Orientation of the normal in the initial state.
     This array is used to switch the normal vectors of the faces
     to be oriented in the positive sense of the z-axis.
@@ -442,7 +466,7 @@ class TriXDomainMITC(XDomainFE):
         # TODO: this takes the sign of the z component of the normal, in 3d this could be not sufficient
         return np.sign(self.F0_normals_Fk[:, 2])
 
-    norm_F_normals = tr.Property(tr.Array, depends_on=INPUT)
+    norm_F_normals = tr.Property(tr.Array, depends_on='+GEO')
     r'''Get the normed normals of the facets after reordering F indices.'''
     @tr.cached_property
     def _get_norm_F_normals(self):
@@ -451,7 +475,7 @@ class TriXDomainMITC(XDomainFE):
         mag_n = np.sqrt(np.einsum('...i,...i', n_Fk, n_Fk))
         return n_Fk / mag_n[:, np.newaxis]
 
-    F_N = tr.Property(tr.Array, depends_on='X,L,F')
+    F_N = tr.Property(tr.Array, depends_on='+GEO')
     r'''Counter-clockwise enumeration.'''
     @tr.cached_property
     def _get_F_N(self):
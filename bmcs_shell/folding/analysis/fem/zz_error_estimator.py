@@ -0,0 +1,95 @@
+'''
+Recovery based (Zienkiewicz-Zhu) error indicator of the constant strain
+triangles.
+
+The element stresses are transformed from the local element frames into
+global tensors and averaged at the nodes weighted by the element areas.
+The averaging is done separately for each plane of the folded surface,
+so that the stress jumps at the creases are not smoothed out. The error
+of an element is the energy norm of the difference between the linear
+interpolation of the recovered nodal stresses and the constant element
+stress, integrated exactly by the edge midpoint rule.
+
+Indices: I - node, a, b - dimension, E - element, i - element node,
+m - edge midpoint, s, t - stress component (xx, yy, xy), P - plane
+'''
+
+import numpy as np
+
+
+def get_plane_labels(X_Ia, I_Ei, tol=1e-6):
+    '''Labels of the planes of the elements I_Ei, elements with normals
+    parallel within the tolerance tol share the label
+    '''
+    X_Eia = X_Ia[I_Ei]
+    n_Ea = np.cross(X_Eia[:, 1] - X_Eia[:, 0], X_Eia[:, 2] - X_Eia[:, 0])
+    n_Ea /= np.linalg.norm(n_Ea, axis=-1)[:, np.newaxis]
+    # orientation independent: the first significant component is positive
+    a_E = np.argmax(np.fabs(n_Ea) > tol, axis=1)
+    n_Ea *= np.sign(n_Ea[np.arange(len(n_Ea)), a_E])[:, np.newaxis]
+    _, P_E = np.unique(np.round(n_Ea / tol).astype(np.int64), axis=0, return_inverse=True)
+    return P_E.ravel()
+
+
+def get_flat_nodes(X_Ia, I_Ei):
+    '''Nodes with all elements in one plane and the unit normals of the plane,
+    the membrane elements have no stiffness perpendicular to it
+    '''
+    P_E = get_plane_labels(X_Ia, I_Ei)
+    P_Ei = np.repeat(P_E[:, np.newaxis], 3, axis=1)
+    P_min = np.full(len(X_Ia), np.max(P_E) + 1)
+    np.minimum.at(P_min, I_Ei.ravel(), P_Ei.ravel())
+    P_max = np.full(len(X_Ia), -1)
+    np.maximum.at(P_max, I_Ei.ravel(), P_Ei.ravel())
+    I_flat = np.where(P_min == P_max)[0]
+    X_Eia = X_Ia[I_Ei]
+    n_Ea = np.cross(X_Eia[:, 1] - X_Eia[:, 0], X_Eia[:, 2] - X_Eia[:, 0])
+    n_Ea /= np.linalg.norm(n_Ea, axis=-1)[:, np.newaxis]
+    E_I = np.zeros(len(X_Ia), dtype=np.int_)
+    E_I[I_Ei.ravel()] = np.repeat(np.arange(len(I_Ei)), 3)
+    return I_flat, n_Ea[E_I[I_flat]]
+
+
+def get_zz_error(X_Ia, I_Ei, T_Eab, sig_Es, C_st, thickness=1.0):
+    '''Squared energy norms of the error e2_E and of the solution u2_E of the
+    elements I_Ei with the local bases T_Eab (rows), the constant stresses
+    sig_Es (xx, yy, xy) in the local frames and the compliance matrix C_st
+    '''
+    X_Eia = X_Ia[I_Ei]
+    A_E = np.linalg.norm(np.cross(X_Eia[:, 1] - X_Eia[:, 0], X_Eia[:, 2] - X_Eia[:, 0]), axis=-1) / 2
+    n_E = len(I_Ei)
+    sig_Eab = np.zeros((n_E, 3, 3))
+    sig_Eab[:, 0, 0], sig_Eab[:, 1, 1] = sig_Es[:, 0], sig_Es[:, 1]
+    sig_Eab[:, 0, 1] = sig_Eab[:, 1, 0] = sig_Es[:, 2]
+    sig_Eab = np.einsum('Eca,Ecd,Edb->Eab', T_Eab, sig_Eab, T_Eab)
+    # area weighted nodal averages of each plane
+    P_E = get_plane_labels(X_Ia, I_Ei)
+    key_Ei = I_Ei.astype(np.int64) * (np.max(P_E) + 1) + P_E[:, np.newaxis]
+    _, k_Ei = np.unique(key_Ei, return_inverse=True)
+    k_Ei = k_Ei.reshape(n_E, 3)
+    n_k = np.max(k_Ei) + 1
+    A_Ei = np.repeat(A_E[:, np.newaxis], 3, axis=1)
+    A_k = np.bincount(k_Ei.ravel(), weights=A_Ei.ravel(), minlength=n_k)
+    sig_kab = np.zeros((n_k, 9))
+    Asig_Eiab = (A_Ei[..., np.newaxis] * sig_Eab.reshape(n_E, 1, 9))
+    for ab in range(9):
+        sig_kab[:, ab] = np.bincount(k_Ei.ravel(), weights=Asig_Eiab[..., ab].ravel(), minlength=n_k)
+    sig_kab = (sig_kab / A_k[:, np.newaxis]).reshape(n_k, 3, 3)
+    # recovered minus element stress at the edge midpoints, in the local frames
+    rec_Eiab = sig_kab[k_Ei]
+    dsig_Emab = (rec_Eiab + np.roll(rec_Eiab, -1, axis=1)) / 2 - sig_Eab[:, np.newaxis]
+    dsig_Emab = np.einsum('Eac,Emcd,Ebd->Emab', T_Eab, dsig_Emab, T_Eab)
+    dsig_Ems = np.stack([dsig_Emab[..., 0, 0], dsig_Emab[..., 1, 1], dsig_Emab[..., 0, 1]], axis=-1)
+    e2_E = thickness * A_E / 3 * np.einsum('Ems,st,Emt->E', dsig_Ems, C_st, dsig_Ems)
+    u2_E = thickness * A_E * np.einsum('Es,st,Et->E', sig_Es, C_st, sig_Es)
+    return e2_E, u2_E
+
+
+def mark_bulk(e2_E, theta=0.5):
+    '''Indices of the smallest set of elements with the largest errors
+    contributing the fraction theta of the total squared error (Doerfler marking)
+    '''
+    E_sorted = np.argsort(e2_E)[::-1]
+    e2_cum = np.cumsum(e2_E[E_sorted])
+    n_marked = np.searchsorted(e2_cum, theta * e2_cum[-1]) + 1
+    return E_sorted[:n_marked]
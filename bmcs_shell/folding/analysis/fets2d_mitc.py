@@ -21,7 +21,7 @@ class FETS2DMITC(FETSEval):
     # Surface integrals using numerical integration
     # =========================================================================
     # j is gauss point index, p is point coords in natural coords (zeta_1, zeta_2, zeta_3)
-    eta_jp = tr.Array('float_')
+    eta_jp = tr.Array(np.float_)
     r'''Integration points within a triangle.
     '''
 
@@ -31,15 +31,14 @@ class FETS2DMITC(FETSEval):
         # and t along thickness
         # 2 Gauss points along thickness t
         # 7 Gauss points on the plane of the element
-        return np.array([[1. / 3., 1. / 3., 1. / 3.]], dtype='f') # should be return np.array([[1. / 3., 1. / 3., 0]], dtype='f')
+        return np.array([[1. / 3., 1. / 3., 1. / 3.]], dtype=np.float_) # should be return np.array([[1. / 3., 1. / 3., 0]], dtype='f')
 
 
-    w_m = tr.Array('float_')
+    w_m = tr.Array(np.float_)
     r'''Weight factors for numerical integration.'''
 
     def _w_m_default(self):
-        print('w_m called!!')
-        return np.array([1], dtype='f')
+        return np.array([1], dtype=np.float_)
 
     # TODO, different node thickness in each node according to the original
     #  implementation can be easily integrated, but here the same thickness
@@ -70,7 +69,6 @@ class FETS2DMITC(FETSEval):
         dh_mri = np.tile(dh_ri, (self.n_m, 1, 1))
 
         # dh_mri = np.flip(dh_mri, 2)
-        print('dh_imr called!')
         return np.einsum('mri->imr', dh_mri)
 
     dht_imr = tr.Property(depends_on='eta_jp')
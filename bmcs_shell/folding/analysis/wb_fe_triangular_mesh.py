@@ -1,11 +1,14 @@
 import traits.api as tr
 import bmcs_utils.api as bu
 from bmcs_shell.folding.analysis.fem.fe_triangular_mesh import FETriangularMesh
+from bmcs_shell.folding.analysis.fem.graded_mesh import get_graded_mesh, get_uniform_n_elems
+from bmcs_shell.folding.analysis.fem.node_renumbering import get_rcm_order, renumber_mesh
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
 from bmcs_shell.folding.geometry.wb_shell_geometry import WBShellGeometry4P
-import pygmsh
 import numpy as np
 import k3d
-import gmsh
+from bmcs_shell.folding.utils.mesh_cache import MeshCache
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
 
 class WBShellFETriangularMesh(FETriangularMesh):
     """Directly mapped mesh with one-to-one mapping
@@ -31,45 +34,181 @@ class WBShellFETriangularMesh(FETriangularMesh):
         *FETriangularMesh.ipw_view.content,
         bu.Item('subdivision'),
         bu.Item('direct_mesh'),
+        bu.Item('reuse_cell_mesh'),
+        bu.Item('uniform_subdivision'),
+        bu.Item('graded_refinement'),
+        bu.Item('crease_refinement'),
+        bu.Item('grading'),
+        bu.Item('renumber_nodes'),
         bu.Item('export_vtk'),
         bu.Item('show_wireframe'),
     )
 
+    reuse_cell_mesh = bu.Bool(False, DSC=True)
+    '''Mesh a single cell and instantiate its mesh into all cells of
+    the tessellation instead of meshing the whole tessellation.
+    '''
+
+    uniform_subdivision = bu.Bool(False, DSC=True)
+    '''Split each facet into subdivision x subdivision triangles without gmsh,
+    the nodes of the geometry keep their numbers so that the supports
+    and loads given at the geometry nodes apply to the refined mesh.
+    '''
+
+    subdivision_mesh = tr.Property(depends_on='state_changed')
+
+    @tr.cached_property
+    def _get_subdivision_mesh(self):
+        return get_subdivision_mesh(self.geo.X_Ia, self.geo.I_Fi, max(int(self.subdivision), 1))
+
+    graded_refinement = bu.Bool(False, DSC=True)
+    '''Refine the facets towards the crease lines and the fixed nodes
+    from mesh_size / crease_refinement at the creases to mesh_size.
+    '''
+
+    crease_refinement = bu.Float(4, DSC=True)
+
+    grading = bu.Float(0.5, DSC=True)
+    '''Growth of the element size with the distance from the creases'''
+
+    graded_mesh = tr.Property(depends_on='state_changed')
+
+    @tr.cached_property
+    def _get_graded_mesh(self):
+        geo = self.geo
+        X_Ia, I_Fi = geo.X_Ia, geo.I_Fi
+        I_Li = np.vstack([geo.I_V_Li, geo.I_M_Li])
+        # creases of the trimmed facets are skipped
+        I_Li = I_Li[np.all(np.isin(I_Li, I_Fi), axis=1)]
+        return get_graded_mesh(X_Ia, I_Fi, X_Ia[I_Li], self.mesh_size / self.crease_refinement,
+                               self.mesh_size, self.grading, X_Sa=X_Ia[self.bc_fixed_nodes])
+
+    n_elems_uniform = tr.Property(depends_on='state_changed')
+    '''Number of elements of the uniform refinement to the crease element size'''
+
+    def _get_n_elems_uniform(self):
+        return get_uniform_n_elems(self.geo.X_Ia, self.geo.I_Fi, self.mesh_size / self.crease_refinement)
+
+    mesh_size = tr.Property(depends_on='state_changed')
+
+    def _get_mesh_size(self):
+        X_Id = self.geo.X_Ia
+        return np.linalg.norm(X_Id[1] - X_Id[0]) / self.subdivision
+
+    mesh_cache = tr.Instance(MeshCache)
+    '''Optional disk cache of the gmsh meshes shared by the sessions
+    and worker processes, the hits are served without running gmsh.
+    '''
+
     mesh = tr.Property(depends_on='state_changed')
 
     @tr.cached_property
     def _get_mesh(self):
+        return generate_gmsh_mesh(self.geo.X_Ia, self.geo.I_Fi, self.mesh_size)
 
-        X_Id = self.geo.X_Ia
-        I_Fi = self.geo.I_Fi
-        mesh_size = np.linalg.norm(X_Id[1] - X_Id[0]) / self.subdivision
-
-        with pygmsh.geo.Geometry() as geom:
-            xpoints = np.array([
-                geom.add_point(X_d, mesh_size=mesh_size) for X_d in X_Id
-            ])
-            for I_i in I_Fi:
-                # Create points.
-
-                Facet(geom, xpoints[I_i])
-            #                geom.add_polygon(X_id, mesh_size=mesh_size)
-            gmsh.model.geo.remove_all_duplicates()
-            mesh = geom.generate_mesh()
-        return mesh
+    def _get_cached_mesh(self, generate, X_Id, I_Fi, mode):
+        if self.mesh_cache is None:
+            return generate()
+        arrays = self.mesh_cache.get_or_create(
+            lambda: dict(zip(('X_Id', 'I_Fi'), generate())),
+            X_Id=np.asarray(X_Id, dtype=np.float_), I_Fi=np.asarray(I_Fi, dtype=np.int_),
+            mesh_size=float(self.mesh_size), mode=mode)
+        return arrays['X_Id'], arrays['I_Fi']
+
+    gmsh_mesh = tr.Property(depends_on='state_changed')
+    '''Nodes and triangles of the mesh of the whole tessellation'''
+
+    @tr.cached_property
+    def _get_gmsh_mesh(self):
+        def generate():
+            return np.array(self.mesh.points, dtype=np.float_), self.mesh.cells[0].data
+        return self._get_cached_mesh(generate, self.geo.X_Ia, self.geo.I_Fi, 'tessellation')
+
+    cell_mesh = tr.Property(depends_on='state_changed')
+    '''Nodes and triangles of the mesh of a single cell'''
+
+    @tr.cached_property
+    def _get_cell_mesh(self):
+        wb_cell = self.geo.wb_cell
+
+        def generate():
+            mesh = generate_gmsh_mesh(wb_cell.X_Ia, wb_cell.I_Fi, self.mesh_size)
+            return np.array(mesh.points, dtype=np.float_), mesh.get_cells_type('triangle')
+        return self._get_cached_mesh(generate, wb_cell.X_Ia, wb_cell.I_Fi, 'cell')
+
+    cell_instances_mesh = tr.Property(depends_on='state_changed')
+    '''Nodes and triangles of the cell mesh instantiated into all cells'''
+
+    @tr.cached_property
+    def _get_cell_instances_mesh(self):
+        geo = self.geo
+        _, idx_remap = geo.unique_node_map
+        X_cell_Na, I_cell_Ti = self.cell_mesh
+        # facets of the cells remaining after trimming
+        F_cfi, I_Fi = geo.F_cfi, geo.I_Fi
+        n_I = np.int64(len(geo.X_Ia))
+        key_cf = _get_facet_keys(F_cfi, n_I)
+        F_keep_cf = np.isin(key_cf, _get_facet_keys(I_Fi, n_I))
+        return instantiate_cell_mesh(geo.X_Ia, idx_remap.reshape(geo.n_cells, -1),
+                                     geo.wb_cell.X_Ia, geo.wb_cell.I_Fi,
+                                     X_cell_Na, I_cell_Ti, F_keep_cf)
+
+    def get_unnumbered_mesh(self):
+        '''Nodes and facets of the selected mesh before the renumbering'''
+        if self.direct_mesh:
+            return self.geo.X_Ia, self.geo.I_Fi
+        if self.graded_refinement:
+            return self.graded_mesh
+        if self.uniform_subdivision:
+            return self.subdivision_mesh
+        if self.reuse_cell_mesh:
+            return self.cell_instances_mesh
+        return self.gmsh_mesh
+
+    renumber_nodes = bu.Bool(False, DSC=True)
+    '''Renumber the nodes by the reverse Cuthill-McKee ordering reducing
+    the bandwidth of the stiffness matrix. The node numbers of the
+    supports and loads are mapped by node_map.
+    '''
+
+    renumbered_mesh = tr.Property(depends_on='state_changed')
+
+    @tr.cached_property
+    def _get_renumbered_mesh(self):
+        X_Id, I_Fi = self.get_unnumbered_mesh()
+        X_Id, I_Fi = np.asarray(X_Id), np.asarray(I_Fi)
+        return renumber_mesh(X_Id, I_Fi, get_rcm_order(I_Fi, len(X_Id)))
+
+    node_map = tr.Property
+    '''Numbers of the nodes of the mesh before the renumbering (for the
+    direct, subdivided and graded meshes the nodes of the geometry)
+    in the mesh
+    '''
+
+    def _get_node_map(self):
+        if self.renumber_nodes:
+            return self.renumbered_mesh[2]
+        return np.arange(len(self.X_Id))
+
+    def map_dofs(self, dofs):
+        '''Dofs of the mesh before the renumbering mapped to the mesh'''
+        n_o = self.n_nodal_dofs
+        dofs = np.asarray(dofs, dtype=np.int_)
+        return self.node_map[dofs // n_o] * n_o + dofs % n_o
 
     X_Id = tr.Property
 
     def _get_X_Id(self):
-        if self.direct_mesh:
-            return self.geo.X_Ia
-        return np.array(self.mesh.points, dtype=np.float_)
+        if self.renumber_nodes:
+            return self.renumbered_mesh[0]
+        return self.get_unnumbered_mesh()[0]
 
     I_Fi = tr.Property
 
     def _get_I_Fi(self):
-        if self.direct_mesh:
-            return self.geo.I_Fi
-        return self.mesh.cells[0].data
+        if self.renumber_nodes:
+            return self.renumbered_mesh[1]
+        return self.get_unnumbered_mesh()[1]
 
     bc_fixed_nodes = tr.Array(np.int_, value=[])
     bc_loaded_nodes = tr.Array(np.int_, value=[])
@@ -85,8 +224,8 @@ class WBShellFETriangularMesh(FETriangularMesh):
 
         X_Id = self.X_Id.astype(np.float32)
 
-        fixed_nodes = self.bc_fixed_nodes
-        loaded_nodes = self.bc_loaded_nodes
+        fixed_nodes = self.node_map[self.bc_fixed_nodes]
+        loaded_nodes = self.node_map[self.bc_loaded_nodes]
 
         X_Ma = X_Id[fixed_nodes]
         k3d_fixed_nodes = k3d.points(X_Ma, color=0x22ffff, point_size=100)
@@ -101,13 +240,137 @@ class WBShellFETriangularMesh(FETriangularMesh):
     def update_plot(self, pb):
         super(WBShellFETriangularMesh, self).update_plot(pb)
 
-        fixed_nodes = self.bc_fixed_nodes
-        loaded_nodes = self.bc_loaded_nodes
+        fixed_nodes = self.node_map[self.bc_fixed_nodes]
+        loaded_nodes = self.node_map[self.bc_loaded_nodes]
         X_Id = self.X_Id.astype(np.float32)
         pb.objects['fixed_nodes'].positions = X_Id[fixed_nodes]
         pb.objects['loaded_nodes'].positions = X_Id[loaded_nodes]
 
 
+def generate_gmsh_mesh(X_Id, I_Fi, mesh_size):
+    '''Triangular gmsh mesh of the facets I_Fi with the nodes X_Id
+    '''
+    # imported here so that the gmsh-free meshes work where gmsh cannot be loaded
+    import gmsh
+    import pygmsh
+    with pygmsh.geo.Geometry() as geom:
+        xpoints = np.array([
+            geom.add_point(X_d, mesh_size=mesh_size) for X_d in X_Id
+        ])
+        for I_i in I_Fi:
+            Facet(geom, xpoints[I_i])
+        gmsh.model.geo.remove_all_duplicates()
+        mesh = geom.generate_mesh()
+    return mesh
+
+
+def _get_facet_keys(I_Fi, n_I):
+    I_Fi = np.sort(np.asarray(I_Fi, dtype=np.int64), axis=-1)
+    return (I_Fi[..., 0] * n_I + I_Fi[..., 1]) * n_I + I_Fi[..., 2]
+
+
+def get_barycentric_coords(X_Fia, X_Na):
+    '''Barycentric coordinates lam_NFi of the points X_Na with respect to the
+    triangles X_Fia and the distances d_NF of the points from the triangle planes
+    '''
+    v_1_Fa, v_2_Fa = X_Fia[:, 1] - X_Fia[:, 0], X_Fia[:, 2] - X_Fia[:, 0]
+    d_NFa = X_Na[:, np.newaxis, :] - X_Fia[np.newaxis, :, 0]
+    g_11, g_12, g_22 = (np.einsum('Fa,Fa->F', v_1_Fa, v_1_Fa), np.einsum('Fa,Fa->F', v_1_Fa, v_2_Fa),
+                        np.einsum('Fa,Fa->F', v_2_Fa, v_2_Fa))
+    r_1, r_2 = np.einsum('NFa,Fa->NF', d_NFa, v_1_Fa), np.einsum('NFa,Fa->NF', d_NFa, v_2_Fa)
+    det = g_11 * g_22 - g_12 ** 2
+    lam_1, lam_2 = (g_22 * r_1 - g_12 * r_2) / det, (g_11 * r_2 - g_12 * r_1) / det
+    lam_NFi = np.stack([1 - lam_1 - lam_2, lam_1, lam_2], axis=-1)
+    X_proj_NFa = np.einsum('NFi,Fia->NFa', lam_NFi, X_Fia)
+    return lam_NFi, np.linalg.norm(X_Na[:, np.newaxis, :] - X_proj_NFa, axis=-1)
+
+
+def classify_cell_mesh(X_cell_Ia, I_cell_Fi, X_Na, I_Ti, rel_tol=1e-6):
+    '''Position of the nodes X_Na and triangles I_Ti of the mesh of a cell
+    with the nodes X_cell_Ia and facets I_cell_Fi. Returns the parent facet F_N
+    and the barycentric coordinates lam_Ni of the nodes, the parent facet F_T
+    of the triangles, the cell node i_N coinciding with the mesh node (-1 if none),
+    the cell edge E_N containing the mesh node (-1 if none), the rank k_N of the
+    node along its edge counted from the first edge node, the number of nodes
+    n_E on the interior of each edge and the cell edges I_Ei.
+    '''
+    X_Fia = X_cell_Ia[I_cell_Fi]
+    L = np.max(np.linalg.norm(X_Fia[:, 1:] - X_Fia[:, :1], axis=-1))
+    lam_NFi, d_NF = get_barycentric_coords(X_Fia, X_Na)
+    # closest facet penalizing the barycentric coordinates outside of the facet
+    F_N = np.argmin(d_NF + L * np.maximum(0, -np.min(lam_NFi, axis=-1)), axis=1)
+    N_range = np.arange(len(X_Na))
+    lam_Ni = lam_NFi[N_range, F_N]
+    lam_T, d_TF = get_barycentric_coords(X_Fia, np.mean(X_Na[I_Ti], axis=1))
+    F_T = np.argmin(d_TF + L * np.maximum(0, -np.min(lam_T, axis=-1)), axis=1)
+    # nodes at the cell nodes and on the cell edges
+    on_Ni = lam_Ni > rel_tol
+    n_on_N = np.sum(on_Ni, axis=1)
+    I_Ni = I_cell_Fi[F_N]
+    i_N = np.where(n_on_N == 1, I_Ni[N_range, np.argmax(lam_Ni, axis=1)], -1)
+    I_Ei, _ = get_facet_edges(I_cell_Fi)
+    edge_N = n_on_N == 2
+    I_N2 = np.sort(I_Ni[edge_N][on_Ni[edge_N]].reshape(-1, 2), axis=1)
+    E_N = np.full(len(X_Na), -1)
+    E_N[edge_N] = np.argmax(np.all(I_N2[:, np.newaxis, :] == I_Ei[np.newaxis, :, :], axis=-1), axis=1)
+    # rank along the edge by the distance from its first node
+    N_e = np.where(edge_N)[0]
+    t_e = np.linalg.norm(X_Na[N_e] - X_cell_Ia[I_Ei[E_N[N_e], 0]], axis=-1)
+    N_e = N_e[np.lexsort((t_e, E_N[N_e]))]
+    n_E = np.bincount(E_N[N_e], minlength=len(I_Ei))
+    k_N = np.full(len(X_Na), -1)
+    k_N[N_e] = np.arange(len(N_e)) - (np.cumsum(n_E) - n_E)[E_N[N_e]]
+    return F_N, lam_Ni, F_T, i_N, E_N, k_N, n_E, I_Ei
+
+
+def instantiate_cell_mesh(X_Ia, I_ci, X_cell_Ia, I_cell_Fi, X_cell_Na, I_cell_Ti, F_keep_cf=None):
+    '''Nodes X_Id and triangles I_Fi of the mesh X_cell_Na, I_cell_Ti of a cell
+    with the nodes X_cell_Ia and facets I_cell_Fi instantiated into all cells c
+    of a tessellation with the nodes X_Ia given by the node map I_ci of the cells.
+    The mesh nodes are placed on the facets of each cell using their barycentric
+    coordinates, which reproduces the rigid transformation of congruent cells.
+    The nodes at the cell nodes and on the cell edges are merged through the
+    node map, F_keep_cf selects the facets of the cells to be meshed.
+    '''
+    F_N, lam_Ni, F_T, i_N, E_N, k_N, n_E, I_Ei = classify_cell_mesh(
+        X_cell_Ia, I_cell_Fi, X_cell_Na, I_cell_Ti)
+    n_c, n_N = len(I_ci), len(X_cell_Na)
+    X_cNa = np.einsum('cNia,Ni->cNa', X_Ia[I_ci[:, I_cell_Fi[F_N]]], lam_Ni)
+    # merge keys of the nodes: tessellation node, edge node, interior node
+    n_I = np.int64(len(X_Ia))
+    key_cN = np.empty((n_c, n_N), dtype=np.int64)
+    node_N, edge_N = i_N >= 0, E_N >= 0
+    key_cN[:, node_N] = I_ci[:, i_N[node_N]]
+    I_cN2 = I_ci[:, I_Ei[E_N[edge_N]]].astype(np.int64)
+    n_e = n_E[E_N[edge_N]]
+    k_cN = np.where(I_cN2[..., 0] < I_cN2[..., 1], k_N[edge_N], n_e - 1 - k_N[edge_N])
+    key_E, E_cN = np.unique(np.min(I_cN2, axis=-1) * n_I + np.max(I_cN2, axis=-1), return_inverse=True)
+    E_cN = E_cN.reshape(k_cN.shape)
+    n_max_E = np.zeros(len(key_E), dtype=np.int_)
+    n_min_E = np.full(len(key_E), np.iinfo(np.int_).max)
+    n_e_cN = np.broadcast_to(n_e, E_cN.shape).ravel()
+    np.maximum.at(n_max_E, E_cN.ravel(), n_e_cN)
+    np.minimum.at(n_min_E, E_cN.ravel(), n_e_cN)
+    if np.any(n_max_E != n_min_E):
+        raise ValueError('the cell mesh is not compatible along the shared cell edges')
+    n_k = max(n_E.max(initial=0), 1)
+    key_cN[:, edge_N] = n_I + E_cN * n_k + k_cN
+    inner_N = ~(node_N | edge_N)
+    n_inner = np.count_nonzero(inner_N)
+    key_cN[:, inner_N] = (n_I + len(key_E) * n_k +
+                          np.arange(n_c * n_inner, dtype=np.int64).reshape(n_c, n_inner))
+    _, N_d, d_cN = np.unique(key_cN.ravel(), return_index=True, return_inverse=True)
+    d_cN = d_cN.reshape(n_c, n_N)
+    I_cTi = d_cN[np.arange(n_c)[:, np.newaxis, np.newaxis], I_cell_Ti[np.newaxis, :, :]]
+    if F_keep_cf is not None:
+        I_Fi = I_cTi[F_keep_cf[:, F_T]]
+    else:
+        I_Fi = I_cTi.reshape(-1, 3)
+    # remove the nodes of the trimmed facets
+    d_used, I_Fi = np.unique(I_Fi, return_inverse=True)
+    return X_cNa.reshape(-1, 3)[N_d[d_used]], I_Fi.reshape(-1, 3)
+
+
 class Facet:
     dim = 2
 
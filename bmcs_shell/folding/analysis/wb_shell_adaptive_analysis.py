@@ -0,0 +1,161 @@
+'''
+Adaptive refinement of the linear elastic analysis of a waterbomb shell.
+
+Each adaptive step solves the static problem on the current mesh, evaluates
+the recovery based (ZZ) error indicator of the elements, marks the elements
+with the largest errors (bulk marking) and refines them by the conforming
+bisection. The loop stops when the estimated relative error drops below
+the target error or when the refined mesh would exceed the dof budget.
+
+The bisection keeps the numbers of the nodes and appends the midpoints of
+the bisected edges, so that the supports and loads of the analysis, which
+refer to the nodes of its initial mesh, apply in all steps without any
+change. The uniform subdivision of the initial mesh (see
+WBShellLinearAnalysis) provides several elements in each plane of the
+folded surface for the stress recovery.
+
+The displacements are linear along the edges, the values at the midpoints
+interpolate the previous solution exactly and are used as the initial
+guess of the preconditioned conjugate gradient solver.
+
+With matrix_free the stiffness matrix is not assembled, the solver applies
+the element matrices B^T D B element by element (see fem/matrix_free.py).
+The Jacobi preconditioner can be replaced by the inverses of the diagonal
+nodal blocks (block_jacobi).
+'''
+
+import bmcs_utils.api as bu
+import numpy as np
+import scipy.sparse as sp
+import traits.api as tr
+from scipy.sparse.linalg import LinearOperator, aslinearoperator, cg
+
+from bmcs_shell.folding.analysis.fem.graded_mesh import get_bisection_edges, bisect_edges
+from bmcs_shell.folding.analysis.fem.matrix_free import ElementProductOperator, get_block_jacobi, get_nodal_blocks
+from bmcs_shell.folding.analysis.fem.zz_error_estimator import get_zz_error, mark_bulk
+from bmcs_shell.folding.analysis.wb_shell_linear_analysis import WBShellLinearAnalysis
+
+
+class WBShellAdaptiveAnalysis(WBShellLinearAnalysis):
+    name = 'WBShellAdaptiveAnalysis'
+
+    target_error = bu.Float(0.05, ALG=True)
+    '''Target relative error in the energy norm'''
+    max_dofs = bu.Int(200000, ALG=True)
+    theta = bu.Float(0.5, ALG=True)
+    '''Fraction of the total squared error of the marked elements'''
+    max_steps = bu.Int(20, ALG=True)
+    tol = bu.Float(1e-8, ALG=True)
+    '''Relative residual of the conjugate gradient solver'''
+    matrix_free = bu.Bool(False, ALG=True)
+    '''Apply the element matrices element by element instead of assembling K'''
+    block_jacobi = bu.Bool(False, ALG=True)
+    '''Precondition with the inverses of the diagonal nodal blocks of K'''
+
+    ipw_view = bu.View(
+        bu.Item('target_error'),
+        bu.Item('max_dofs'),
+        bu.Item('theta'),
+        bu.Item('max_steps'),
+        bu.Item('initial_subdivision'),
+        bu.Item('tol'),
+        bu.Item('matrix_free'),
+        bu.Item('block_jacobi'),
+    )
+
+    e2_E = tr.Array(np.float_)
+    history = tr.List
+    '''Records (n_dofs, eta, n_iter) of the adaptive steps'''
+
+    n_iter = bu.Int(0)
+    '''Number of iterations of the last solution'''
+
+    def get_matrix_free_K(self, xdomain):
+        '''Matrix-free stiffness operator of the domain with the springs of the
+        flat nodes and its diagonal nodal blocks K_Iab
+        '''
+        B_Empf, w_Em, o_Ef = xdomain.strain_operator
+        K = ElementProductOperator(B_Empf, w_Em, self.D_st, o_Ef, xdomain.n_dofs)
+        K_Iab = K.get_block_diagonal(xdomain.fets.n_nodal_dofs)
+        K_s = self.get_spring_K(xdomain, np.mean(np.einsum('Iaa->Ia', K_Iab)))
+        K_Iab += get_nodal_blocks(K_s, xdomain.fets.n_nodal_dofs)
+        return K + aslinearoperator(K_s), K_Iab
+
+    def solve(self, xdomain, U_0=None):
+        '''Displacements of the domain by the preconditioned conjugate gradient
+        solver starting from the initial guess U_0 (zero by default)
+        '''
+        u_dofs, u_values, f_dofs, f_values = self.get_bc_dofs()
+        F = np.bincount(f_dofs, weights=f_values, minlength=xdomain.n_dofs)
+        U = np.zeros(xdomain.n_dofs) if U_0 is None else np.copy(U_0)
+        U[u_dofs] = u_values
+        free = np.ones(xdomain.n_dofs, dtype=np.bool_)
+        free[u_dofs] = False
+        if self.matrix_free:
+            K, K_Iab = self.get_matrix_free_K(xdomain)
+
+            def K_ff_dot(U_f):
+                V = np.zeros(xdomain.n_dofs)
+                V[free] = np.ravel(U_f)
+                return (K @ V)[free]
+
+            n_f = int(np.sum(free))
+            K_ff = LinearOperator(shape=(n_f, n_f), matvec=K_ff_dot, rmatvec=K_ff_dot, dtype=np.float_)
+            F_f = F[free] - (K @ np.where(free, 0, U))[free]
+            d_f = np.einsum('Iaa->Ia', K_Iab).ravel()[free]
+        else:
+            K = self.get_K(xdomain)
+            K_ff = K[free][:, free]
+            F_f = F[free] - K[free][:, ~free] @ U[~free]
+            d_f = K_ff.diagonal()
+        if self.block_jacobi:
+            if not self.matrix_free:
+                K_Iab = get_nodal_blocks(K, xdomain.fets.n_nodal_dofs)
+            M = get_block_jacobi(K_Iab, free)
+        else:
+            # Jacobi preconditioner
+            d_f = np.where(d_f > 0, d_f, 1)
+            M = sp.diags(1 / d_f)
+        n_iter = [0]
+
+        def count(_):
+            n_iter[0] += 1
+
+        U[free], info = cg(K_ff, F_f, x0=U[free], rtol=self.tol, maxiter=10 * len(F_f), M=M, callback=count)
+        if info != 0:
+            raise RuntimeError('conjugate gradient solver did not converge in %d iterations' % info)
+        self.n_iter = n_iter[0]
+        return U
+
+    def get_error(self, xdomain, U):
+        '''Squared element errors and the relative error eta'''
+        sig_Es, _ = self.analysis.tmodel.get_corr_pred(xdomain.map_U_to_field(U), 0)
+        e2_E, u2_E = get_zz_error(xdomain.X_Id, xdomain.I_Ei, xdomain.T_Fab, sig_Es,
+                                  np.linalg.inv(self.D_st), self.analysis.h)
+        e2, u2 = np.sum(e2_E), np.sum(u2_E)
+        # the zero solution (no load) is exact
+        eta = np.sqrt(e2 / (e2 + u2)) if e2 + u2 > 0 else 0.0
+        return e2_E, eta
+
+    def run(self):
+        '''Adaptive loop starting from the subdivided mesh of the analysis'''
+        X_Id, I_Fi = self.get_initial_mesh()
+        n_a = self.analysis.xdomain.mesh.n_nodal_dofs
+        U = np.zeros(len(X_Id) * n_a)
+        self.history = []
+        for _ in range(self.max_steps):
+            xdomain = self.get_xdomain(X_Id, I_Fi)
+            U = self.solve(xdomain, U)
+            e2_E, eta = self.get_error(xdomain, U)
+            self.X_Id, self.I_Fi, self.U_o, self.e2_E = X_Id, I_Fi, U, e2_E
+            self.history.append((len(U), eta, self.n_iter))
+            if eta <= self.target_error:
+                break
+            I_Mi = get_bisection_edges(X_Id, I_Fi, mark_bulk(e2_E, self.theta))
+            if (len(X_Id) + len(I_Mi)) * n_a > self.max_dofs:
+                break
+            # the initial guess of the next step interpolates the current solution
+            U_Ia = U.reshape(-1, n_a)
+            U = np.vstack([U_Ia, np.mean(U_Ia[I_Mi], axis=1)]).ravel()
+            X_Id, I_Fi, _ = bisect_edges(X_Id, I_Fi, I_Mi)
+        return self.history
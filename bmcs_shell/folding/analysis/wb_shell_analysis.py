@@ -14,6 +14,7 @@ from bmcs_shell.folding.analysis.fem.vmats_shell_elastic import MATSShellElastic
 from bmcs_shell.folding.analysis.fets2d_mitc import FETS2DMITC
 from bmcs_shell.folding.geometry.wb_shell_geometry import WBShellGeometry4P
 from bmcs_shell.folding.analysis.wb_fe_triangular_mesh import WBShellFETriangularMesh
+from bmcs_shell.folding.utils.mesh_writers import write_mesh_frames, write_ply_file
 
 itags_str = '+GEO,+MAT,+BC'
 
@@ -27,12 +28,16 @@ class WBShellAnalysis(TStepBC, bu.InteractiveModel):
 
     h = bu.Float(10, GEO=True)
     show_wireframe = bu.Bool(True, GEO=True)
+    renumber_nodes = bu.Bool(False, GEO=True)
+    '''Bandwidth reducing renumbering of the mesh nodes, the boundary
+    conditions keep referring to the nodes of the geometry'''
 
     ipw_view = bu.View(
         bu.Item('h',
                 editor=bu.FloatRangeEditor(low=1, high=100, n_steps=100),
                 continuous_update=False),
         bu.Item('show_wireframe'),
+        bu.Item('renumber_nodes'),
         time_editor=bu.ProgressEditor(run_method='run',
                                       reset_method='reset',
                                       interrupt_var='interrupt',
@@ -64,7 +69,7 @@ class WBShellAnalysis(TStepBC, bu.InteractiveModel):
     def _get_xdomain(self):
         # prepare the mesh generator
         # mesh = WBShellFETriangularMesh(geo=self.geo, direct_mesh=False, subdivision=2)
-        mesh = WBShellFETriangularMesh(geo=self.geo, direct_mesh=True)
+        mesh = WBShellFETriangularMesh(geo=self.geo, direct_mesh=True, renumber_nodes=self.renumber_nodes)
         # construct the domain with the kinematic strain mapper and stress integrator
         return TriXDomainFE(
             mesh=mesh,
@@ -115,6 +120,11 @@ class WBShellAnalysis(TStepBC, bu.InteractiveModel):
     def _get_bc(self):
         bc_fixed, _, _ = self.bcs.bc_fixed
         bc_loaded, _, _ = self.bcs.bc_loaded
+        if self.renumber_nodes:
+            # the conditions refer to the nodes before the renumbering
+            map_dofs = self.xdomain.mesh.map_dofs
+            return [BCDof(var=bc.var, dof=int(map_dofs(bc.dof)), value=bc.value)
+                    for bc in bc_fixed + bc_loaded]
         return bc_fixed + bc_loaded
 
     def run(self):
@@ -135,6 +145,24 @@ class WBShellAnalysis(TStepBC, bu.InteractiveModel):
         al.model_name = 'test_name'
         al.build_inp()
 
+    def get_U_tIa(self):
+        '''Nodal displacements of all recorded time steps'''
+        U_t = np.asarray(self.hist.U_t)
+        return U_t.reshape(len(U_t), -1, self.xdomain.fets.n_nodal_dofs)[..., :3]
+
+    def export_deformed_mesh(self, path='wb_shell_%04d.ply', writer=write_ply_file):
+        '''Write the deformed shape X_Id + U of each recorded time step
+        into a binary PLY (with the displacement magnitude and its vertical
+        component as vertex attributes) or STL file (writer=write_stl_file),
+        path contains the format of the step number.
+        '''
+        U_tIa = self.get_U_tIa()
+        attributes_t = None
+        if writer is write_ply_file:
+            attributes_t = {'U': np.linalg.norm(U_tIa, axis=-1), 'U_z': U_tIa[..., 2]}
+        return write_mesh_frames(path, self.xdomain.mesh.X_Id + U_tIa, self.xdomain.I_Ei,
+                                 attributes_t=attributes_t, writer=writer)
+
     def setup_plot(self, pb):
         print('analysis: setup_plot')
         X_Id = self.xdomain.mesh.X_Id
@@ -206,6 +234,8 @@ class WBShellAnalysis(TStepBC, bu.InteractiveModel):
         F_to = self.hist.F_t
         U_to = self.hist.U_t
         _, _, loaded_dofs = self.bcs.bc_loaded
+        if self.renumber_nodes:
+            loaded_dofs = self.xdomain.mesh.map_dofs(loaded_dofs)
         F_loaded = np.sum(F_to[:, loaded_dofs], axis=-1)
         U_loaded = np.average(U_to[:, loaded_dofs], axis=-1)
         return U_loaded, F_loaded
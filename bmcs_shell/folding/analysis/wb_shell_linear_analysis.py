@@ -0,0 +1,123 @@
+'''
+Linear elastic analysis of a waterbomb shell with the membrane stiffness.
+
+The mesh of the analysis is uniformly subdivided by initial_subdivision,
+which keeps the node numbers, so that the supports and loads of the
+analysis apply without any change. The displacements of the nodes
+surrounded by coplanar elements perpendicular to their plane have no
+membrane stiffness, they are held by springs with the average diagonal
+stiffness. The static problem is solved directly by the sparse solver,
+the derived analyses replace solve by their own solution strategy.
+'''
+
+import bmcs_utils.api as bu
+import numpy as np
+import scipy.sparse as sp
+import traits.api as tr
+from scipy.sparse.linalg import spsolve
+
+from bmcs_shell.folding.analysis.fem.fe_triangular_mesh import FETriangularMesh
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.fem.tri_xdomain_fe import TriXDomainFE
+from bmcs_shell.folding.analysis.fem.zz_error_estimator import get_flat_nodes
+from bmcs_shell.folding.analysis.wb_shell_analysis import WBShellAnalysis
+
+
+class WBShellLinearAnalysis(bu.Model):
+    name = 'WBShellLinearAnalysis'
+
+    analysis = bu.Instance(WBShellAnalysis, ())
+
+    tree = ['analysis']
+
+    initial_subdivision = bu.Int(2, ALG=True)
+    '''Uniform subdivision of the mesh of the analysis'''
+
+    ipw_view = bu.View(
+        bu.Item('initial_subdivision'),
+    )
+
+    X_Id = tr.Array(np.float_)
+    I_Fi = tr.Array(np.int_)
+    U_o = tr.Array(np.float_)
+
+    D_st = tr.Property
+
+    def _get_D_st(self):
+        _, D_Est = self.analysis.tmodel.get_corr_pred(np.zeros((1, 3)), 0)
+        return D_Est[0]
+
+    def get_initial_mesh(self):
+        '''Nodes and facets of the subdivided mesh of the analysis'''
+        mesh = self.analysis.xdomain.mesh
+        if self.initial_subdivision > 1:
+            return get_subdivision_mesh(mesh.X_Id, mesh.I_Fi, self.initial_subdivision)
+        return mesh.X_Id, mesh.I_Fi
+
+    def get_xdomain(self, X_Id, I_Fi):
+        mesh = FETriangularMesh(X_Id=X_Id, I_Fi=I_Fi, fets=self.analysis.xdomain.fets)
+        return TriXDomainFE(mesh=mesh, integ_factor=self.analysis.h)
+
+    def get_element_K(self, xdomain):
+        '''Sparse stiffness matrix of the elements of the domain'''
+        K = xdomain.map_field_to_K(self.D_st[np.newaxis, ...])
+        K_Eij, o_Ei = K.mtx_arr, K.dof_map_arr
+        n_i = o_Ei.shape[1]
+        rows = np.repeat(o_Ei, n_i, axis=1).ravel()
+        cols = np.tile(o_Ei, (1, n_i)).ravel()
+        return sp.csr_matrix((K_Eij.ravel(), (rows, cols)), shape=(xdomain.n_dofs, xdomain.n_dofs))
+
+    def get_spring_K(self, xdomain, k_n, I_nodes=None):
+        '''Sparse matrix of the springs with the stiffness k_n perpendicular
+        to the plane of the flat nodes of the domain (within I_nodes if given)
+        '''
+        I_flat, n_Ia = get_flat_nodes(xdomain.X_Id, xdomain.I_Ei)
+        if I_nodes is not None:
+            in_nodes = np.isin(I_flat, I_nodes)
+            I_flat, n_Ia = I_flat[in_nodes], n_Ia[in_nodes]
+        o_Ia = xdomain.o_Ia[I_flat][:, :3]
+        rows = np.repeat(o_Ia, 3, axis=1).ravel()
+        cols = np.tile(o_Ia, (1, 3)).ravel()
+        return sp.csr_matrix((k_n * np.einsum('Ia,Ib->Iab', n_Ia, n_Ia).ravel(), (rows, cols)),
+                             shape=(xdomain.n_dofs, xdomain.n_dofs))
+
+    def get_K(self, xdomain):
+        '''Sparse stiffness matrix of the domain with the springs of the flat
+        nodes with the average diagonal stiffness
+        '''
+        K = self.get_element_K(xdomain)
+        return K + self.get_spring_K(xdomain, np.mean(K.diagonal()))
+
+    def get_bc_dofs(self):
+        '''Prescribed dofs and values and the load vector entries
+        (at the end of the loading) of the analysis
+        '''
+        u_dofs, u_values, f_dofs, f_values = [], [], [], []
+        for bc in self.analysis.bc:
+            if len(bc.link_dofs) > 0:
+                raise ValueError('linked dofs are not supported by the linear analysis')
+            if bc.var == 'u':
+                u_dofs.append(bc.dof), u_values.append(bc.value)
+            elif bc.var == 'f':
+                f_dofs.append(bc.dof), f_values.append(bc.value)
+        return (np.array(u_dofs, dtype=np.int_), np.array(u_values, dtype=np.float_),
+                np.array(f_dofs, dtype=np.int_), np.array(f_values, dtype=np.float_))
+
+    def solve(self, xdomain):
+        '''Displacements of the domain by the direct sparse solution'''
+        K = self.get_K(xdomain)
+        u_dofs, u_values, f_dofs, f_values = self.get_bc_dofs()
+        F = np.bincount(f_dofs, weights=f_values, minlength=xdomain.n_dofs)
+        U = np.zeros(xdomain.n_dofs)
+        U[u_dofs] = u_values
+        free = np.ones(xdomain.n_dofs, dtype=np.bool_)
+        free[u_dofs] = False
+        U[free] = spsolve(K[free][:, free].tocsc(), (F - K @ U)[free])
+        return U
+
+    def run(self):
+        '''Static analysis on the subdivided mesh of the analysis'''
+        X_Id, I_Fi = self.get_initial_mesh()
+        U = self.solve(self.get_xdomain(X_Id, I_Fi))
+        self.X_Id, self.I_Fi, self.U_o = X_Id, I_Fi, U
+        return U
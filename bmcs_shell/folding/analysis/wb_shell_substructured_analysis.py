@@ -0,0 +1,62 @@
+'''
+Linear elastic analysis of a waterbomb shell solved by substructuring.
+
+The cells of the tessellation, or blocks of cells_per_subdomain x
+cells_per_subdomain neighbouring cells of the cell grid, are the
+subdomains. They are coupled only through the nodes on the shared
+crease lines. Their interior dofs are condensed in parallel processes,
+the interface system is solved directly and the interiors are
+recovered by the back substitution (see fem/substructuring.py).
+
+The elements are assigned to the cell of the nearest facet centroid of
+the geometry, so that the subdivided and refined meshes of the geometry
+are decomposed as well.
+'''
+
+import bmcs_utils.api as bu
+import numpy as np
+from scipy.spatial import cKDTree
+
+from bmcs_shell.folding.analysis.fem.substructuring import solve_substructured
+from bmcs_shell.folding.analysis.wb_shell_linear_analysis import WBShellLinearAnalysis
+
+
+class WBShellSubstructuredAnalysis(WBShellLinearAnalysis):
+    name = 'WBShellSubstructuredAnalysis'
+
+    cells_per_subdomain = bu.Int(1, ALG=True)
+    '''Number of cells along each direction of the cell grid in a subdomain'''
+    n_jobs = bu.Int(1, ALG=True)
+    '''Number of processes condensing the subdomains'''
+
+    ipw_view = bu.View(
+        bu.Item('cells_per_subdomain'),
+        bu.Item('n_jobs'),
+        bu.Item('initial_subdivision'),
+    )
+
+    n_interface_dofs = bu.Int(0)
+
+    def get_subdomains(self, xdomain):
+        '''Subdomain of each element of the domain'''
+        geo = self.analysis.geo
+        X_cFa = np.mean(geo.X_Ia[geo.F_cfi], axis=2)
+        _, F_E = cKDTree(X_cFa.reshape(-1, 3)).query(np.mean(xdomain.X_Id[xdomain.I_Ei], axis=1), workers=-1)
+        c_E = F_E // X_cFa.shape[1]
+        # blocks of the cell grid, the phi indices of the cells step by two
+        x_c, phi_c, _ = geo.cell_grid
+        n = self.cells_per_subdomain
+        _, S_c = np.unique(np.column_stack([x_c // n, phi_c // (2 * n)]), axis=0, return_inverse=True)
+        return S_c.ravel()[c_E]
+
+    def solve(self, xdomain):
+        '''Displacements of the domain by the direct substructured solver'''
+        K = self.get_K(xdomain)
+        u_dofs, u_values, f_dofs, f_values = self.get_bc_dofs()
+        F = np.bincount(f_dofs, weights=f_values, minlength=xdomain.n_dofs)
+        U = np.zeros(xdomain.n_dofs)
+        U[u_dofs] = u_values
+        o_Ei = xdomain.o_Ia[xdomain.I_Ei].reshape(len(xdomain.I_Ei), -1)
+        U, self.n_interface_dofs = solve_substructured(K, F, U, u_dofs, o_Ei,
+                                                       self.get_subdomains(xdomain), self.n_jobs)
+        return U
@@ -0,0 +1,135 @@
+'''
+Linear elastic analysis of a regular waterbomb tessellation assembled from
+the condensed stiffness of a single cell (super-element).
+
+All cells of an untrimmed WBTessellation4P are the same WBCell4Param
+rotated about the x axis by their phi position and shifted along x. The
+cell mesh, uniformly subdivided by initial_subdivision, is assembled
+and condensed once onto the retained nodes, which are the nodes of the
+cell geometry and the nodes on the cell boundary. The contribution of
+each cell is the condensed matrix with its nodal blocks rotated into
+the cell. The interior displacements of all cells are recovered by the
+condensation operator in the frame of the reference cell.
+
+The cells are located in the mesh of the analysis by their node
+coordinates, the mesh must be the uniform subdivision of the geometry
+by initial_subdivision.
+The springs of the flat nodes get the average diagonal stiffness of
+the whole mesh, evaluated from the trace of the cell matrix, so the
+solution is the same as the one of the assembled mesh.
+'''
+
+import bmcs_utils.api as bu
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+from scipy.spatial import cKDTree
+
+from bmcs_shell.folding.analysis.fem.subdivision_mesh import get_subdivision_mesh
+from bmcs_shell.folding.analysis.fem.super_element import condense, rotate_nodal_blocks, rotate_nodal_vectors
+from bmcs_shell.folding.analysis.wb_shell_linear_analysis import WBShellLinearAnalysis
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+from bmcs_shell.folding.utils.rotation import axis_angle_to_rot_matrix
+
+
+class WBShellSuperElementAnalysis(WBShellLinearAnalysis):
+    name = 'WBShellSuperElementAnalysis'
+
+    n_retained_dofs = bu.Int(0)
+
+    def get_cell_mesh(self):
+        '''Nodes and facets of the subdivided reference cell'''
+        wb_cell = self.analysis.geo.wb_cell
+        X_Ia, I_Fi = wb_cell.X_Ia, wb_cell.I_Fi
+        if self.initial_subdivision > 1:
+            return get_subdivision_mesh(X_Ia, I_Fi, self.initial_subdivision)
+        return X_Ia, I_Fi
+
+    def get_cell_transforms(self):
+        '''Rotations R_cab and translations of the cells of the tessellation
+        mapping X to R_cab (X - X_0) + X_0 + t_ca with the rotation center X_0
+        '''
+        geo = self.analysis.geo
+        wb_cell = geo.wb_cell
+        idx_x_c, idx_phi_c, _ = geo.cell_grid
+        R_cab = axis_angle_to_rot_matrix(np.array([[1, 0, 0]], dtype=np.float_),
+                                         geo.get_phi_range(wb_cell.delta_phi)[idx_phi_c])
+        X_0 = np.array([0, 0, wb_cell.R_0], dtype=np.float_)
+        t_ca = np.zeros((len(idx_x_c), 3))
+        t_ca[:, 0] = geo.get_X_x_range(wb_cell.delta_x)[idx_x_c]
+        return R_cab, X_0, t_ca
+
+    def get_retained_nodes(self, X_Ia, I_Fi):
+        '''Retained nodes of the cell mesh, the nodes of the cell geometry
+        followed by the remaining nodes on the boundary of the cell
+        '''
+        n_I_cell = len(self.analysis.geo.wb_cell.X_Ia)
+        I_Ei, E_Fi = get_facet_edges(I_Fi)
+        I_boundary = np.unique(I_Ei[np.bincount(E_Fi.ravel()) == 1])
+        return np.hstack([np.arange(n_I_cell), I_boundary[I_boundary >= n_I_cell]])
+
+    def get_condensed_K(self, xdomain):
+        '''Stiffness matrix of the domain condensed onto the retained dofs b_all
+        assembled from the rotated super-element. Returns the matrix, the
+        retained dofs, the retained and interior dofs o_cb, o_ci of the cells,
+        the recovery operator X_ib of the reference cell and the cell rotations
+        '''
+        if xdomain.fets.n_nodal_dofs != 3:
+            raise ValueError('the super-element rotation requires three translational dofs per node')
+        X_Ia, I_Fi = self.get_cell_mesh()
+        cell_xdomain = self.get_xdomain(X_Ia, I_Fi)
+        K_ij = self.get_element_K(cell_xdomain)
+        R_cab, X_0, t_ca = self.get_cell_transforms()
+        # locate the cell instances in the mesh
+        X_cIa = np.einsum('cab,Ib->cIa', R_cab, X_Ia - X_0) + X_0 + t_ca[:, np.newaxis, :]
+        d_cI, I_cI = cKDTree(xdomain.X_Id).query(X_cIa.reshape(-1, 3), workers=-1)
+        L = np.max(np.ptp(xdomain.X_Id, axis=0))
+        if np.max(d_cI) > 1e-6 * L or len(I_Fi) * len(R_cab) != len(xdomain.I_Ei):
+            raise ValueError('the mesh is not a uniform subdivision of a regular tessellation '
+                             'of congruent cells')
+        I_cI = I_cI.reshape(len(R_cab), -1)
+        I_b = self.get_retained_nodes(X_Ia, I_Fi)
+        I_i = np.setdiff1d(np.arange(len(X_Ia)), I_b)
+        # springs of the flat interior nodes with the average diagonal of the mesh
+        k_n = len(R_cab) * K_ij.diagonal().sum() / xdomain.n_dofs
+        K_ij = (K_ij + self.get_spring_K(cell_xdomain, k_n, I_i)).toarray()
+        b_dofs = cell_xdomain.o_Ia[I_b].ravel()
+        S_bB, X_ib, i_dofs = condense(K_ij, b_dofs)
+        o_cb = xdomain.o_Ia[I_cI[:, I_b]].reshape(len(R_cab), -1)
+        o_ci = xdomain.o_Ia[I_cI[:, I_i]].reshape(len(R_cab), -1)
+        # interior dofs must belong to a single cell
+        if len(np.unique(o_ci)) != o_ci.size or np.any(np.isin(o_ci, o_cb)):
+            raise ValueError('the interior nodes of the cells are shared')
+        S_cbB = rotate_nodal_blocks(S_bB, R_cab)
+        n_b = o_cb.shape[1]
+        rows = np.repeat(o_cb, n_b, axis=1).ravel()
+        cols = np.tile(o_cb, (1, n_b)).ravel()
+        K = sp.csr_matrix((S_cbB.ravel(), (rows, cols)), shape=(xdomain.n_dofs, xdomain.n_dofs))
+        b_all = np.unique(o_cb)
+        K = K[b_all][:, b_all]
+        # springs of the flat retained nodes
+        K_n = self.get_spring_K(xdomain, k_n, np.unique(I_cI[:, I_b]))
+        return K + K_n[b_all][:, b_all], b_all, o_cb, o_ci, X_ib, R_cab
+
+    def solve(self, xdomain):
+        '''Displacements of the domain assembled from the rotated super-element'''
+        K, b_all, o_cb, o_ci, X_ib, R_cab = self.get_condensed_K(xdomain)
+        self.n_retained_dofs = len(b_all)
+        # boundary conditions on the retained dofs
+        u_dofs, u_values, f_dofs, f_values = self.get_bc_dofs()
+        if not np.all(np.isin(np.hstack([u_dofs, f_dofs]), b_all)):
+            raise ValueError('boundary conditions are only supported on the nodes of the geometry')
+        F = np.bincount(np.searchsorted(b_all, f_dofs), weights=f_values, minlength=len(b_all))
+        U_b = np.zeros(len(b_all))
+        u_b = np.searchsorted(b_all, u_dofs)
+        U_b[u_b] = u_values
+        free = np.ones(len(b_all), dtype=np.bool_)
+        free[u_b] = False
+        U_b[free] = spsolve(K[free][:, free].tocsc(), (F - K @ U_b)[free])
+        # recovery of the interior displacements in the frame of the reference cell
+        U = np.zeros(xdomain.n_dofs)
+        U[b_all] = U_b
+        R_cba = R_cab.transpose(0, 2, 1)
+        U_ci = np.einsum('ib,cb->ci', X_ib, rotate_nodal_vectors(U[o_cb], R_cba))
+        U[o_ci] = rotate_nodal_vectors(U_ci, R_cab)
+        return U
@@ -0,0 +1,100 @@
+'''
+Linear elastic analysis of a symmetric waterbomb shell solved on its half
+or quarter model.
+
+The regular tessellations are symmetric with respect to the y-z plane
+(symmetry_yz, x mirrored) and the x-z plane (symmetry_xz, y mirrored)
+through their center. The reduced model consists of the facets with the
+centroid on the positive side of the chosen planes, the facets crossing
+a plane are represented by their nodes on the positive side (see
+fem/symmetry.py). The symmetry
+constraints of the nodes on the planes and the weights of their loads
+and springs are applied automatically. The displacements of the reduced
+model are mirrored back to all nodes, so that the results and the plots
+work with the full mesh.
+
+The boundary conditions of the analysis must be symmetric, otherwise a
+ValueError is raised. The reduction is exact, the solution is identical
+with the one of the full model.
+'''
+
+import bmcs_utils.api as bu
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+
+from bmcs_shell.folding.analysis.fem.symmetry import get_symmetry_map
+from bmcs_shell.folding.analysis.wb_shell_linear_analysis import WBShellLinearAnalysis
+
+
+class WBShellSymmetricAnalysis(WBShellLinearAnalysis):
+    name = 'WBShellSymmetricAnalysis'
+
+    symmetry_yz = bu.Bool(True, ALG=True)
+    '''Symmetry with respect to the y-z plane (x mirrored)'''
+    symmetry_xz = bu.Bool(True, ALG=True)
+    '''Symmetry with respect to the x-z plane (y mirrored)'''
+
+    ipw_view = bu.View(
+        bu.Item('symmetry_yz'),
+        bu.Item('symmetry_xz'),
+        bu.Item('initial_subdivision'),
+    )
+
+    n_reduced_dofs = bu.Int(0)
+
+    def get_symmetry_axes(self):
+        return [a for a, symmetry in enumerate([self.symmetry_yz, self.symmetry_xz]) if symmetry]
+
+    def solve(self, xdomain):
+        '''Displacements of the domain obtained from the reduced model'''
+        if xdomain.fets.n_nodal_dofs != 3:
+            raise ValueError('the mirroring requires three translational dofs per node')
+        axes = self.get_symmetry_axes()
+        I_r, w_r, E_r, w_E, r_I, M_Iab, fixed_ra = get_symmetry_map(xdomain.X_Id, xdomain.I_Ei, axes)
+        # element matrices of the reduced facets transformed to the reduced nodes
+        K_Eij = self.get_xdomain(xdomain.X_Id, xdomain.I_Ei[E_r]).map_field_to_K(
+            self.D_st[np.newaxis, ...]).mtx_arr
+        I_Ei = xdomain.I_Ei[E_r]
+        n_E, n_i = I_Ei.shape
+        M_Eiab = M_Iab[I_Ei]
+        K_Eiajb = np.einsum('Eica,Eicjd,Ejdb->Eiajb', M_Eiab, K_Eij.reshape(n_E, n_i, 3, n_i, 3), M_Eiab)
+        K_Eij = K_Eiajb.reshape(n_E, 3 * n_i, 3 * n_i)
+        # springs of the flat nodes with the average diagonal of the full mesh
+        k_n = 2 ** len(axes) * np.einsum('E,Eii->', w_E, K_Eij) / xdomain.n_dofs
+        K_Eij = w_E[:, np.newaxis, np.newaxis] * K_Eij
+        o_Ei = (r_I[I_Ei][..., np.newaxis] * 3 + np.arange(3)).reshape(n_E, -1)
+        rows = np.repeat(o_Ei, 3 * n_i, axis=1).ravel()
+        cols = np.tile(o_Ei, (1, 3 * n_i)).ravel()
+        n_o = 3 * len(I_r)
+        K = sp.csr_matrix((K_Eij.ravel(), (rows, cols)), shape=(n_o, n_o))
+        o_r = xdomain.o_Ia[I_r].ravel()
+        w_o = np.repeat(w_r, 3)
+        K = K + sp.diags(w_o) @ self.get_spring_K(xdomain, k_n)[o_r][:, o_r]
+        # symmetric boundary conditions of the full model
+        u_dofs, u_values, f_dofs, f_values = self.get_bc_dofs()
+        F = np.bincount(f_dofs, weights=f_values, minlength=xdomain.n_dofs)
+        U = np.zeros(xdomain.n_dofs)
+        U[u_dofs] = u_values
+        fixed = np.zeros(xdomain.n_dofs, dtype=np.bool_)
+        fixed[u_dofs] = True
+        # nodes of the facets
+        I = np.where(r_I >= 0)[0]
+        M_Iab, r_I = M_Iab[I], r_I[I]
+        fixed_Ia = fixed.reshape(-1, 3)
+        symmetric = np.all(fixed_Ia[I_r][r_I] == fixed_Ia[I])
+        for V_Ia in [F.reshape(-1, 3), U.reshape(-1, 3)]:
+            symmetric &= np.allclose(np.einsum('Iab,Ib->Ia', M_Iab, V_Ia[I_r][r_I]), V_Ia[I],
+                                     atol=1e-12 * np.max(np.fabs(V_Ia), initial=1))
+        if not symmetric:
+            raise ValueError('the boundary conditions are not symmetric')
+        # reduced system with the symmetry constraints
+        fixed_r = fixed[o_r] | fixed_ra.ravel()
+        U_r = np.where(fixed_ra.ravel(), 0, U[o_r])
+        free = ~fixed_r
+        self.n_reduced_dofs = int(np.sum(free))
+        U_r[free] = spsolve(K[free][:, free].tocsc(), (w_o * F[o_r] - K @ U_r)[free])
+        # mirrored back to the full mesh
+        U_Ia = np.zeros((len(xdomain.X_Id), 3))
+        U_Ia[I] = np.einsum('Iab,Ib->Ia', M_Iab, U_r.reshape(-1, 3)[r_I])
+        return U_Ia.ravel()
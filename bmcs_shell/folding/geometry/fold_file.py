@@ -0,0 +1,189 @@
+'''
+Reading and writing of crease patterns in the FOLD format.
+
+See https://github.com/edemaine/fold/blob/master/doc/spec.md for the
+specification. The reader converts the JSON lists in bulk into numpy
+arrays, triangulates the polygonal faces in a vectorized way and
+provides the mountain, valley and boundary lines and the triangular
+mesh ready for the analysis with ``FETriangularMesh``. The writer
+streams the arrays formatted in chunks, optionally compact (without
+indentation) and gzip compressed.
+
+Indices: I - node, a - dimension, F - facet, i - facet node,
+E - edge, L - line
+'''
+
+import itertools
+import json
+
+import numpy as np
+
+from bmcs_shell.folding.utils.mesh_writers import CHUNK_SIZE, open_input, open_output, write_rows
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+
+def _to_array(lists, dtype, n_cols):
+    '''Bulk conversion of a list of equally long lists into an array'''
+    if len(lists) == 0:
+        return np.zeros((0, n_cols), dtype=dtype)
+    return np.array(lists, dtype=dtype).reshape(len(lists), n_cols)
+
+
+def triangulate_faces(faces_vertices):
+    '''Fan triangulation of the (convex) polygonal faces given as lists of
+    vertex indices. Returns the triangles I_Fi and the index of the polygon
+    each triangle originates from.
+    '''
+    n_v_f = np.fromiter(map(len, faces_vertices), dtype=np.int_, count=len(faces_vertices))
+    if np.any(n_v_f < 3):
+        raise ValueError('faces with less than three vertices cannot be triangulated')
+    I_n = np.fromiter(itertools.chain.from_iterable(faces_vertices), dtype=np.int_, count=n_v_f.sum())
+    n_tri_f = n_v_f - 2
+    f_F = np.repeat(np.arange(len(n_v_f)), n_tri_f)
+    first_f = np.cumsum(n_v_f) - n_v_f
+    # number of the triangle within its polygon
+    k_F = np.arange(len(f_F)) - np.repeat(np.cumsum(n_tri_f) - n_tri_f, n_tri_f)
+    n_F = first_f[f_F]
+    I_Fi = np.column_stack([I_n[n_F], I_n[n_F + k_F + 1], I_n[n_F + k_F + 2]])
+    return I_Fi, f_F
+
+
+class FoldPattern:
+    '''Crease pattern read from a FOLD file. The polygonal faces are
+    triangulated, the lines of the original edges are sorted according
+    to their assignment (M - mountain, V - valley, B - boundary,
+    F - flat, U - unassigned, C - cut, J - join).
+    '''
+
+    def __init__(self, X_Ia, faces_vertices, I_Li=None, assignment_L=None, fold_angle_L=None):
+        X_Ia = np.asarray(X_Ia, dtype=np.float_)
+        # two-dimensional crease patterns are placed in the x-y plane
+        self.X_Ia = np.zeros((len(X_Ia), 3), dtype=np.float_)
+        self.X_Ia[:, :X_Ia.shape[1]] = X_Ia
+        self.I_Fi, self.F_f = triangulate_faces(faces_vertices)
+        if I_Li is None:
+            I_Li, assignment_L = self._get_face_edges(faces_vertices)
+        self.I_Li = np.asarray(I_Li, dtype=np.int_).reshape(-1, 2)
+        if assignment_L is None:
+            assignment_L = np.full(len(self.I_Li), 'U')
+        self.assignment_L = np.asarray(assignment_L, dtype='<U1')
+        self.fold_angle_L = (np.full(len(self.I_Li), np.nan) if fold_angle_L is None
+                             else np.asarray(fold_angle_L, dtype=np.float_))
+
+    @staticmethod
+    def _get_face_edges(faces_vertices):
+        '''Edges of the polygons, those of a single polygon are boundary edges
+        '''
+        n_v_f = np.fromiter(map(len, faces_vertices), dtype=np.int_, count=len(faces_vertices))
+        I_n = np.fromiter(itertools.chain.from_iterable(faces_vertices), dtype=np.int_, count=n_v_f.sum())
+        first_n = np.repeat(np.cumsum(n_v_f) - n_v_f, n_v_f)
+        k_n = np.arange(len(I_n)) - first_n
+        next_n = first_n + (k_n + 1) % np.repeat(n_v_f, n_v_f)
+        I_ni = np.sort(np.column_stack([I_n, I_n[next_n]]), axis=1)
+        # integer keys of the node pairs are much faster to sort than rows
+        n_I = I_n.max(initial=-1) + 1
+        key_L, n_L = np.unique(I_ni[:, 0] * n_I + I_ni[:, 1], return_counts=True)
+        I_Li = np.column_stack([key_L // n_I, key_L % n_I])
+        return I_Li, np.where(n_L == 1, 'B', 'U')
+
+    def get_lines(self, assignment):
+        '''Lines with the given assignment (e.g. 'M', 'V', 'B')'''
+        return self.I_Li[self.assignment_L == assignment]
+
+    @property
+    def I_M_Li(self):
+        return self.get_lines('M')
+
+    @property
+    def I_V_Li(self):
+        return self.get_lines('V')
+
+    @property
+    def I_B_Li(self):
+        return self.get_lines('B')
+
+    @property
+    def I_Ei(self):
+        '''Edges of the triangulated mesh'''
+        return get_facet_edges(self.I_Fi)[0]
+
+    def get_fe_mesh(self, **kw):
+        '''Triangular finite element mesh of the pattern, keyword arguments
+        (e.g. fets) are passed to FETriangularMesh
+        '''
+        from bmcs_shell.folding.analysis.fem.fe_triangular_mesh import FETriangularMesh
+        return FETriangularMesh(X_Id=self.X_Ia, I_Fi=self.I_Fi, **kw)
+
+
+def read_fold_file(path):
+    '''Read the crease pattern of the key frame of a (gzip compressed) FOLD file
+    '''
+    with open_input(path) as f:
+        data = json.load(f)
+    if 'faces_vertices' not in data:
+        raise ValueError('the FOLD file %s contains no faces_vertices' % path)
+    vertices_coords = data.get('vertices_coords', [])
+    n_dim = len(vertices_coords[0]) if len(vertices_coords) else 3
+    X_Ia = _to_array(vertices_coords, np.float_, n_dim)
+    I_Li, assignment_L, fold_angle_L = None, None, None
+    if 'edges_vertices' in data:
+        I_Li = _to_array(data['edges_vertices'], np.int_, 2)
+        if 'edges_assignment' in data:
+            assignment_L = np.array(data['edges_assignment'], dtype='<U1')
+        if 'edges_foldAngle' in data:
+            fold_angle_L = np.array([np.nan if v is None else v for v in data['edges_foldAngle']],
+                                    dtype=np.float_)
+    return FoldPattern(X_Ia, data['faces_vertices'], I_Li, assignment_L, fold_angle_L)
+
+
+def get_fold_edges(I_Fi, I_M_Li=(), I_V_Li=()):
+    '''Edges of the triangular facets I_Fi and their FOLD assignments
+    for the mountain and valley lines I_M_Li, I_V_Li, the remaining
+    edges are boundary (B) or flat (F) edges.
+    '''
+    I_Ei, E_Fi = get_facet_edges(I_Fi)
+    n_F_E = np.bincount(E_Fi.ravel(), minlength=len(I_Ei))
+    assignment_E = np.where(n_F_E == 1, 'B', 'F')
+    n_I = np.max(I_Fi, initial=-1) + 1
+    # int64 keys, the products of int32 node numbers overflow for large meshes
+    I_Ei64 = I_Ei.astype(np.int64)
+    key_E = I_Ei64[:, 0] * n_I + I_Ei64[:, 1]
+    for assignment, I_Li in (('M', I_M_Li), ('V', I_V_Li)):
+        I_Li = np.sort(np.asarray(I_Li, dtype=np.int64).reshape(-1, 2), axis=1)
+        I_Li = I_Li[I_Li[:, 1] < n_I]
+        assignment_E[np.isin(key_E, I_Li[:, 0] * n_I + I_Li[:, 1])] = assignment
+    return I_Ei, assignment_E
+
+
+def write_fold_file(path, X_Ia, I_Fi, I_Ei=None, assignment_E=None, meta=None,
+                    indent=None, compress=None, chunk_size=CHUNK_SIZE):
+    '''Write the nodes X_Ia, the facets I_Fi and optionally the edges I_Ei with
+    their assignments assignment_E as FOLD file preceded by the properties
+    in the dictionary meta. The file is compact if indent is None and gzip
+    compressed if compress is True or the path ends with .gz.
+    '''
+    X_Ia, I_Fi = np.asarray(X_Ia, dtype=np.float_), np.asarray(I_Fi)
+    sep, colon = (', ', ': ') if indent else (',', ':')
+    arrays = [('vertices_coords', X_Ia, '%r'), ('faces_vertices', I_Fi, '%d')]
+    if I_Ei is not None:
+        arrays.append(('edges_vertices', np.asarray(I_Ei), '%d'))
+    if assignment_E is not None:
+        arrays.append(('edges_assignment', np.asarray(assignment_E), '"%s"'))
+    nl = '\n' + ' ' * indent if indent else ''
+    nl_row = nl + ' ' * indent if indent else ''
+    entries = [nl + json.dumps(key) + colon + json.dumps(value, separators=(sep.rstrip(), colon))
+               for key, value in (meta or {}).items()]
+    with open_output(path, compress) as f:
+        f.write('{' + ','.join(entries))
+        for key, A, fmt in arrays:
+            if entries:
+                f.write(',')
+            entries.append(key)
+            f.write(nl + json.dumps(key) + colon + '[')
+            if len(A):
+                row_fmt = fmt if A.ndim == 1 else '[' + sep.join([fmt] * A.shape[1]) + ']'
+                f.write(nl_row)
+                write_rows(f, A, row_fmt, sep=',' + nl_row, chunk_size=chunk_size)
+                f.write(nl)
+            f.write(']')
+        f.write('\n}\n' if indent else '}')
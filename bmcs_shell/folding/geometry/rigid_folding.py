@@ -0,0 +1,195 @@
+'''
+Kinematics of rigid origami for arbitrary triangulated crease patterns.
+
+The pattern is given by the nodes ``X_Ia`` of a reference configuration
+(flat or folded), the triangular facets ``I_Fi`` and the crease lines
+``I_Li`` (e.g. the valley and mountain lines ``I_V_Li``, ``I_M_Li`` of a
+tessellation). Rigid facets are enforced by preserving the lengths of
+all facet edges, the fold angles of the driven creases are prescribed.
+The resulting system of constraints is solved for the nodal coordinates
+by Gauss-Newton iterations using the sparse constraint Jacobian J. The
+step solves the damped normal equations (J^T J + mu I) dX = -J^T g by a
+sparse direct solver, the small damping mu selects the minimum norm step,
+so that the underdetermined motion of multi-dof patterns is resolved by
+the smallest displacement from the previous configuration. The rigid
+body motion is removed by fixing the nodes of one facet. Along a folding
+path the configurations of the previous steps are extrapolated to
+predict the next one.
+
+A crease (hinge) is stored as the nodes ``[i, j, k, l]`` with the crease
+line ``j - k`` and the opposite nodes ``i`` and ``l`` of the adjacent
+facets. The fold angle is zero in the flat state and its sign
+distinguishes the folding direction.
+
+Indices: I - node, a - dimension, F - facet, i - facet node, L - line,
+E - edge, H - hinge (crease between two facets), D - driven hinge,
+t - step of the folding path
+'''
+
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import spsolve
+
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+
+def get_hinges(I_Fi, I_Li=None):
+    '''Hinges I_Hi = [i, j, k, l] of the crease lines I_Li shared by two facets
+    of I_Fi (all interior edges if I_Li is None). Lines on the boundary
+    of the pattern are skipped.
+    '''
+    I_Fi = np.asarray(I_Fi).reshape(-1, 3)
+    I_Ei, E_Fi = get_facet_edges(I_Fi)
+    # facet corners opposite to the facet sides grouped by the edges
+    E_n = E_Fi.ravel()
+    I_opp_n = np.roll(I_Fi, -2, axis=1).ravel()
+    order_n = np.argsort(E_n, kind='stable')
+    E_n, I_opp_n = E_n[order_n], I_opp_n[order_n]
+    n_F_E = np.bincount(E_n, minlength=len(I_Ei))
+    first_E = np.cumsum(n_F_E) - n_F_E
+    E_H = np.where(n_F_E == 2)[0]
+    if I_Li is not None:
+        I_Li = np.sort(np.asarray(I_Li).reshape(-1, 2), axis=1)
+        E_L = _find_rows(I_Ei, I_Li)
+        E_H = np.intersect1d(E_H, E_L[E_L >= 0])
+    I_Hi = np.column_stack([I_opp_n[first_E[E_H]], I_Ei[E_H], I_opp_n[first_E[E_H] + 1]])
+    return I_Hi
+
+
+def _find_rows(I_Ei, I_Li):
+    '''Positions of the rows I_Li in the sorted unique rows I_Ei (-1 if missing)
+    '''
+    n_I = max(I_Ei.max(initial=0), I_Li.max(initial=0)) + 1
+    key_E = I_Ei[:, 0].astype(np.int64) * n_I + I_Ei[:, 1]
+    key_L = I_Li[:, 0].astype(np.int64) * n_I + I_Li[:, 1]
+    E_L = np.clip(np.searchsorted(key_E, key_L), 0, len(key_E) - 1)
+    return np.where(key_E[E_L] == key_L, E_L, -1)
+
+
+def get_fold_angles(X_Ia, I_Hi):
+    '''Fold angles rho_H of the hinges I_Hi (zero in the flat state)
+    '''
+    X_Hia = np.asarray(X_Ia, dtype=np.float_)[I_Hi]
+    X_i, X_j, X_k, X_l = np.moveaxis(X_Hia, 1, 0)
+    r_kj = X_k - X_j
+    n_1 = np.cross(r_kj, X_i - X_j)
+    n_2 = np.cross(r_kj, X_k - X_l)
+    e_kj = r_kj / np.linalg.norm(r_kj, axis=-1)[:, np.newaxis]
+    return np.arctan2(np.einsum('Ha,Ha->H', np.cross(n_1, n_2), e_kj),
+                      np.einsum('Ha,Ha->H', n_1, n_2))
+
+
+def get_fold_angles_grad(X_Ia, I_Hi):
+    '''Derivatives rho_Hia of the fold angles of the hinges I_Hi
+    with respect to the coordinates of their nodes
+    '''
+    X_Hia = np.asarray(X_Ia, dtype=np.float_)[I_Hi]
+    X_i, X_j, X_k, X_l = np.moveaxis(X_Hia, 1, 0)
+    r_ij, r_kj, r_kl = X_i - X_j, X_k - X_j, X_k - X_l
+    m = np.cross(r_ij, r_kj)
+    n = np.cross(r_kj, r_kl)
+    LL_kj = np.einsum('Ha,Ha->H', r_kj, r_kj)
+    L_kj = np.sqrt(LL_kj)
+    rho_i = (L_kj / np.einsum('Ha,Ha->H', m, m))[:, np.newaxis] * m
+    rho_l = -(L_kj / np.einsum('Ha,Ha->H', n, n))[:, np.newaxis] * n
+    a = (np.einsum('Ha,Ha->H', r_ij, r_kj) / LL_kj)[:, np.newaxis]
+    b = (np.einsum('Ha,Ha->H', r_kl, r_kj) / LL_kj)[:, np.newaxis]
+    rho_j = (a - 1) * rho_i - b * rho_l
+    rho_k = (b - 1) * rho_l - a * rho_i
+    return np.stack([rho_i, rho_j, rho_k, rho_l], axis=1)
+
+
+class RigidFoldingSolver:
+    '''Rigid folding of the crease pattern (X_Ia, I_Fi) with the creases I_Li
+    by prescribing the fold angles of the driven hinges D (indices into I_Hi).
+    The reference configuration X_Ia defines the lengths of the facet edges,
+    the nodes of the facet fixed_F stay in place.
+    '''
+
+    def __init__(self, X_Ia, I_Fi, I_Li=None, fixed_F=0, tol=1e-10, max_iter=25, damping=1e-10):
+        self.X_Ia = np.array(X_Ia, dtype=np.float_)
+        self.I_Fi = np.asarray(I_Fi).reshape(-1, 3)
+        self.I_Hi = get_hinges(self.I_Fi, I_Li)
+        self.I_Ei, _ = get_facet_edges(self.I_Fi)
+        self.L_E = np.linalg.norm(self.X_Ia[self.I_Ei[:, 1]] - self.X_Ia[self.I_Ei[:, 0]], axis=-1)
+        self.tol = tol
+        self.max_iter = max_iter
+        self.damping = damping
+        # numbering of the free degrees of freedom, -1 for the fixed ones
+        n_dof = self.X_Ia.size
+        fixed_dofs = (3 * self.I_Fi[fixed_F][:, np.newaxis] + np.arange(3)).ravel()
+        free_dofs = np.setdiff1d(np.arange(n_dof), fixed_dofs)
+        self.eq_dof = np.full(n_dof, -1, dtype=np.int_)
+        self.eq_dof[free_dofs] = np.arange(len(free_dofs))
+        self.n_free = len(free_dofs)
+        self.H_D = np.arange(len(self.I_Hi))
+
+    @property
+    def rho_H(self):
+        '''Fold angles of the hinges in the reference configuration
+        '''
+        return get_fold_angles(self.X_Ia, self.I_Hi)
+
+    def _get_residuum(self, X_Ia, H_D, rho_D):
+        d_Ea = X_Ia[self.I_Ei[:, 1]] - X_Ia[self.I_Ei[:, 0]]
+        LL_E = self.L_E ** 2
+        # relative length error of the edges
+        g_E = (np.einsum('Ea,Ea->E', d_Ea, d_Ea) - LL_E) / (2 * LL_E)
+        drho_D = get_fold_angles(X_Ia, self.I_Hi[H_D]) - rho_D
+        g_D = np.arctan2(np.sin(drho_D), np.cos(drho_D))
+        return np.hstack([g_E, g_D])
+
+    def _get_jacobian(self, X_Ia, H_D):
+        I_Ei, I_Di = self.I_Ei, self.I_Hi[H_D]
+        n_E, n_D = len(I_Ei), len(I_Di)
+        d_Ea = (X_Ia[I_Ei[:, 1]] - X_Ia[I_Ei[:, 0]]) / (self.L_E ** 2)[:, np.newaxis]
+        g_Eia = np.stack([-d_Ea, d_Ea], axis=1)
+        g_Dia = get_fold_angles_grad(X_Ia, I_Di)
+        data = np.hstack([g_Eia.ravel(), g_Dia.ravel()])
+        rows = np.hstack([np.repeat(np.arange(n_E), 6), n_E + np.repeat(np.arange(n_D), 12)])
+        dofs = np.hstack([(3 * I_Ei[..., np.newaxis] + np.arange(3)).ravel(),
+                          (3 * I_Di[..., np.newaxis] + np.arange(3)).ravel()])
+        cols = self.eq_dof[dofs]
+        free = cols >= 0
+        return sparse.csr_matrix((data[free], (rows[free], cols[free])), shape=(n_E + n_D, self.n_free))
+
+    def solve(self, rho_D, H_D=None, X_Ia=None):
+        '''Configuration X_Ia with the fold angles rho_D of the hinges H_D
+        (all hinges by default) closest to the start configuration X_Ia
+        (the reference configuration by default). Returns the configuration
+        and the norm of the remaining residuum.
+        '''
+        H_D = self.H_D if H_D is None else np.asarray(H_D)
+        X_Ia = np.array(self.X_Ia if X_Ia is None else X_Ia, dtype=np.float_)
+        X_d = X_Ia.reshape(-1)
+        free_dofs = np.where(self.eq_dof >= 0)[0]
+        for n_iter in range(self.max_iter + 1):
+            g = self._get_residuum(X_Ia, H_D, rho_D)
+            norm_g = np.linalg.norm(g, ord=np.inf)
+            if norm_g < self.tol or n_iter == self.max_iter:
+                break
+            J = self._get_jacobian(X_Ia, H_D)
+            JJ = (J.T @ J).tocsc()
+            # the small damping selects the minimum norm step within the free motions
+            mu = self.damping * JJ.diagonal().max()
+            dX_d = spsolve(JJ + mu * sparse.identity(self.n_free, format='csc'), -(J.T @ g))
+            X_d[free_dofs] += dX_d
+        return X_Ia, norm_g
+
+    def fold(self, rho_tD, H_D=None, X_Ia=None):
+        '''Configurations X_tIa following the path of the fold angles rho_tD
+        of the hinges H_D starting from X_Ia (the reference configuration
+        by default). The next configuration is predicted by the linear
+        extrapolation of the two previous ones. Returns the configurations
+        and the norms of the remaining residua.
+        '''
+        X_Ia = np.array(self.X_Ia if X_Ia is None else X_Ia, dtype=np.float_)
+        X_tIa, norm_g_t = [], []
+        X_prev_Ia = X_Ia
+        for rho_D in rho_tD:
+            X_pred_Ia = 2 * X_Ia - X_prev_Ia
+            X_prev_Ia = X_Ia
+            X_Ia, norm_g = self.solve(rho_D, H_D, X_pred_Ia)
+            X_tIa.append(X_Ia)
+            norm_g_t.append(norm_g)
+        return np.array(X_tIa), np.array(norm_g_t)
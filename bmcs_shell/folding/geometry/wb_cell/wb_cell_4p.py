@@ -4,6 +4,10 @@
 import bmcs_utils.api as bu
 import sympy as sp
 from bmcs_shell.folding.geometry.wb_cell.wb_cell import WBCell
+from bmcs_shell.folding.geometry import wb_kernel
+from bmcs_shell.folding.utils.rotation import \
+    q_normalize, v_normalize, q_mult, q_conjugate, qv_mult, \
+    axis_angle_to_q, q_to_axis_angle
 from sympy.algebras.quaternion import Quaternion
 import k3d
 import traits.api as tr
@@ -128,31 +132,52 @@ class WBCell4Param(WBCell, bu.InjectSymbExpr):
     def _get_n_I(self):
         return len(self.X_Ia)
 
+    kinematics = tr.Property(depends_on='+GEO')
+    '''Nodal coordinates and placement of the cell (X_Ia, delta_x, delta_phi, R_0)
+    evaluated by the stateless geometry kernel
+    '''
+    @tr.cached_property
+    def _get_kinematics(self):
+        return self.get_kinematics(self.gamma, self.a, self.b, self.c)
+
+    def get_kinematics(self, gamma, a, b, c):
+        '''Kinematics of the cell for the given parameters without changing its state
+        '''
+        return wb_kernel.get_cell_4p(gamma, a, b, c)
+
+    kinematics_params = wb_kernel.CELL_4P_PARAMS
+    '''Parameters p of the derivatives in kinematics_p'''
+
+    kinematics_p = tr.Property(depends_on='+GEO')
+    '''Derivatives of the kinematics (X_Ia_p, delta_x_p, delta_phi_p, R_0_p)
+    with respect to the parameters kinematics_params
+    '''
+    @tr.cached_property
+    def _get_kinematics_p(self):
+        return self.get_kinematics_p(self.gamma, self.a, self.b, self.c)
+
+    def get_kinematics_p(self, gamma, a, b, c):
+        return wb_kernel.get_cell_4p_p(gamma, a, b, c)
+
     X_Ia = tr.Property(depends_on='+GEO')
     '''Array with nodal coordinates I - node, a - dimension
     '''
 
     @tr.cached_property
     def _get_X_Ia(self):
-        gamma = self.gamma
-        u_2 = self.symb.get_u_2_()
-        u_3 = self.symb.get_u_3_()
-        return np.array([
-            [0, 0, 0],  # 0 point
-            [self.a, u_2, u_3],  # U++
-            [-self.a, u_2, u_3],  # U-+
-            [self.a, -u_2, u_3],  # U+-
-            [-self.a, -u_2, u_3],  # U--
-            [self.c * np.sin(gamma), 0, self.c * np.cos(gamma)],  # W0+
-            [-self.c * np.sin(gamma), 0, self.c * np.cos(gamma)]  # W0-
-        ], dtype=np.float_
-        )
+        return self.kinematics[0]
 
     I_boundary = tr.Array(np.int_, value=[[2, 1],
                                           [6, 5],
                                           [4, 3], ])
     '''Boundary nodes in 2D array to allow for generation of shell boundary nodes'''
 
+    I_shared = tr.Array(np.int_, value=wb_kernel.I_SHARED_4P)
+    '''Nodes shared with the neighbouring cells within a tessellation. Each row
+    [d_x, d_phi, i, j] states that the node i of the cell at the tessellation
+    position (x, phi) coincides with the node j of the cell at (x + d_x, phi + d_phi).
+    '''
+
     # X_theta_Ia = tr.Property(depends_on='+GEO')
     # '''Array with nodal coordinates I - node, a - dimension
     # '''
@@ -178,86 +203,18 @@ class WBCell4Param(WBCell, bu.InjectSymbExpr):
     delta_x = tr.Property(depends_on='+GEO')
     @tr.cached_property
     def _get_delta_x(self):
-        return self.symb.get_delta_x()
+        return self.kinematics[1]
 
     delta_phi = tr.Property(depends_on='+GEO')
     @tr.cached_property
     def _get_delta_phi(self):
-        return self.symb.get_delta_phi()
+        return self.kinematics[2]
 
     R_0 = tr.Property(depends_on='+GEO')
     @tr.cached_property
     def _get_R_0(self):
-        return self.symb.get_R_0()
+        return self.kinematics[3]
 
     def get_b_gamma_theta_equal(self):
         b = self.a * (1 - np.sin(self.gamma)) / np.cos(self.gamma) ** 2
         return b
-
-
-def q_normalize(q, axis=1):
-    sq = np.sqrt(np.sum(q * q, axis=axis))
-    sq[np.where(sq == 0)] = 1.e-19
-    return q / sq[:, np.newaxis]
-
-
-def v_normalize(q, axis=1):
-    sq = np.einsum('...a,...a->...', q, q)
-    sq[np.where(sq == 0)] = 1.e-19
-    return q / sq[..., np.newaxis]
-
-
-def q_mult(q1, q2):
-    w1, x1, y1, z1 = q1
-    w2, x2, y2, z2 = q2
-    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
-    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
-    y = w1 * y2 + y1 * w2 + z1 * x2 - x1 * z2
-    z = w1 * z2 + z1 * w2 + x1 * y2 - y1 * x2
-    return np.array([w, x, y, z], dtype='f')
-
-
-def q_conjugate(q):
-    qn = q_normalize(q.T).T
-    w, x, y, z = qn
-    return np.array([w, -x, -y, -z], dtype='f')
-
-
-def qv_mult(q1, u):
-    #print('q1', q1.shape, 'u', u.shape)
-    zero_re = np.zeros((u.shape[0], u.shape[1]), dtype='f')
-    #print('zero_re', zero_re.shape)
-    q2 = np.concatenate([zero_re[:, :, np.newaxis], u], axis=2)
-    #print('q2', q2.shape)
-    q2 = np.rollaxis(q2, 2)
-    #print('q2', q2.shape)
-    q12 = q_mult(q1[:, :, np.newaxis], q2[:, :, :])
-    #print('q12', q12.shape)
-    q_con = q_conjugate(q1)
-    #print('q_con', q_con.shape)
-    q = q_mult(q12, q_con[:, :, np.newaxis])
-    #print('q', q.shape)
-    q = np.rollaxis(np.rollaxis(q, 2), 2)
-    #print('q', q.shape)
-    return q[:, :, 1:]
-
-
-def axis_angle_to_q(v, theta):
-    v_ = v_normalize(v, axis=1)
-    x, y, z = v_.T
-#    print('x,y,z', x, y, z)
-    theta = theta / 2
-#    print('theta', theta)
-    w = np.cos(theta)
-    x = x * np.sin(theta)
-    y = y * np.sin(theta)
-    z = z * np.sin(theta)
-#    print('x,y,z', x, y, z)
-    return np.array([w, x, y, z], dtype='f')
-
-
-def q_to_axis_angle(q):
-    w, v = q[0, :], q[1:, :]
-    theta = np.arccos(w) * 2.0
-    return theta, v_normalize(v)
-
@@ -1,5 +1,6 @@
 import bmcs_utils.api as bu
 from bmcs_shell.folding.geometry.wb_cell.wb_cell import WBCell
+from bmcs_shell.folding.geometry import wb_kernel
 
 import traits.api as tr
 import numpy as np
@@ -29,26 +30,13 @@ class WBCell4ParamEx(WBCell4Param):
     )
 
 
-    X_Ia = tr.Property(depends_on='+GEO')
-    '''Array with nodal coordinates I - node, a - dimension
-    '''
+    def get_kinematics(self, gamma, a, b, c):
+        return wb_kernel.get_cell_4p_ex(gamma, a, b, c, self.e_x)
 
-    @tr.cached_property
-    def _get_X_Ia(self):
-        gamma = self.gamma
-        u_2 = self.symb.get_u_2_()
-        u_3 = self.symb.get_u_3_()
-        return np.array([
-            [self.e_x, 0, 0],  # O_r
-            [-self.e_x, 0, 0],  # O_l
-            [self.e_x +self.a, u_2, u_3],  # U++
-            [-self.e_x-self.a, u_2, u_3],  # U-+
-            [self.e_x +self.a, -u_2, u_3],  # U+-
-            [-self.e_x-self.a, -u_2, u_3],  # U--
-            [self.e_x + self.c * np.sin(gamma), 0, self.c * np.cos(gamma)],  # W0+
-            [-self.e_x -self.c * np.sin(gamma), 0, self.c * np.cos(gamma)]  # W0-
-        ], dtype=np.float_
-        )
+    kinematics_params = wb_kernel.CELL_4P_EX_PARAMS
+
+    def get_kinematics_p(self, gamma, a, b, c):
+        return wb_kernel.get_cell_4p_ex_p(gamma, a, b, c, self.e_x)
 
     I_Fi = tr.Property
     '''Triangle mapping '''
@@ -64,8 +52,10 @@ class WBCell4ParamEx(WBCell4Param):
                          [1, 3, 7],
                          ]).astype(np.int32)
 
-    delta_x = tr.Property(depends_on='+GEO')
-    @tr.cached_property
-    def _get_delta_x(self):
-        return self.symb.get_delta_x() + 2 * self.e_x
-
+    I_shared = tr.Array(np.int_, value=[[0, 2, 4, 2],
+                                        [0, 2, 5, 3],
+                                        [1, 1, 4, 7],
+                                        [1, 1, 6, 3],
+                                        [1, -1, 2, 7],
+                                        [1, -1, 6, 5], ])
+    '''Nodes shared with the neighbouring cells, see WBCell4Param.I_shared'''
@@ -2,6 +2,7 @@ import bmcs_utils.api as bu
 import k3d
 import traits.api as tr
 import numpy as np
+from bmcs_shell.folding.geometry import wb_kernel
 from bmcs_shell.folding.geometry.wb_cell.wb_cell import WBCell
 from numpy import sin, cos, sqrt
 
@@ -82,40 +83,16 @@ class WBCell5ParamBeta(WBCell):
         gamma = self.gamma
         beta = self.beta
 
-        # phi1 is angle between OU_ur line and z axis
-        cos_psi1 = ((b ** 2 - a ** 2) - a * sqrt(a ** 2 + b ** 2) * cos(beta)) / (b * sqrt(a ** 2 + b ** 2) * sin(beta))
-        sin_psi1 = sqrt(
-            a ** 2 * (3 * b ** 2 - a ** 2) + 2 * a * (b ** 2 - a ** 2) * sqrt(a ** 2 + b ** 2) * cos(beta) - (
-                    a ** 2 + b ** 2) ** 2 * cos(beta) ** 2) / (b * sqrt(a ** 2 + b ** 2) * sin(beta))
-        cos_psi5 = (sqrt(a ** 2 + b ** 2) * cos(beta) - a * cos(2 * gamma)) / (b * sin(2 * gamma))
-        sin_psi5 = sqrt(b ** 2 + 2 * a * sqrt(a ** 2 + b ** 2) * cos(beta) * cos(2 * gamma) - (a ** 2 + b ** 2) * (
-                cos(beta) ** 2 + cos(2 * gamma) ** 2)) / (b * sin(2 * gamma))
-        cos_psi6 = (a - sqrt(a ** 2 + b ** 2) * cos(beta) * cos(2 * gamma)) / (
-                sqrt(a ** 2 + b ** 2) * sin(beta) * sin(2 * gamma))
-        sin_psi6 = sqrt(b ** 2 + 2 * a * sqrt(a ** 2 + b ** 2) * cos(beta) * cos(2 * gamma) - (a ** 2 + b ** 2) * (
-                cos(beta) ** 2 + cos(2 * gamma) ** 2)) / (sqrt(a ** 2 + b ** 2) * sin(beta) * sin(2 * gamma))
-        cos_psi1plus6 = cos_psi1 * cos_psi6 - sin_psi1 * sin_psi6
-        sin_psi1plus6 = sin_psi1 * cos_psi6 + cos_psi1 * sin_psi6
-
-        cos_phi1 = cos_psi1plus6
-        cos_phi2 = cos_psi5
-        cos_phi3 = cos_psi5
-        cos_phi4 = cos_psi1plus6
-        sin_phi1 = sin_psi1plus6
-        sin_phi2 = sin_psi5
-        sin_phi3 = sin_psi5
-        sin_phi4 = sin_psi1plus6
-
-        U_ur = np.array(
-            [a * sin(gamma) - b * cos_phi1 * cos(gamma), b * sin_phi1, a * cos(gamma) + b * cos_phi1 * sin(gamma)])
-        U_ul = np.array(
-            [-a * sin(gamma) + b * cos_phi2 * cos(gamma), b * sin_phi2, a * cos(gamma) + b * cos_phi2 * sin(gamma)])
-        U_lr = np.array(
-            [a * sin(gamma) - b * cos_phi3 * cos(gamma), -b * sin_phi3, a * cos(gamma) + b * cos_phi3 * sin(gamma)])
-        U_ll = np.array(
-            [-a * sin(gamma) + b * cos_phi4 * cos(gamma), -b * sin_phi4, a * cos(gamma) + b * cos_phi4 * sin(gamma)])
-        V_r = np.array([c * sin(gamma), 0, c * cos(gamma)])
-        V_l = np.array([-c * sin(gamma), 0, c * cos(gamma)])
-
-        X_Ia = np.vstack((np.zeros(3), U_lr, U_ll, U_ur, U_ul, V_r, V_l)).astype(np.float32)
+        X_Ia = np.array(wb_kernel.get_cell_5p_beta_X_Ia(gamma, a, b, c, beta), dtype=np.float_)
         return X_Ia
+
+    kinematics_params = wb_kernel.CELL_5P_BETA_PARAMS
+    '''Parameters p of the derivatives in X_Ia_p'''
+
+    X_Ia_p = tr.Property(depends_on='+GEO')
+    '''Derivatives of the nodal coordinates with respect to the parameters
+    kinematics_params, I - node, a - dimension, p - parameter
+    '''
+    @tr.cached_property
+    def _get_X_Ia_p(self):
+        return wb_kernel.get_cell_5p_beta_X_Ia_p(self.gamma, self.eta, self.zeta, self.a, self.delta_beta)
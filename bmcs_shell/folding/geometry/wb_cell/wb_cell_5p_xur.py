@@ -3,7 +3,11 @@
 """
 import bmcs_utils.api as bu
 import sympy as sp
+from bmcs_shell.folding.geometry import wb_kernel
 from bmcs_shell.folding.geometry.wb_cell.wb_cell import WBCell
+from bmcs_shell.folding.utils.rotation import \
+    q_normalize, v_normalize, q_mult, q_conjugate, qv_mult, \
+    axis_angle_to_q, q_to_axis_angle
 from sympy.algebras.quaternion import Quaternion
 import k3d
 import traits.api as tr
@@ -220,6 +224,18 @@ class WBCell5ParamXur(WBCell, bu.InjectSymbExpr):
             ], dtype=np.float_
         )
 
+    kinematics_params = wb_kernel.CELL_5P_XUR_PARAMS
+    '''Parameters p of the derivatives in X_Ia_p'''
+
+    X_Ia_p = tr.Property(depends_on='+GEO')
+    '''Derivatives of the nodal coordinates with respect to the parameters
+    kinematics_params, I - node, a - dimension, p - parameter
+    '''
+    @tr.cached_property
+    def _get_X_Ia_p(self):
+        return wb_kernel.get_cell_5p_xur_X_Ia_p(self.gamma, self.x_ur, self.a, self.b, self.c,
+                                                self.y_sol1, self.x_sol1)
+
     I_boundary = tr.Array(np.int_, value=[[2,1],
                                           [6,5],
                                           [4,3],])
@@ -239,7 +255,7 @@ class WBCell5ParamXur(WBCell, bu.InjectSymbExpr):
         rotation_angles = np.array([-theta], dtype=np.float_)
         rotation_centers = np.array([X_center], dtype=np.float_)
 
-        x_single = np.array([XD_Ia], dtype='f')
+        x_single = np.array([XD_Ia], dtype=np.float_)
         x_pulled_back = x_single - rotation_centers[:, np.newaxis, :]
         q = axis_angle_to_q(rotation_axes, rotation_angles)
         x_rotated = qv_mult(q, x_pulled_back)
@@ -261,70 +277,3 @@ class WBCell5ParamXur(WBCell, bu.InjectSymbExpr):
     @tr.cached_property
     def _get_R_0(self):
         return self.symb.get_R_0()
-
-def q_normalize(q, axis=1):
-    sq = np.sqrt(np.sum(q * q, axis=axis))
-    sq[np.where(sq == 0)] = 1.e-19
-    return q / sq[:, np.newaxis]
-
-
-def v_normalize(q, axis=1):
-    sq = np.einsum('...a,...a->...', q, q)
-    sq[np.where(sq == 0)] = 1.e-19
-    return q / sq[..., np.newaxis]
-
-
-def q_mult(q1, q2):
-    w1, x1, y1, z1 = q1
-    w2, x2, y2, z2 = q2
-    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
-    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
-    y = w1 * y2 + y1 * w2 + z1 * x2 - x1 * z2
-    z = w1 * z2 + z1 * w2 + x1 * y2 - y1 * x2
-    return np.array([w, x, y, z], dtype='f')
-
-
-def q_conjugate(q):
-    qn = q_normalize(q.T).T
-    w, x, y, z = qn
-    return np.array([w, -x, -y, -z], dtype='f')
-
-
-def qv_mult(q1, u):
-    #print('q1', q1.shape, 'u', u.shape)
-    zero_re = np.zeros((u.shape[0], u.shape[1]), dtype='f')
-    #print('zero_re', zero_re.shape)
-    q2 = np.concatenate([zero_re[:, :, np.newaxis], u], axis=2)
-    #print('q2', q2.shape)
-    q2 = np.rollaxis(q2, 2)
-    #print('q2', q2.shape)
-    q12 = q_mult(q1[:, :, np.newaxis], q2[:, :, :])
-    #print('q12', q12.shape)
-    q_con = q_conjugate(q1)
-    #print('q_con', q_con.shape)
-    q = q_mult(q12, q_con[:, :, np.newaxis])
-    #print('q', q.shape)
-    q = np.rollaxis(np.rollaxis(q, 2), 2)
-    #print('q', q.shape)
-    return q[:, :, 1:]
-
-
-def axis_angle_to_q(v, theta):
-    v_ = v_normalize(v, axis=1)
-    x, y, z = v_.T
-#    print('x,y,z', x, y, z)
-    theta = theta / 2
-#    print('theta', theta)
-    w = np.cos(theta)
-    x = x * np.sin(theta)
-    y = y * np.sin(theta)
-    z = z * np.sin(theta)
-#    print('x,y,z', x, y, z)
-    return np.array([w, x, y, z], dtype='f')
-
-
-def q_to_axis_angle(q):
-    w, v = q[0, :], q[1:, :]
-    theta = np.arccos(w) * 2.0
-    return theta, v_normalize(v)
-
@@ -0,0 +1,319 @@
+'''
+Form finding of gradated waterbomb shells fitting a target surface.
+
+Each cell of the tessellation gets its own parameters ``(gamma, a, b, c)``
+and its own rigid placement (rotation vector and translation). All of
+them are found simultaneously by a trust-region least-squares solution
+minimizing
+
+ - the distances of the cell nodes to the target surface,
+ - the gaps between the coinciding nodes of the neighbouring cells and
+ - the differences of the parameters of the neighbouring cells
+   (smoothness of the gradation).
+
+Every residuum depends on the unknowns of one or two neighbouring cells
+only, the resulting banded sparsity of the Jacobian is passed to the
+solver so that it is approximated by grouped finite differences and the
+trust-region subproblems are solved by sparse LSMR iterations.
+
+The target surface is represented by sample points with normals, the
+distance of a node is evaluated to the tangent planes at the nearest
+sample points found by a KD-tree.
+
+Indices: c - cell, I - node, a - dimension, p - cell parameter,
+S - sample point of the target surface, q - unknown of a cell
+'''
+
+import bmcs_utils.api as bu
+import numpy as np
+import traits.api as tr
+from scipy.optimize import least_squares
+from scipy.sparse import csr_matrix
+from scipy.spatial import cKDTree
+from scipy.spatial.transform import Rotation
+
+from bmcs_shell.folding.geometry import wb_kernel
+from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p import WBCell4Param
+from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p_ex import WBCell4ParamEx
+from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p import WBTessellation4P
+from bmcs_shell.folding.utils.rotation import axis_angle_to_rot_matrix
+
+# unknowns of each cell: the cell parameters, rotation vector and translation
+CELL_PARAMS = ('gamma', 'a', 'b', 'c')
+N_Q = 10
+
+
+def get_cells_4p_X_cIa(p_cp, e_x=None):
+    '''Nodal coordinates X_cIa of the four-parameter cells p_cp = (gamma, a, b, c)
+    in their local coordinate system, for the offset e_x of the extended
+    cell (WBCell4ParamEx with eight nodes) if given.
+    '''
+    gamma, a, b, c = p_cp.T
+    u_2 = np.broadcast_to(wb_kernel.get_cell_4p_symb('u_2_', gamma, a, b, c), gamma.shape)
+    u_3 = np.broadcast_to(wb_kernel.get_cell_4p_symb('u_3_', gamma, a, b, c), gamma.shape)
+    # the center node O is split into O_r, O_l in the extended cell
+    n_O, e_x = (1, 0) if e_x is None else (2, e_x)
+    X_cIa = np.zeros((len(p_cp), n_O + 6, 3), dtype=np.float_)
+    X_cIa[:, :n_O, 0] = e_x * np.array([1, -1])[:n_O]
+    X_cIa[:, n_O:n_O + 4, 0] = (e_x + a)[:, np.newaxis] * np.array([1, -1, 1, -1])
+    X_cIa[:, n_O:n_O + 4, 1] = u_2[:, np.newaxis] * np.array([1, 1, -1, -1])
+    X_cIa[:, n_O:n_O + 4, 2] = u_3[:, np.newaxis]
+    X_cIa[:, n_O + 4:, 0] = (e_x + c * np.sin(gamma))[:, np.newaxis] * np.array([1, -1])
+    X_cIa[:, n_O + 4:, 2] = (c * np.cos(gamma))[:, np.newaxis]
+    return X_cIa
+
+
+def get_rigid_fit(X_cIa, Y_cIa):
+    '''Rotations R_cab and translations t_ca mapping the points X_cIa onto
+    Y_cIa (Y = R X + t) in the least-squares sense (Kabsch algorithm)
+    '''
+    X_c_a, Y_c_a = np.mean(X_cIa, axis=1), np.mean(Y_cIa, axis=1)
+    H_cab = np.einsum('cIa,cIb->cab', X_cIa - X_c_a[:, np.newaxis], Y_cIa - Y_c_a[:, np.newaxis])
+    U, _, Vt = np.linalg.svd(H_cab)
+    d_c = np.sign(np.linalg.det(np.einsum('cab,cbd->cda', U, Vt)))
+    D_cab = np.zeros_like(H_cab)
+    D_cab[:, 0, 0] = D_cab[:, 1, 1] = 1
+    D_cab[:, 2, 2] = d_c
+    R_cab = np.einsum('cba,cbd,ced->cae', Vt, D_cab, U)
+    t_ca = Y_c_a - np.einsum('cab,cb->ca', R_cab, X_c_a)
+    return R_cab, t_ca
+
+
+def get_surface_normals(X_Sa, k=16):
+    '''Unit normals n_Sa of the surface sampled by the points X_Sa estimated
+    as the direction of the smallest variance of the k nearest neighbours
+    '''
+    _, S_Sk = cKDTree(X_Sa).query(X_Sa, k=k)
+    X_Ska = X_Sa[S_Sk] - np.mean(X_Sa[S_Sk], axis=1)[:, np.newaxis]
+    _, v_Sab = np.linalg.eigh(np.einsum('Ska,Skb->Sab', X_Ska, X_Ska))
+    return v_Sab[:, :, 0]
+
+
+def get_cylinder_samples(R, x_range, phi_range, n_x=50, n_phi=100, X_axis_a=(0, 0, 0)):
+    '''Sample points X_Sa and normals n_Sa of a cylinder with the radius R
+    and the axis parallel to x through X_axis_a, with the angles phi_range
+    measured from the -z direction about the x axis.
+    '''
+    x_S, phi_S = [v.ravel() for v in np.meshgrid(np.linspace(*x_range, n_x),
+                                                 np.linspace(*phi_range, n_phi))]
+    n_Sa = np.column_stack([np.zeros_like(phi_S), np.sin(phi_S), -np.cos(phi_S)])
+    X_Sa = np.asarray(X_axis_a, dtype=np.float_) + R * n_Sa
+    X_Sa[:, 0] = x_S
+    return X_Sa, n_Sa
+
+
+class WBFormFinder(bu.Model):
+    '''Fit the cells of the tessellation wbt, each with its own parameters,
+    to the target surface sampled by X_target_Sa (with the normals
+    n_target_Sa, estimated from the samples if not given). The uniform
+    tessellation wbt provides the cell grid and the start configuration.
+    '''
+    name = 'WB Form Finder'
+
+    wbt = bu.Instance(WBTessellation4P, ())
+
+    X_target_Sa = tr.Array(np.float_)
+    n_target_Sa = tr.Array(np.float_)
+
+    I_fit = tr.Array(np.int_)
+    '''Cell nodes fitted to the target surface (all nodes of the cell of wbt by default)'''
+
+    def _I_fit_default(self):
+        return np.arange(self.wbt.wb_cell.n_I)
+
+    w_gap = bu.Float(10.)
+    '''Weight of the gaps between the neighbouring cells'''
+
+    free_params = tr.List(['gamma', 'b', 'c'])
+    '''Cell parameters optimized individually for each cell'''
+
+    w_smooth = bu.Float(0.1)
+    '''Weight of the differences of the parameters of the neighbouring cells'''
+
+    w_reg = bu.Float(1e-3)
+    '''Weight of the deviation of the parameters from their start values'''
+
+    gamma_bounds = tr.Tuple(0.05, np.pi / 2 - 0.01)
+
+    w_invalid = bu.Float(1.)
+    '''Residuum (relative to L) replacing the residua of the cells outside
+    of the valid parameter domain which have no coordinates'''
+
+    ipw_view = bu.View(
+        bu.Item('w_gap'),
+        bu.Item('w_smooth'),
+        bu.Item('w_reg'),
+    )
+
+    target_tree = tr.Property(depends_on='X_target_Sa')
+
+    @tr.cached_property
+    def _get_target_tree(self):
+        return cKDTree(self.X_target_Sa)
+
+    target_normals_Sa = tr.Property(depends_on='X_target_Sa, n_target_Sa')
+
+    @tr.cached_property
+    def _get_target_normals_Sa(self):
+        if len(self.n_target_Sa) == len(self.X_target_Sa):
+            return self.n_target_Sa / np.linalg.norm(self.n_target_Sa, axis=-1)[:, np.newaxis]
+        return get_surface_normals(self.X_target_Sa)
+
+    h_target = tr.Property(depends_on='X_target_Sa')
+    '''Smoothing length of the target surface (twice the median sample spacing)'''
+
+    @tr.cached_property
+    def _get_h_target(self):
+        d_S, _ = self.target_tree.query(self.X_target_Sa, k=2)
+        return 2 * np.median(d_S[:, 1])
+
+    def get_target_distance(self, X_na, k=8):
+        '''Signed distances of the points X_na to the target surface given by
+        the tangent planes of the k nearest samples averaged with Gaussian
+        weights (moving least-squares surface), which varies smoothly with
+        the points unlike the distance to the plane of the nearest sample.
+        The distances of the points without coordinates are NaN.
+        '''
+        d_n = np.full(len(X_na), np.nan)
+        # cells outside of the valid parameter domain have no coordinates
+        valid_n = np.all(np.isfinite(X_na), axis=1)
+        X_na = X_na[valid_n]
+        d_nk, S_nk = self.target_tree.query(X_na, k=k)
+        w_nk = np.exp(-(d_nk - d_nk[:, :1]) ** 2 / self.h_target ** 2)
+        d_plane_nk = np.einsum('nka,nka->nk', X_na[:, np.newaxis] - self.X_target_Sa[S_nk],
+                               self.target_normals_Sa[S_nk])
+        d_n[valid_n] = np.sum(w_nk * d_plane_nk, axis=1) / np.sum(w_nk, axis=1)
+        return d_n
+
+    I_pairs = tr.Property(depends_on='wbt, wbt.+GEO')
+    '''Pairs of coinciding nodes of the neighbouring cells (cell * n_I + node)'''
+
+    @tr.cached_property
+    def _get_I_pairs(self):
+        return self.wbt.I_shared_pairs
+
+    C_pairs = tr.Property(depends_on='wbt, wbt.+GEO')
+    '''Pairs of neighbouring cells'''
+
+    @tr.cached_property
+    def _get_C_pairs(self):
+        C_pairs = np.unique(np.sort(self.I_pairs // self.wbt.wb_cell.n_I, axis=1), axis=0)
+        return C_pairs[C_pairs[:, 0] != C_pairs[:, 1]]
+
+    L = tr.Property(depends_on='wbt, wbt.+GEO')
+    '''Reference length scaling the residua and the cell dimensions'''
+
+    @tr.cached_property
+    def _get_L(self):
+        return max(self.wbt.a, self.wbt.b, self.wbt.c)
+
+    e_x = tr.Property(depends_on='wbt, wbt.+GEO')
+    '''Offset of the center nodes of the extended cell, None for the 4P cell'''
+
+    @tr.cached_property
+    def _get_e_x(self):
+        wb_cell = self.wbt.wb_cell
+        return wb_cell.e_x if isinstance(wb_cell, WBCell4ParamEx) else None
+
+    def get_start_q_cq(self):
+        '''Unknowns of the cells of the uniform tessellation wbt
+        '''
+        wbt = self.wbt
+        n_c = wbt.n_cells
+        p_cp = np.tile([wbt.wb_cell.gamma, wbt.a, wbt.b, wbt.c], (n_c, 1))
+        R_cab, t_ca = get_rigid_fit(get_cells_4p_X_cIa(p_cp, self.e_x), wbt.get_X_cells_Ia())
+        q_cq = np.hstack([p_cp, Rotation.from_matrix(R_cab).as_rotvec(), t_ca])
+        q_cq[:, 1:4] /= self.L
+        q_cq[:, 7:] /= self.L
+        return q_cq
+
+    def get_X_cIa(self, q_cq):
+        '''Nodal coordinates of the placed cells for the unknowns q_cq
+        '''
+        p_cp = q_cq[:, :4] * [1, self.L, self.L, self.L]
+        w_ca, t_ca = q_cq[:, 4:7], q_cq[:, 7:] * self.L
+        R_cab = axis_angle_to_rot_matrix(w_ca, np.linalg.norm(w_ca, axis=-1))
+        return np.einsum('cab,cIb->cIa', R_cab, get_cells_4p_X_cIa(p_cp, self.e_x)) + t_ca[:, np.newaxis]
+
+    def get_free_q(self):
+        '''Mask of the free unknowns of a cell, the parameters not included
+        in free_params are kept at their start values
+        '''
+        return np.hstack([np.isin(CELL_PARAMS, self.free_params), np.ones(6, dtype=np.bool_)])
+
+    def get_residuum(self, x, q0_cq):
+        '''Residuum for the free unknowns x of all cells, q0_cq provides
+        the start values of the unknowns
+        '''
+        free_q = self.get_free_q()
+        q_cq = np.copy(q0_cq)
+        q_cq[:, free_q] = x.reshape(len(q_cq), -1)
+        X_cIa = self.get_X_cIa(q_cq)
+        X_Ia = X_cIa.reshape(-1, 3)
+        # gaps between the cells
+        g_gap = (X_Ia[self.I_pairs[:, 0]] - X_Ia[self.I_pairs[:, 1]]).ravel() * (self.w_gap / self.L)
+        # distances to the tangent planes of the target surface
+        g_dist = self.get_target_distance(X_cIa[:, self.I_fit].reshape(-1, 3)) / self.L
+        # smoothness of the gradation and deviation from the start values
+        p_cp, p0_cp = q_cq[:, :4][:, free_q[:4]], q0_cq[:, :4][:, free_q[:4]]
+        C_1, C_2 = self.C_pairs.T
+        g_smooth = (p_cp[C_1] - p_cp[C_2]).ravel() * self.w_smooth
+        g_reg = (p_cp - p0_cp).ravel() * self.w_reg
+        g = np.hstack([g_gap, g_dist, g_smooth, g_reg])
+        # finite penalty of the invalid cells, the solver then rejects the trial step
+        return np.where(np.isfinite(g), g, self.w_invalid)
+
+    def get_jac_sparsity(self, n_c):
+        '''Cell-local sparsity pattern of the Jacobian of get_residuum
+        '''
+        n_q = np.sum(self.get_free_q())
+        n_p = n_q - 6
+        n_pairs, n_fit, n_C = len(self.I_pairs), len(self.I_fit), len(self.C_pairs)
+        # rows of the residua (grouped by the cells they depend on) and their cells
+        n_rows = [3 * n_pairs, n_fit * n_c, n_p * n_C, n_p * n_c]
+        row_0 = np.cumsum([0] + n_rows)
+        rows_c = [(row_0[0] + 3 * np.arange(n_pairs)[:, np.newaxis] + np.arange(3)).repeat(2, axis=0),
+                  row_0[1] + n_fit * np.arange(n_c)[:, np.newaxis] + np.arange(n_fit),
+                  (row_0[2] + n_p * np.arange(n_C)[:, np.newaxis] + np.arange(n_p)).repeat(2, axis=0),
+                  row_0[3] + n_p * np.arange(n_c)[:, np.newaxis] + np.arange(n_p)]
+        C_pairs = self.I_pairs // self.wbt.wb_cell.n_I
+        cells = [C_pairs.ravel(), np.arange(n_c), self.C_pairs.ravel(), np.arange(n_c)]
+        rows, cols = [], []
+        for rows_rk, c_r in zip(rows_c, cells):
+            rows.append(np.repeat(rows_rk.ravel(), n_q))
+            cols.append((n_q * np.repeat(c_r, rows_rk.shape[1])[:, np.newaxis] + np.arange(n_q)).ravel())
+        rows, cols = np.hstack(rows), np.hstack(cols)
+        return csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(row_0[-1], n_q * n_c))
+
+    def solve(self, q_cq=None, **kw):
+        '''Optimize the unknowns q_cq of all cells starting from q_cq
+        (the uniform tessellation by default). The keyword arguments
+        are passed to scipy.optimize.least_squares. Returns the
+        optimized cell parameters p_cp = (gamma, a, b, c), the nodal
+        coordinates of the placed cells X_cIa and the solver result.
+        '''
+        q_cq = self.get_start_q_cq() if q_cq is None else np.asarray(q_cq, dtype=np.float_)
+        n_c = len(q_cq)
+        lower_q = np.full(N_Q, -np.inf)
+        upper_q = np.full(N_Q, np.inf)
+        lower_q[:4] = self.gamma_bounds[0], 1e-3, 1e-3, 1e-3
+        upper_q[0] = self.gamma_bounds[1]
+        q_cq = np.clip(q_cq, lower_q, upper_q)
+        free_q = self.get_free_q()
+        # the accuracy of the fit is limited by the sampling of the target surface
+        kw.setdefault('ftol', 1e-5)
+        res = least_squares(self.get_residuum, q_cq[:, free_q].ravel(), args=(q_cq,),
+                            jac_sparsity=self.get_jac_sparsity(n_c),
+                            bounds=(np.tile(lower_q[free_q], n_c), np.tile(upper_q[free_q], n_c)),
+                            method='trf', tr_solver='lsmr', **kw)
+        q_cq[:, free_q] = res.x.reshape(n_c, -1)
+        p_cp = q_cq[:, :4] * [1, self.L, self.L, self.L]
+        return p_cp, self.get_X_cIa(q_cq), res
+
+    def get_wb_cells(self, p_cp):
+        '''Cells with the optimized parameters p_cp, e.g. to set up the wb_cells
+        of WBNumTessellationGrad, their positions are given by wbt.cell_grid
+        '''
+        if self.e_x is None:
+            return [WBCell4Param(gamma=gamma, a=a, b=b, c=c) for gamma, a, b, c in p_cp]
+        return [WBCell4ParamEx(gamma=gamma, a=a, b=b, c=c, e_x=self.e_x) for gamma, a, b, c in p_cp]
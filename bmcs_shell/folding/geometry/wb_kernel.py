@@ -0,0 +1,743 @@
+'''
+Functional kernel of the waterbomb cell and tessellation geometry.
+
+The functions in this module take the design parameters and plain
+arrays as input and return new arrays. They do not keep or modify
+any state so that they can be evaluated concurrently within thread
+and process pools. The traits models ``WBCell4Param``,
+``WBTessellation4P`` and ``WbParamDesigner`` are cached wrappers
+around this kernel.
+
+Index convention: c - cell, I - node, a - dimension, F - facet,
+i - facet node, x, y - cell position along x and phi (y),
+j - cell node in the order of merged node numbers,
+p - cell parameter of a derivative (suffix _p).
+'''
+
+import functools
+
+import numpy as np
+
+from bmcs_shell.folding.utils.rotation import rotate_points, axis_angle_to_rot_matrix
+
+# Facets of the waterbomb cell
+I_FI_CELL_4P = np.array([[0, 1, 2], [0, 3, 4], [0, 1, 5],
+                         [0, 5, 3], [0, 2, 6], [0, 6, 4]], dtype=np.int32)
+
+# Nodes shared with the neighbouring cells [d_x, d_phi, node, neighbour node]
+I_SHARED_4P = np.array([[0, 2, 3, 1],
+                        [0, 2, 4, 2],
+                        [1, 1, 3, 6],
+                        [1, 1, 5, 2],
+                        [1, -1, 1, 6],
+                        [1, -1, 5, 4]], dtype=np.int32)
+
+# Facets of the outer cells removed by trimming
+# (along x first cell, along x last cell, along y first cell, along y last cell)
+FACETS_TO_TRIM_4P = ((4, 5), (2, 3), (0, 2, 4), (1, 3, 5))
+
+# Nodes of the first and last outer cell rows moved into the mid point
+# of a node pair when trimming along x [row, node to move, other node]
+NODES_TO_ALIGN_4P = ((-1, 3, 4), (0, 4, 3))
+
+
+# ------------------------------------------------------------------
+# Cell kinematics
+# ------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def _get_symb_4p_callables():
+    '''Lambdify the symbolic expressions of the four-parameter cell once
+    per process. The import is delayed to avoid circular imports.
+    '''
+    import sympy as sp
+    from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p import WBCellSymb4Param as S
+    params = (S.gamma, S.a, S.b, S.c)
+    return {name: sp.lambdify(params, getattr(S, name), 'numpy')
+            for name in ['u_2_', 'u_3_', 'R_0', 'delta_phi', 'delta_x', 'H', 'theta_sol']}
+
+
+def get_cell_4p_symb(name, gamma, a, b, c):
+    '''Evaluate the symbolic expression ``name`` of ``WBCellSymb4Param``
+    for the parameters ``gamma, a, b, c`` (scalars or broadcastable arrays).
+    '''
+    return _get_symb_4p_callables()[name](gamma, a, b, c)
+
+
+def get_cell_4p_X_Ia(gamma, a, b, c):
+    '''Nodal coordinates of the four-parameter waterbomb cell.
+    '''
+    u_2 = get_cell_4p_symb('u_2_', gamma, a, b, c)
+    u_3 = get_cell_4p_symb('u_3_', gamma, a, b, c)
+    return np.array([
+        [0, 0, 0],  # 0 point
+        [a, u_2, u_3],  # U++
+        [-a, u_2, u_3],  # U-+
+        [a, -u_2, u_3],  # U+-
+        [-a, -u_2, u_3],  # U--
+        [c * np.sin(gamma), 0, c * np.cos(gamma)],  # W0+
+        [-c * np.sin(gamma), 0, c * np.cos(gamma)]  # W0-
+    ], dtype=np.float_)
+
+
+def get_cell_4p_placement(gamma, a, b, c):
+    '''Return the spacing of the cells along x, the angle between
+    the cells along phi and the radius of the tessellation
+    ``(delta_x, delta_phi, R_0)``.
+    '''
+    return (get_cell_4p_symb('delta_x', gamma, a, b, c),
+            get_cell_4p_symb('delta_phi', gamma, a, b, c),
+            get_cell_4p_symb('R_0', gamma, a, b, c))
+
+
+def get_cell_4p(gamma, a, b, c):
+    '''Kinematics of the four-parameter cell ``(X_Ia, delta_x, delta_phi, R_0)``.
+    '''
+    return (get_cell_4p_X_Ia(gamma, a, b, c),) + get_cell_4p_placement(gamma, a, b, c)
+
+
+def get_cell_4p_ex(gamma, a, b, c, e_x):
+    '''Kinematics of the four-parameter cell extended by the offset
+    ``e_x`` of the two center nodes ``(X_Ia, delta_x, delta_phi, R_0)``.
+    '''
+    u_2 = get_cell_4p_symb('u_2_', gamma, a, b, c)
+    u_3 = get_cell_4p_symb('u_3_', gamma, a, b, c)
+    X_Ia = np.array([
+        [e_x, 0, 0],  # O_r
+        [-e_x, 0, 0],  # O_l
+        [e_x + a, u_2, u_3],  # U++
+        [-e_x - a, u_2, u_3],  # U-+
+        [e_x + a, -u_2, u_3],  # U+-
+        [-e_x - a, -u_2, u_3],  # U--
+        [e_x + c * np.sin(gamma), 0, c * np.cos(gamma)],  # W0+
+        [-e_x - c * np.sin(gamma), 0, c * np.cos(gamma)]  # W0-
+    ], dtype=np.float_)
+    delta_x, delta_phi, R_0 = get_cell_4p_placement(gamma, a, b, c)
+    return X_Ia, delta_x + 2 * e_x, delta_phi, R_0
+
+
+# Derivatives with respect to the cell parameters
+# (index p in the order of CELL_4P_PARAMS)
+
+CELL_4P_PARAMS = ('gamma', 'a', 'b', 'c')
+
+
+@functools.lru_cache(maxsize=None)
+def _get_symb_4p_jacobian_callables():
+    '''Differentiate the symbolic expressions of the four-parameter cell with
+    respect to (gamma, a, b, c) and lambdify the derivatives once per process.
+    '''
+    import sympy as sp
+    from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p import WBCellSymb4Param as S
+    params = (S.gamma, S.a, S.b, S.c)
+    return {name: sp.lambdify(params, [sp.diff(getattr(S, name), p) for p in params], 'numpy', cse=True)
+            for name in ['u_2_', 'u_3_', 'R_0', 'delta_phi', 'delta_x']}
+
+
+def get_cell_4p_symb_p(name, gamma, a, b, c):
+    '''Derivatives of the symbolic expression ``name`` of ``WBCellSymb4Param``
+    with respect to (gamma, a, b, c) for scalars or broadcastable arrays of
+    parameters, returns an array with the derivatives in the last index p.
+    '''
+    shape = np.broadcast(gamma, a, b, c).shape
+    d_p = _get_symb_4p_jacobian_callables()[name](gamma, a, b, c)
+    return np.stack([np.broadcast_to(d, shape) for d in d_p], axis=-1).astype(np.float_)
+
+
+def get_cell_4p_X_Ia_p(gamma, a, b, c):
+    '''Derivatives of the nodal coordinates of the four-parameter cell
+    with respect to (gamma, a, b, c), ... - parameter batch, I, a, p
+    '''
+    gamma, a, b, c = np.broadcast_arrays(*[np.asarray(x, dtype=np.float_) for x in (gamma, a, b, c)])
+    u_2_p = get_cell_4p_symb_p('u_2_', gamma, a, b, c)
+    u_3_p = get_cell_4p_symb_p('u_3_', gamma, a, b, c)
+    a_p = np.zeros_like(u_2_p)
+    a_p[..., 1] = 1
+    W_x_p, W_z_p = np.zeros_like(u_2_p), np.zeros_like(u_2_p)
+    W_x_p[..., 0], W_x_p[..., 3] = c * np.cos(gamma), np.sin(gamma)
+    W_z_p[..., 0], W_z_p[..., 3] = -c * np.sin(gamma), np.cos(gamma)
+    zero_p = np.zeros_like(u_2_p)
+    X_Iap = [
+        [zero_p, zero_p, zero_p],  # 0 point
+        [a_p, u_2_p, u_3_p],  # U++
+        [-a_p, u_2_p, u_3_p],  # U-+
+        [a_p, -u_2_p, u_3_p],  # U+-
+        [-a_p, -u_2_p, u_3_p],  # U--
+        [W_x_p, zero_p, W_z_p],  # W0+
+        [-W_x_p, zero_p, W_z_p]  # W0-
+    ]
+    return np.stack([np.stack(X_ap, axis=-2) for X_ap in X_Iap], axis=-3)
+
+
+def get_cell_4p_placement_p(gamma, a, b, c):
+    '''Derivatives of ``(delta_x, delta_phi, R_0)`` with respect to (gamma, a, b, c)
+    '''
+    return (get_cell_4p_symb_p('delta_x', gamma, a, b, c),
+            get_cell_4p_symb_p('delta_phi', gamma, a, b, c),
+            get_cell_4p_symb_p('R_0', gamma, a, b, c))
+
+
+def get_cell_4p_p(gamma, a, b, c):
+    '''Derivatives of the kinematics of the four-parameter cell
+    ``(X_Ia_p, delta_x_p, delta_phi_p, R_0_p)`` with respect to (gamma, a, b, c).
+    '''
+    return (get_cell_4p_X_Ia_p(gamma, a, b, c),) + get_cell_4p_placement_p(gamma, a, b, c)
+
+
+CELL_4P_EX_PARAMS = CELL_4P_PARAMS + ('e_x',)
+
+
+def get_cell_4p_ex_p(gamma, a, b, c, e_x):
+    '''Derivatives of the kinematics of the extended four-parameter cell
+    ``(X_Ia_p, delta_x_p, delta_phi_p, R_0_p)`` with respect to (gamma, a, b, c, e_x).
+    '''
+    X_Ia_p = get_cell_4p_X_Ia_p(gamma, a, b, c)
+    # nodes of the extended cell in terms of the nodes of the four-parameter cell
+    X_Ia_p = np.concatenate([X_Ia_p[..., [0, 0, 1, 2, 3, 4, 5, 6], :, :],
+                             np.zeros(X_Ia_p.shape[:-3] + (8, 3, 1))], axis=-1)
+    X_Ia_p[..., 0, -1] = [1, -1, 1, -1, 1, -1, 1, -1]
+    delta_x_p, delta_phi_p, R_0_p = [
+        np.concatenate([d_p, np.zeros(d_p.shape[:-1] + (1,))], axis=-1)
+        for d_p in get_cell_4p_placement_p(gamma, a, b, c)]
+    delta_x_p[..., -1] = 2
+    return X_Ia_p, delta_x_p, delta_phi_p, R_0_p
+
+
+def get_cell_5p_beta_X_Ia(gamma, a, b, c, beta, m=np):
+    '''Nodal coordinates of the five-parameter cell with the angle beta
+    (WBCell5ParamBeta) as nested lists, the functions sin, cos and sqrt are
+    taken from the module m (numpy or sympy).
+    '''
+    sin, cos, sqrt = m.sin, m.cos, m.sqrt
+    # psi1 is the angle between the OU_ur line and the z axis
+    cos_psi1 = ((b ** 2 - a ** 2) - a * sqrt(a ** 2 + b ** 2) * cos(beta)) / (b * sqrt(a ** 2 + b ** 2) * sin(beta))
+    sin_psi1 = sqrt(
+        a ** 2 * (3 * b ** 2 - a ** 2) + 2 * a * (b ** 2 - a ** 2) * sqrt(a ** 2 + b ** 2) * cos(beta) - (
+                a ** 2 + b ** 2) ** 2 * cos(beta) ** 2) / (b * sqrt(a ** 2 + b ** 2) * sin(beta))
+    cos_psi5 = (sqrt(a ** 2 + b ** 2) * cos(beta) - a * cos(2 * gamma)) / (b * sin(2 * gamma))
+    sin_psi5 = sqrt(b ** 2 + 2 * a * sqrt(a ** 2 + b ** 2) * cos(beta) * cos(2 * gamma) - (a ** 2 + b ** 2) * (
+            cos(beta) ** 2 + cos(2 * gamma) ** 2)) / (b * sin(2 * gamma))
+    cos_psi6 = (a - sqrt(a ** 2 + b ** 2) * cos(beta) * cos(2 * gamma)) / (
+            sqrt(a ** 2 + b ** 2) * sin(beta) * sin(2 * gamma))
+    sin_psi6 = sqrt(b ** 2 + 2 * a * sqrt(a ** 2 + b ** 2) * cos(beta) * cos(2 * gamma) - (a ** 2 + b ** 2) * (
+            cos(beta) ** 2 + cos(2 * gamma) ** 2)) / (sqrt(a ** 2 + b ** 2) * sin(beta) * sin(2 * gamma))
+    cos_phi14 = cos_psi1 * cos_psi6 - sin_psi1 * sin_psi6
+    sin_phi14 = sin_psi1 * cos_psi6 + cos_psi1 * sin_psi6
+    cos_phi23, sin_phi23 = cos_psi5, sin_psi5
+    return [
+        [0, 0, 0],  # 0 point
+        [a * sin(gamma) - b * cos_phi23 * cos(gamma), -b * sin_phi23,
+         a * cos(gamma) + b * cos_phi23 * sin(gamma)],  # U+-
+        [-a * sin(gamma) + b * cos_phi14 * cos(gamma), -b * sin_phi14,
+         a * cos(gamma) + b * cos_phi14 * sin(gamma)],  # U--
+        [a * sin(gamma) - b * cos_phi14 * cos(gamma), b * sin_phi14,
+         a * cos(gamma) + b * cos_phi14 * sin(gamma)],  # U++
+        [-a * sin(gamma) + b * cos_phi23 * cos(gamma), b * sin_phi23,
+         a * cos(gamma) + b * cos_phi23 * sin(gamma)],  # U-+
+        [c * sin(gamma), 0, c * cos(gamma)],  # V_r
+        [-c * sin(gamma), 0, c * cos(gamma)]  # V_l
+    ]
+
+
+# Derivatives of the nodes of the five-parameter cells given in closed form
+# (index p in the order of CELL_5P_XUR_PARAMS and CELL_5P_BETA_PARAMS)
+
+CELL_5P_XUR_PARAMS = ('gamma', 'x_ur', 'a', 'b', 'c')
+
+
+@functools.lru_cache(maxsize=None)
+def _get_symb_5p_xur_X_Ia():
+    '''Nodal coordinates of WBCell5ParamXur as sympy matrices of the
+    parameters for the four combinations of the roots (y_sol1, x_sol1)
+    '''
+    from bmcs_shell.folding.geometry.wb_cell.wb_cell_5p_xur import WBCell5ParamXurSymb as S
+    X_Ia = {}
+    for y_sol1, k in [(True, 1), (False, 2)]:
+        subs_ABC = {S.A: getattr(S, 'A%d_' % k), S.B: getattr(S, 'B%d_' % k), S.C: getattr(S, 'C%d_' % k)}
+        for x_sol1, l in [(True, 1), (False, 2)]:
+            x_ul = getattr(S, 'x_ul%d%d_' % (k, l)).subs(subs_ABC)
+            y_ur, y_ul, z_ur, z_ul = [getattr(S, name).subs(S.x_ul, x_ul) for name in
+                                      ('y_ur%d_' % k, 'y_ul%d_' % k, 'z_ur_', 'z_ul_')]
+            X_Ia[y_sol1, x_sol1] = [[0, 0, 0], [S.x_ur, y_ur, z_ur], [x_ul, y_ul, z_ul],
+                                    [-x_ul, -y_ul, z_ul], [-S.x_ur, -y_ur, z_ur],
+                                    list(S.V_r_1), list(S.V_l_1)]
+    return (S.gamma, S.x_ur, S.a, S.b, S.c), X_Ia
+
+
+@functools.lru_cache(maxsize=None)
+def _get_symb_5p_jacobian_callable(cell, *key):
+    '''Differentiate the nodal coordinates of the five-parameter cell
+    ('xur' with the roots key or 'beta') with respect to its parameters and
+    lambdify the derivatives once per process
+    '''
+    import sympy as sp
+    if cell == 'xur':
+        params, X_Ia = _get_symb_5p_xur_X_Ia()
+        X_Ia = X_Ia[key]
+    else:
+        params = sp.symbols('gamma, eta, zeta, a, delta_beta')
+        gamma, eta, zeta, a, delta_beta = params
+        b, c = eta * a, zeta * a
+        beta = sp.acos(a * (1 - 2 * sp.sin(gamma)) / sp.sqrt(a ** 2 + b ** 2)) + delta_beta
+        X_Ia = get_cell_5p_beta_X_Ia(gamma, a, b, c, beta, sp)
+    X_Iap = [sp.diff(X, p) for X_a in X_Ia for X in X_a for p in params]
+    return sp.lambdify(params, X_Iap, 'numpy', cse=True)
+
+
+def _get_cell_5p_X_Ia_p(callable_, *params):
+    params = np.broadcast_arrays(*[np.asarray(x, dtype=np.float_) for x in params])
+    shape = params[0].shape
+    X_Iap = callable_(*params)
+    return np.stack([np.broadcast_to(d, shape) for d in X_Iap], axis=-1).reshape(
+        shape + (7, 3, len(params))).astype(np.float_)
+
+
+def get_cell_5p_xur_X_Ia_p(gamma, x_ur, a, b, c, y_sol1=True, x_sol1=True):
+    '''Derivatives of the nodal coordinates of WBCell5ParamXur with respect to
+    (gamma, x_ur, a, b, c) for the chosen roots, ... - parameter batch, I, a, p
+    '''
+    return _get_cell_5p_X_Ia_p(_get_symb_5p_jacobian_callable('xur', bool(y_sol1), bool(x_sol1)),
+                               gamma, x_ur, a, b, c)
+
+
+CELL_5P_BETA_PARAMS = ('gamma', 'eta', 'zeta', 'a', 'delta_beta')
+
+
+def get_cell_5p_beta_X_Ia_p(gamma, eta, zeta, a, delta_beta):
+    '''Derivatives of the nodal coordinates of WBCell5ParamBeta with respect to
+    (gamma, eta, zeta, a, delta_beta), ... - parameter batch, I, a, p
+    '''
+    return _get_cell_5p_X_Ia_p(_get_symb_5p_jacobian_callable('beta'), gamma, eta, zeta, a, delta_beta)
+
+
+# ------------------------------------------------------------------
+# Parameter c of the tessellations with a prescribed shape
+# ------------------------------------------------------------------
+
+def round_c(c):
+    '''Round c to the values accepted by the cell'''
+    # TODO: this round is a workaround because the wb_cell will accept only 5-multiplication c values
+    #  (c_max = 2000 and it has 400 steps), make c steps 2000 in wb_cell to improve accuracy (but slow render)
+    return 5 * round(c / 5)
+
+
+def get_c_4p_ss(gamma, a):
+    '''Parameter c of the tessellation with simply supported edges'''
+    return round_c(a / np.sin(gamma))
+
+
+def get_c_4p_flat(gamma, a):
+    '''Parameter c of the tessellation with flat edges'''
+    return round_c(a * (1 - np.sin(gamma)) / np.cos(gamma) ** 2)
+
+
+# ------------------------------------------------------------------
+# Cell placement
+# ------------------------------------------------------------------
+
+def get_phi_range(delta_phi, n_phi_plus):
+    return np.arange(-(n_phi_plus - 1), n_phi_plus) * delta_phi
+
+
+def get_X_phi_range(delta_phi, R_0, n_phi_plus):
+    '''Given an array of angles and radius return an array of coordinates
+    '''
+    phi_range = get_phi_range(delta_phi, n_phi_plus)
+    return np.array([np.fabs(R_0) * np.sin(phi_range),
+                     np.fabs(R_0) * np.cos(phi_range) + R_0]).T
+
+
+def get_X_x_range(delta_x, n_x_plus):
+    return np.arange(-(n_x_plus - 1), n_x_plus) * delta_x
+
+
+def get_cell_map(n_phi_plus, n_x_plus):
+    '''Return the number of cells, of the C and D cells and the x and phi
+    indices of the C and D cells within the tessellation
+    ``(n_cells, n_ic, n_id, idx_x_ic, idx_x_id, idx_phi_ic, idx_phi_id)``.
+    '''
+    n_idx_x = 2 * n_x_plus - 1
+    n_idx_phi = 2 * n_phi_plus - 1
+    idx_x = np.arange(n_idx_x)
+    idx_phi = np.arange(n_idx_phi)
+
+    idx_x_ic = idx_x[(n_idx_x) % 2::2]
+    idx_x_id = idx_x[(n_idx_x + 1) % 2::2]
+    idx_phi_ic = idx_phi[(n_idx_phi) % 2::2]
+    idx_phi_id = idx_phi[(n_idx_phi + 1) % 2::2]
+
+    n_ic = len(idx_x_ic) * len(idx_phi_ic)
+    n_id = len(idx_x_id) * len(idx_phi_id)
+
+    n_cells = n_ic + n_id
+    return n_cells, n_ic, n_id, idx_x_ic, idx_x_id, idx_phi_ic, idx_phi_id
+
+
+def get_cell_grid(n_phi_plus, n_x_plus):
+    '''Position of the cells within the (x, phi) index space of the tessellation.
+    Returns the x and phi indices of each cell c (C cells first) and
+    the grid of cell numbers with -1 at positions not occupied by a cell.
+    '''
+    n_cells, n_ic, n_id, idx_x_ic, idx_x_id, idx_phi_ic, idx_phi_id = \
+        get_cell_map(n_phi_plus, n_x_plus)
+    C_xp = np.full((2 * n_x_plus - 1, 2 * n_phi_plus - 1), -1, dtype=np.int_)
+    C_xp[np.ix_(idx_x_ic, idx_phi_ic)] = np.arange(n_ic).reshape(len(idx_x_ic), len(idx_phi_ic))
+    C_xp[np.ix_(idx_x_id, idx_phi_id)] = n_ic + np.arange(n_id).reshape(len(idx_x_id), len(idx_phi_id))
+    idx_x_c = np.hstack([np.repeat(idx_x_ic, len(idx_phi_ic)), np.repeat(idx_x_id, len(idx_phi_id))])
+    idx_phi_c = np.hstack([np.tile(idx_phi_ic, len(idx_x_ic)), np.tile(idx_phi_id, len(idx_x_id))])
+    return idx_x_c, idx_phi_c, C_xp
+
+
+def get_cell_row_chunks(n_phi_plus, n_x_plus, chunk_size):
+    '''Split the cells into slices of complete rows along phi
+    with at most chunk_size cells (at least one row per slice).
+    '''
+    n_cells, n_ic, n_id, idx_x_ic, idx_x_id, idx_phi_ic, idx_phi_id = \
+        get_cell_map(n_phi_plus, n_x_plus)
+    c_row_ends = np.hstack([np.arange(1, len(idx_x_ic) + 1) * len(idx_phi_ic),
+                            n_ic + np.arange(1, len(idx_x_id) + 1) * len(idx_phi_id)])
+    chunks = []
+    c_start, c_last = 0, 0
+    for c_end in c_row_ends:
+        if c_end - c_start > chunk_size and c_last > c_start:
+            chunks.append(slice(c_start, c_last))
+            c_start = c_last
+        c_last = c_end
+    chunks.append(slice(c_start, c_last))
+    return chunks
+
+
+def get_X_phi_Ia(X_Ia, delta_phi, R_0, n_phi_plus):
+    '''Nodal coordinates of the cell rotated into each of the phi positions
+    phi - position, I - node, a - dimension
+    '''
+    rotation_axes = np.array([[1, 0, 0]], dtype=np.float_)
+    rotation_angles = get_phi_range(delta_phi, n_phi_plus)
+    rotation_centers = np.array([[0, 0, R_0]], dtype=np.float_)
+    return rotate_points(X_Ia, rotation_axes, rotation_angles, rotation_centers)
+
+
+def get_X_phi_Ia_p(X_Ia, X_Ia_p, delta_phi, delta_phi_p, R_0, R_0_p, n_phi_plus):
+    '''Derivatives of the nodal coordinates of the rotated cells X_phi_Ia with
+    respect to the cell parameters p given the derivatives of the cell X_Ia_p,
+    of the angle delta_phi_p and of the radius R_0_p, phi, I, a, p
+    '''
+    phi_range = get_phi_range(delta_phi, n_phi_plus)
+    k_range = np.arange(-(n_phi_plus - 1), n_phi_plus)
+    R_phi_ab = axis_angle_to_rot_matrix(np.array([[1, 0, 0]], dtype=np.float_), phi_range)
+    C_ap = np.zeros((3, len(R_0_p)), dtype=np.float_)
+    C_ap[2] = R_0_p
+    # rotated derivatives of the nodes relative to the center of rotation
+    X_phi_Iap = np.einsum('kab,Ibp->kIap', R_phi_ab, X_Ia_p - C_ap) + C_ap
+    # change of the rotation angle phi = k * delta_phi
+    Y_phi_Ia = get_X_phi_Ia(X_Ia, delta_phi, R_0, n_phi_plus)
+    Y_phi_Ia[..., 2] -= R_0
+    K_Y_phi_Ia = np.zeros_like(Y_phi_Ia)
+    K_Y_phi_Ia[..., 1], K_Y_phi_Ia[..., 2] = -Y_phi_Ia[..., 2], Y_phi_Ia[..., 1]
+    X_phi_Iap += np.einsum('kIa,k,p->kIap', K_Y_phi_Ia, k_range, delta_phi_p)
+    return X_phi_Iap
+
+
+def get_X_x_range_p(delta_x_p, n_x_plus):
+    '''Derivatives of the x positions of the cells with respect to the cell parameters
+    '''
+    return np.einsum('x,p->xp', np.arange(-(n_x_plus - 1), n_x_plus), delta_x_p)
+
+
+def get_X_cells_Ia(X_phi_Ia, X_x_range, idx_x_c, idx_phi_c, c_range=slice(None)):
+    '''Nodal coordinates of the cells within the slice c_range
+    c - cell, I - node, a - dimension (the derivatives X_phi_Iap
+    and X_x_range_p are placed in the same way)
+    '''
+    X_cIa = X_phi_Ia[idx_phi_c[c_range]]
+    X_cIa[:, :, 0] += X_x_range[idx_x_c[c_range]][:, np.newaxis]
+    return X_cIa
+
+
+# ------------------------------------------------------------------
+# Tessellation assembly
+# ------------------------------------------------------------------
+
+def get_shared_pairs(n_phi_plus, n_x_plus, I_shared, n_I_cell):
+    '''Pairs of coinciding nodes in the numbering of the uncoupled cells
+    derived from the neighbourhood table I_shared of the cell.
+    '''
+    idx_x_c, idx_phi_c, C_xp = get_cell_grid(n_phi_plus, n_x_plus)
+    n_x, n_phi = C_xp.shape
+    I_pairs = [np.zeros((0, 2), dtype=np.int_)]
+    for d_x, d_phi, i, j in I_shared:
+        x_n, phi_n = idx_x_c + d_x, idx_phi_c + d_phi
+        in_grid = (x_n >= 0) & (x_n < n_x) & (phi_n >= 0) & (phi_n < n_phi)
+        c = np.where(in_grid)[0]
+        c_n = C_xp[x_n[c], phi_n[c]]
+        has_neighbor = c_n >= 0
+        I_pairs.append(np.array([c[has_neighbor] * n_I_cell + i,
+                                 c_n[has_neighbor] * n_I_cell + j]).T)
+    return np.vstack(I_pairs).astype(np.int32)
+
+
+def get_unique_node_map(n_I, I_pairs):
+    '''Map the n_I nodes of the uncoupled cells onto the merged nodes given
+    the pairs of coinciding nodes. Each group of coinciding nodes is represented
+    by the node with the lowest index. Returns the boolean array of the
+    representative nodes and the merged node number of each node.
+    '''
+    i_idx, j_idx = I_pairs.T
+    # propagate the lowest node index within each group of coinciding nodes
+    I_rep = np.arange(n_I, dtype=np.int32)
+    while True:
+        I_rep_ij = np.minimum(I_rep[i_idx], I_rep[j_idx])
+        I_rep_new = np.copy(I_rep)
+        np.minimum.at(I_rep_new, i_idx, I_rep_ij)
+        np.minimum.at(I_rep_new, j_idx, I_rep_ij)
+        if np.array_equal(I_rep_new, I_rep):
+            break
+        I_rep = I_rep_new
+    idx_unique = I_rep == np.arange(n_I)
+    idx_remap = (np.cumsum(idx_unique, dtype=np.int32) - 1)[I_rep]
+    return idx_unique, idx_remap
+
+
+def get_X_unique_Ia(X_phi_Ia, X_x_range, idx_x_c, idx_phi_c, idx_unique, chunks):
+    '''Nodal coordinates of the merged nodes generated in chunks of cell rows
+    without the coordinates of all uncoupled cells
+    '''
+    n_I_cell = X_phi_Ia.shape[1]
+    idx_unique_cI = idx_unique.reshape(-1, n_I_cell)
+    X_Ia = np.empty((np.count_nonzero(idx_unique),) + X_phi_Ia.shape[2:], dtype=np.float_)
+    I_start = 0
+    for c_range in chunks:
+        X_cIa = get_X_cells_Ia(X_phi_Ia, X_x_range, idx_x_c, idx_phi_c, c_range)
+        X_Ia_chunk = X_cIa[idx_unique_cI[c_range]]
+        X_Ia[I_start:I_start + len(X_Ia_chunk)] = X_Ia_chunk
+        I_start += len(X_Ia_chunk)
+    return X_Ia
+
+
+def get_cells_I_Fi(I_Fi_cell, n_I_cell, idx_remap, chunks):
+    '''Facet - node mapping of all cells in the merged node numbering
+    generated in chunks of cell rows, the facets are ordered by cells
+    '''
+    I_Fi_cell = np.asarray(I_Fi_cell, dtype=np.int32)
+    n_F_cell = len(I_Fi_cell)
+    n_cells = len(idx_remap) // n_I_cell
+    I_Fi = np.empty((n_cells * n_F_cell, 3), dtype=np.int32)
+    for c_range in chunks:
+        i_range = np.arange(c_range.start, c_range.stop, dtype=np.int32) * n_I_cell
+        I_cells_Fi = I_Fi_cell[np.newaxis, :, :] + i_range[:, np.newaxis, np.newaxis]
+        I_Fi[c_range.start * n_F_cell:c_range.stop * n_F_cell] = \
+            idx_remap[I_cells_Fi].reshape(-1, 3)
+    return I_Fi
+
+
+def get_cells_I_Li(I_Li_cell, n_I_cell, idx_remap):
+    '''Unique lines in the merged node numbering given the lines of the cell
+    '''
+    n_cells = len(idx_remap) // n_I_cell
+    i_range = np.arange(n_cells, dtype=np.int32) * n_I_cell
+    I_cells_Li = (np.asarray(I_Li_cell, dtype=np.int32)[np.newaxis, :, :] +
+                  i_range[:, np.newaxis, np.newaxis]).reshape(-1, 2)
+    return np.unique(np.sort(idx_remap[I_cells_Li], axis=1), axis=0)
+
+
+def get_I_CDij(n_phi_plus, n_x_plus, I_boundary, n_I_cell):
+    '''Boundary nodes of the D cells in the numbering of the uncoupled cells
+    '''
+    n_cells, n_ic, n_id, _, x_cell_idx, _, y_cell_idx = get_cell_map(n_phi_plus, n_x_plus)
+    n_x_, n_y_ = len(x_cell_idx), len(y_cell_idx)
+    I_cell_offset = (n_ic + np.arange(n_x_ * n_y_).reshape(n_x_, n_y_)) * n_I_cell
+    return (I_cell_offset.T[:, :, np.newaxis, np.newaxis] +
+            np.asarray(I_boundary)[np.newaxis, np.newaxis, :, :])
+
+
+# ------------------------------------------------------------------
+# Trimming
+# ------------------------------------------------------------------
+
+def get_cells_in_out_info(n_phi_plus, n_x_plus):
+    ''' n_x_in, n_x_out, n_y_in, n_y_out are number of inner and outer cells along x and y'''
+    n_x_real = 2 * n_x_plus - 1
+    n_y_real = n_phi_plus
+    n_x_in = int(n_x_real / 2)
+    n_x_out = n_x_in + 1
+    n_y_in = n_y_real - 1
+    n_y_out = n_y_real
+    cells_num_in = n_x_in * n_y_in
+    cells_num_out = n_x_out * n_y_out
+    cells_in_indices = np.arange(cells_num_in)
+    cells_out_indices = np.arange(cells_num_in, cells_num_in + cells_num_out)
+    return n_x_in, n_x_out, n_y_in, n_y_out, cells_in_indices, cells_out_indices
+
+
+def get_cells_in_out_xyj(idx_remap, n_phi_plus, n_x_plus, n_I_cell):
+    '''Merged node numbers of the inner and outer cells arranged as (x, y, j)
+    with the cell nodes j sorted by the node numbers of the first cell
+    '''
+    n_x_in, n_x_out, n_y_in, n_y_out, cells_in_indices, cells_out_indices = \
+        get_cells_in_out_info(n_phi_plus, n_x_plus)
+    I_cj = idx_remap.reshape((-1, n_I_cell))
+    I_cj = I_cj[:, np.argsort(I_cj[0])]
+    cells_out_xyj = I_cj[cells_out_indices].reshape((n_x_out, n_y_out, n_I_cell))
+    cells_in_xyj = I_cj[cells_in_indices].reshape((n_x_in, n_y_in, n_I_cell))
+    return cells_in_xyj, cells_out_xyj
+
+
+def trim_I_Fi(F_cfi, n_phi_plus, n_x_plus, facets_to_trim,
+              trim_half_cells_along_y=False, trim_half_cells_along_x=False):
+    '''Remove the facets of the outer half cells from the facets F_cfi
+    ordered by cells (inner cells followed by the outer cells).
+    '''
+    n_x_in, n_x_out, n_y_in, n_y_out, cells_in_indices, _ = \
+        get_cells_in_out_info(n_phi_plus, n_x_plus)
+    along_x_first_cell, along_x_last_cell, along_y_first_cell, along_y_last_cell = facets_to_trim
+    # mark the facets to keep (the outer cells follow the inner ones)
+    keep_cf = np.ones(F_cfi.shape[:2], dtype=np.bool_)
+    keep_out_xyf = keep_cf[len(cells_in_indices):].reshape((n_x_out, n_y_out, -1))
+    if trim_half_cells_along_y:
+        # Remove extended facets along y
+        keep_out_xyf[:, 0, along_y_first_cell] = False
+        keep_out_xyf[:, -1, along_y_last_cell] = False
+    if trim_half_cells_along_x:
+        # Remove half cells along x
+        keep_out_xyf[0, :, along_x_first_cell] = False
+        keep_out_xyf[-1, :, along_x_last_cell] = False
+    return F_cfi[keep_cf]
+
+
+def align_nodes_along_x(X_Ia, cells_out_xyj, nodes_to_align):
+    '''Return a copy of X_Ia with the boundary nodes of the first and last
+    outer cell rows moved into the mid point between a pair of cell nodes.
+    '''
+    X_Ia = np.copy(X_Ia)
+    for row, j_moved, j_other in nodes_to_align:
+        I_moved = cells_out_xyj[row, :, j_moved]
+        I_other = cells_out_xyj[row, :, j_other]
+        X_Ia[I_moved] = (X_Ia[I_moved] + X_Ia[I_other]) / 2
+    return X_Ia
+
+
+def apply_node_constraint(X_Ia, X_Ia_ref, node_idx, coord_idx):
+    '''Shift X_Ia so that the node node_idx keeps its coordinate coord_idx
+    (all coordinates for -1) from the reference configuration X_Ia_ref.
+    '''
+    if coord_idx == 0 and node_idx == 0:
+        return X_Ia
+    const_X_Ia = np.copy(X_Ia)
+    if coord_idx == -1:
+        diff = X_Ia[node_idx, :] - X_Ia_ref[node_idx, :]
+        const_X_Ia[:, :] = X_Ia[:, :] - diff[np.newaxis]
+    else:
+        diff = X_Ia[node_idx, coord_idx] - X_Ia_ref[node_idx, coord_idx]
+        const_X_Ia[:, coord_idx] = X_Ia[:, coord_idx] - diff[np.newaxis]
+    return const_X_Ia
+
+
+def apply_node_constraint_p(X_Ia_p, node_idx, coord_idx):
+    '''Derivatives of the constrained nodal coordinates, see apply_node_constraint,
+    the reference configuration is fixed.
+    '''
+    if coord_idx == 0 and node_idx == 0:
+        return X_Ia_p
+    const_X_Ia_p = np.copy(X_Ia_p)
+    if coord_idx == -1:
+        const_X_Ia_p -= X_Ia_p[node_idx][np.newaxis]
+    else:
+        const_X_Ia_p[:, coord_idx] -= X_Ia_p[node_idx, coord_idx][np.newaxis]
+    return const_X_Ia_p
+
+
+def get_trimmed(X_Ia, I_Fi):
+    '''Remove the nodes not referenced by the facets I_Fi and renumber the
+    facets accordingly, returns (X_Ia_trimmed, I_Fi_trimmed).
+    '''
+    I_used, I_Fi_trimmed = np.unique(I_Fi, return_inverse=True)
+    return X_Ia[I_used], I_Fi_trimmed.reshape(I_Fi.shape).astype(np.int32)
+
+
+# ------------------------------------------------------------------
+# Complete tessellation
+# ------------------------------------------------------------------
+
+def get_tessellation(X_Ia_cell, I_Fi_cell, I_shared, delta_x, delta_phi, R_0,
+                     n_phi_plus, n_x_plus,
+                     trim_half_cells_along_y=False, trim_half_cells_along_x=False,
+                     facets_to_trim=FACETS_TO_TRIM_4P, nodes_to_align=NODES_TO_ALIGN_4P,
+                     chunk_size=4096):
+    '''Assemble the tessellation of a cell given by its nodes X_Ia_cell,
+    facets I_Fi_cell, neighbourhood table I_shared and placement
+    parameters delta_x, delta_phi, R_0.
+
+    Returns the merged nodes X_Ia (not trimmed, but aligned along x if
+    trimmed along x), the facets I_Fi referring to X_Ia (trimmed) and
+    the node numbers of the inner and outer cells (cells_in_xyj, cells_out_xyj).
+    '''
+    n_I_cell = len(X_Ia_cell)
+    idx_x_c, idx_phi_c, _ = get_cell_grid(n_phi_plus, n_x_plus)
+    n_cells = len(idx_x_c)
+    chunks = get_cell_row_chunks(n_phi_plus, n_x_plus, chunk_size)
+    I_pairs = get_shared_pairs(n_phi_plus, n_x_plus, I_shared, n_I_cell)
+    idx_unique, idx_remap = get_unique_node_map(n_cells * n_I_cell, I_pairs)
+    X_phi_Ia = get_X_phi_Ia(X_Ia_cell, delta_phi, R_0, n_phi_plus)
+    X_x_range = get_X_x_range(delta_x, n_x_plus)
+    X_Ia = get_X_unique_Ia(X_phi_Ia, X_x_range, idx_x_c, idx_phi_c, idx_unique, chunks)
+    I_Fi = get_cells_I_Fi(I_Fi_cell, n_I_cell, idx_remap, chunks)
+    cells_in_xyj, cells_out_xyj = get_cells_in_out_xyj(idx_remap, n_phi_plus, n_x_plus, n_I_cell)
+    if trim_half_cells_along_x:
+        X_Ia = align_nodes_along_x(X_Ia, cells_out_xyj, nodes_to_align)
+    if trim_half_cells_along_y or trim_half_cells_along_x:
+        F_cfi = I_Fi.reshape((n_cells, len(I_Fi_cell), 3))
+        I_Fi = trim_I_Fi(F_cfi, n_phi_plus, n_x_plus, facets_to_trim,
+                         trim_half_cells_along_y, trim_half_cells_along_x)
+    return X_Ia, I_Fi, cells_in_xyj, cells_out_xyj
+
+
+def get_tessellation_4p(gamma, a, b, c, n_phi_plus, n_x_plus,
+                        trim_half_cells_along_y=False, trim_half_cells_along_x=False):
+    '''Tessellation of the four-parameter waterbomb cell, see get_tessellation.
+    '''
+    X_Ia_cell, delta_x, delta_phi, R_0 = get_cell_4p(gamma, a, b, c)
+    return get_tessellation(X_Ia_cell, I_FI_CELL_4P, I_SHARED_4P,
+                            delta_x, delta_phi, R_0, n_phi_plus, n_x_plus,
+                            trim_half_cells_along_y, trim_half_cells_along_x)
+
+
+# ------------------------------------------------------------------
+# Shell dimensions
+# The span, height and width consider the shell after trimming the half
+# cells along y and x and after aligning the nodes along x.
+# ------------------------------------------------------------------
+
+def get_span(X_Ia, cells_out_xyj):
+    mid_right_edge = (X_Ia[cells_out_xyj[0, 0, 0]] + X_Ia[cells_out_xyj[0, 0, 5]]) / 2
+    mid_left_edge = (X_Ia[cells_out_xyj[0, -1, 0]] + X_Ia[cells_out_xyj[0, -1, 5]]) / 2
+    span_v = mid_right_edge - mid_left_edge
+    return np.sqrt(span_v @ span_v)
+
+
+def get_shell_height(X_Ia, cells_in_xyj, cells_out_xyj):
+    '''Shell total height (rise) averaged from the edges of side and middle
+    waterbomb cells (h=0 corresponds to flat folded shell)
+    '''
+    z_mid_right_edge = ((X_Ia[cells_out_xyj[0, 0, 0]] + X_Ia[cells_out_xyj[0, 0, 5]]) / 2)[2]
+    n_y_in, n_y_out = cells_in_xyj.shape[1], cells_out_xyj.shape[1]
+    if n_y_out % 2 == 0:
+        y_mid_cell_i = int(n_y_in / 2)
+        z_mid_mid_edge = ((X_Ia[cells_in_xyj[0, y_mid_cell_i, 0]] + X_Ia[cells_in_xyj[0, y_mid_cell_i, 5]]) / 2)[2]
+    else:
+        y_mid_cell_i = int(n_y_out / 2)
+        z_mid_mid_edge = ((X_Ia[cells_out_xyj[0, y_mid_cell_i, 0]] + X_Ia[cells_out_xyj[0, y_mid_cell_i, 5]]) / 2)[2]
+    return z_mid_mid_edge - z_mid_right_edge
+
+
+def get_shell_width(X_Ia, cells_out_xyj):
+    span_v = X_Ia[cells_out_xyj[0, 0, 0]] - X_Ia[cells_out_xyj[-1, 0, 0]]
+    return np.sqrt(span_v @ span_v)
+
+
+def get_shell_dims_4p(gamma, a, b, c, n_phi_plus, n_x_plus):
+    '''Return (span, height, width) of the four-parameter tessellation.
+    '''
+    X_Ia, _, cells_in_xyj, cells_out_xyj = get_tessellation_4p(gamma, a, b, c, n_phi_plus, n_x_plus)
+    return (get_span(X_Ia, cells_out_xyj),
+            get_shell_height(X_Ia, cells_in_xyj, cells_out_xyj),
+            get_shell_width(X_Ia, cells_out_xyj))
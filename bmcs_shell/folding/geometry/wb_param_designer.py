@@ -1,20 +1,17 @@
 # from matplotlib import cm
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import bmcs_utils.api as bu
 import k3d
 import matplotlib.pyplot as plt
 import numpy as np
 import traits.api as tr
-from bmcs_shell.api import WBTessellation4P
 from matplotlib import cm
 from scipy.interpolate import interp1d
 
-from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p_ss import WBTessellation4PSS
-
-
-def round_to(value, base=5):
-    return base * round(value / base)
+from bmcs_shell.folding.geometry import wb_kernel
 
 
 class WbParamDesigner(bu.Model):
@@ -26,6 +23,8 @@ class WbParamDesigner(bu.Model):
     gamma_range = np.linspace(10, 85, 10)
     a_range = np.array([125])
     n_mid_cells = bu.Int(2)
+    n_jobs = bu.Int(1)
+    '''Number of processes used to fill the grid of the variable'''
     var1 = {'name': 'span', 'value': 2118.16}
     var2 = {'name': 'height', 'value': 279.54}
     var3 = {'name': 'width', 'value': 501.77}
@@ -64,23 +63,9 @@ class WbParamDesigner(bu.Model):
 
         fig, ax = plt.subplots()
 
-        if self.ss_shell:
-            wbt4p = WBTessellation4PSS(n_phi_plus=n_mid_cells + 1, n_x_plus=2, wireframe_width=5,
-                                 # trim_half_cells_along_y=True,
-                                 # trim_half_cells_along_x=True,
-                                 # align_outer_nodes_along_x=True
-                                 )
-        else:
-            wbt4p = WBTessellation4P(n_phi_plus=n_mid_cells + 1, n_x_plus=2, wireframe_width=5,
-                                     # trim_half_cells_along_y=True,
-                                     # trim_half_cells_along_x=True,
-                                     # align_outer_nodes_along_x=True
-                                     )
-
         for a_i, a in enumerate(a_range):
             print('a =', np.round(a, 1))
             print('--------------------------------')
-            wbt4p.trait_set(a=a)
             valid_var1_2_params = []
 
             self.eta_of_var1.append([])
@@ -90,21 +75,10 @@ class WbParamDesigner(bu.Model):
 
                 print('gamma =', np.round(gamma, 1), end='°, ')
 
-                wbt4p.trait_set(gamma=np.deg2rad(gamma))
-
                 # Fill the grid of the variable
                 # -------------------------------------------------------
-                for i_eta in range(len(etas_grid)):
-                    for j_zeta in range(len(zetas_grid)):
-                        eta = etas_grid[i_eta, j_zeta]
-                        zeta = zetas_grid[i_eta, j_zeta]
-
-                        if self.ss_shell:
-                            wbt4p.trait_set(b=eta * a)
-                        else:
-                            wbt4p.trait_set(b=eta * a, c=zeta * a)
-
-                        self.var1_grid_agnn[a_i, gamma_i, i_eta, j_zeta] = self.get_var_value(var1, wbt4p)
+                self.var1_grid_agnn[a_i, gamma_i] = self.get_var_grid(
+                    var1, a, np.deg2rad(gamma), etas_grid * a, zetas_grid * a)
 
                 # Find contour line corresponding to the variable value
                 # -------------------------------------------------------
@@ -118,11 +92,7 @@ class WbParamDesigner(bu.Model):
                 eta_of_var1_ai_gi = self.eta_of_var1[a_i][gamma_i]
                 zeta_of_var1_ai_gi = self.zeta_of_var1[a_i][gamma_i]
                 for eta, zeta in zip(eta_of_var1_ai_gi, zeta_of_var1_ai_gi):
-                    if self.ss_shell:
-                        wbt4p.trait_set(b=eta * a)
-                    else:
-                        wbt4p.trait_set(b=eta * a, c=zeta * a)
-                    var2_array.append(self.get_var_value(var2, wbt4p))
+                    var2_array.append(self.get_params_var_value(var2, a, eta * a, zeta * a, np.deg2rad(gamma)))
 
                 ax_h.plot(eta_of_var1_ai_gi, var2_array, '--', label='eta, $\gamma$=' + str(round(gamma, 1)), color=color)
                 ax_h.plot(zeta_of_var1_ai_gi, var2_array, label='zeta, $\gamma$=' + str(round(gamma, 1)), color=color)
@@ -155,11 +125,7 @@ class WbParamDesigner(bu.Model):
                 var3_array = []
                 for params in valid_var1_2_params:
                     a, gamma, eta, zeta = params
-                    if self.ss_shell:
-                        wbt4p.trait_set(a=a, b=eta * a, gamma=np.deg2rad(gamma))
-                    else:
-                        wbt4p.trait_set(a=a, b=eta * a, c=zeta * a, gamma=np.deg2rad(gamma))
-                    var3_array.append(self.get_var_value(var3, wbt4p))
+                    var3_array.append(self.get_params_var_value(var3, a, eta * a, zeta * a, np.deg2rad(gamma)))
                 if self.ss_shell:
                     mask = (np.array(var3_array) >= 0.9 * var3['value']) & (
                                 np.array(var3_array) <= 1.1 * var3['value'])
@@ -185,34 +151,49 @@ class WbParamDesigner(bu.Model):
     # These span, height and width function works for WBTessellation4P and the calculations consider the shell
     #  after applying the trimming of half cells along y and x and after aligning (see WBTessellation4P)
     def get_span(self, wb_shell):
-        X_Ia = wb_shell.X_Ia
-        cells_in_xyj, cells_out_xyj = wb_shell.cells_in_out_xyj
-        mid_right_edge = (X_Ia[cells_out_xyj[0, 0, 0]] + X_Ia[cells_out_xyj[0, 0, 5]]) / 2
-        mid_left_edge = (X_Ia[cells_out_xyj[0, -1, 0]] + X_Ia[cells_out_xyj[0, -1, 5]]) / 2
-        span_v = mid_right_edge - mid_left_edge
-        return np.sqrt(span_v @ span_v)
+        _, cells_out_xyj = wb_shell.cells_in_out_xyj
+        return wb_kernel.get_span(wb_shell.X_Ia, cells_out_xyj)
 
     # Shell total height (rise) averaged from the edges of side and middle waterbomb cells (h=0 corresponds to
     # flat folded shell)
     def get_shell_height(self, wb_shell):
-        X_Ia = wb_shell.X_Ia
         cells_in_xyj, cells_out_xyj = wb_shell.cells_in_out_xyj
-        z_mid_right_edge = ((X_Ia[cells_out_xyj[0, 0, 0]] + X_Ia[cells_out_xyj[0, 0, 5]]) / 2)[2]
-        _, _, n_y_in, n_y_out, _, _ = wb_shell.cells_in_out_info
-        if n_y_out % 2 == 0:
-            y_mid_cell_i = int(n_y_in / 2)
-            z_mid_mid_edge = ((X_Ia[cells_in_xyj[0, y_mid_cell_i, 0]] + X_Ia[cells_in_xyj[0, y_mid_cell_i, 5]]) / 2)[2]
-        else:
-            y_mid_cell_i = int(n_y_out / 2)
-            z_mid_mid_edge = ((X_Ia[cells_out_xyj[0, y_mid_cell_i, 0]] + X_Ia[cells_out_xyj[0, y_mid_cell_i, 5]]) / 2)[
-                2]
-        return z_mid_mid_edge - z_mid_right_edge
+        return wb_kernel.get_shell_height(wb_shell.X_Ia, cells_in_xyj, cells_out_xyj)
 
     def get_shell_width(self, wb_shell):
-        X_Ia = wb_shell.X_Ia
         _, cells_out_xyj = wb_shell.cells_in_out_xyj
-        span_v = X_Ia[cells_out_xyj[0, 0, 0]] - X_Ia[cells_out_xyj[-1, 0, 0]]
-        return np.sqrt(span_v @ span_v)
+        return wb_kernel.get_shell_width(wb_shell.X_Ia, cells_out_xyj)
+
+    var_names = ['span', 'height', 'width']
+
+    def get_c(self, a, c, gamma):
+        if self.ss_shell:
+            return wb_kernel.get_c_4p_ss(gamma, a)
+        return c
+
+    def get_params_var_value(self, var, a, b, c, gamma):
+        '''Evaluate the variable for the tessellation with the given parameters
+        using the geometry kernel (c is ignored for the ss_shell)
+        '''
+        if var['name'] not in self.var_names:
+            return None
+        dims = wb_kernel.get_shell_dims_4p(gamma, a, b, self.get_c(a, c, gamma), self.n_mid_cells + 1, 2)
+        return dims[self.var_names.index(var['name'])]
+
+    def get_var_grid(self, var, a, gamma, b_grid, c_grid):
+        '''Evaluate the variable over the grid of the parameters b and c,
+        distributed over n_jobs processes if n_jobs > 1
+        '''
+        b_, c_ = b_grid.flatten(), c_grid.flatten()
+        c_ = np.array([self.get_c(a, c, gamma) for c in c_])
+        args = (repeat(gamma), repeat(a), b_, c_, repeat(self.n_mid_cells + 1), repeat(2))
+        if self.n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                dims = list(executor.map(wb_kernel.get_shell_dims_4p, *args, chunksize=64))
+        else:
+            dims = list(map(wb_kernel.get_shell_dims_4p, *args))
+        var_idx = self.var_names.index(var['name'])
+        return np.array([dims_n[var_idx] for dims_n in dims]).reshape(b_grid.shape)
 
     def interp(self, interp_value, values, etas, zetas):
         try:
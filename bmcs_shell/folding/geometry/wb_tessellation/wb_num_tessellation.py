@@ -19,11 +19,17 @@ class WBNumTessellation(WBNumTessellationBase):
         bu.Item('n_y', latex=r'n_y'),
     )
 
-    def calc_mesh_for_tessellated_cells(self):
+    def calc_mesh_for_tessellated_cells(self, X_Ia=None, sol=None):
+        '''Nodes and facets of the tessellated cells with the nodes X_Ia glued by the
+        rotation angles sol (of wb_cell_ and sol if not given)
+        '''
         # TODO: the resulting mesh_X_nmIa, mesh_I_Fi are just summing up all cells, repeation deletion is needed to use
         #  it in analysis
         I_Fi = self.wb_cell_.I_Fi
-        X_Ia = self.wb_cell_.X_Ia
+        if X_Ia is None:
+            X_Ia = self.wb_cell_.X_Ia
+        if sol is None:
+            sol = self.sol
 
         y_base_cell_X_Ia = X_Ia
         next_y_base_cell_X_Ia = X_Ia
@@ -49,10 +55,10 @@ class WBNumTessellation(WBNumTessellationBase):
                 if j_is_even:
                     # Number of cell_to_add is even (add right from base cell)
                     if add_br:
-                        cell_to_add = self._get_br_X_Ia(base_cell_X_Ia)
+                        cell_to_add = self._get_br_X_Ia(base_cell_X_Ia, rot=sol[0])
                         mesh_X_nmIa[i, j, ...] = cell_to_add
                     else:
-                        cell_to_add = self._get_ur_X_Ia(base_cell_X_Ia)
+                        cell_to_add = self._get_ur_X_Ia(base_cell_X_Ia, rot=sol[1])
                         mesh_X_nmIa[i, j, ...] = cell_to_add
                     add_br = not add_br
                     base_cell_X_Ia = next_base_cell_X_Ia
@@ -60,10 +66,10 @@ class WBNumTessellation(WBNumTessellationBase):
                 else:
                     # Number of cell_to_add is odd (add left from base cell)
                     if add_bl:
-                        cell_to_add = self._get_bl_X_Ia(base_cell_X_Ia)
+                        cell_to_add = self._get_bl_X_Ia(base_cell_X_Ia, rot=-sol[1])
                         mesh_X_nmIa[i, j, ...] = cell_to_add
                     else:
-                        cell_to_add = self._get_ul_X_Ia(base_cell_X_Ia)
+                        cell_to_add = self._get_ul_X_Ia(base_cell_X_Ia, rot=-sol[0])
                         mesh_X_nmIa[i, j, ...] = cell_to_add
                     add_bl = not add_bl
                     base_cell_X_Ia = next_base_cell_X_Ia
@@ -71,13 +77,13 @@ class WBNumTessellation(WBNumTessellationBase):
 
             if i_row_is_even:
                 # Next row is odd (change y_base_cell_X_Ia to a cell below base cell)
-                base_cell_X_Ia = self._get_bl_X_Ia(self._get_br_X_Ia(next_y_base_cell_X_Ia))
+                base_cell_X_Ia = self._get_bl_X_Ia(self._get_br_X_Ia(next_y_base_cell_X_Ia, rot=sol[0]), rot=-sol[1])
                 next_base_cell_X_Ia = base_cell_X_Ia
                 next_y_base_cell_X_Ia = y_base_cell_X_Ia
                 y_base_cell_X_Ia = base_cell_X_Ia
             else:
                 # Next row is even (change y_base_cell_X_Ia to a cell above base cell)
-                base_cell_X_Ia = self._get_ul_X_Ia(self._get_ur_X_Ia(next_y_base_cell_X_Ia))
+                base_cell_X_Ia = self._get_ul_X_Ia(self._get_ur_X_Ia(next_y_base_cell_X_Ia, rot=sol[1]), rot=-sol[0])
                 next_base_cell_X_Ia = base_cell_X_Ia
                 next_y_base_cell_X_Ia = y_base_cell_X_Ia
                 y_base_cell_X_Ia = base_cell_X_Ia
@@ -3,9 +3,10 @@ import random
 import k3d
 import numpy as np
 import traits.api as tr
-from scipy.optimize import minimize
+from scipy.optimize import minimize, least_squares
 
 from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_base import WBTessellationBase
+from bmcs_shell.folding.utils.rigidity_audit import get_rigidity_audit
 
 
 class WBNumTessellationBase(WBTessellationBase):
@@ -19,20 +20,18 @@ class WBNumTessellationBase(WBTessellationBase):
         elif side == 'l':
             return -self.sol
 
-    sol = tr.Property(depends_on='+GEO')
-    @tr.cached_property
-    def _get_sol(self):
-        print('---------------------------')
-        sol = self.minimize_dist()
+    def solve_sol(self, x0=None, wb_cell=None):
+        X_Ia = (self.wb_cell_ if wb_cell is None else wb_cell).X_Ia
+        sol = self.minimize_dist(X_Ia) if x0 is None else self.polish_sol(x0, X_Ia)
         # Transfer angles to range [-pi, pi] (to avoid having angle > 2pi so we can do the comparison that follows)
         sol = np.arctan2(np.sin(sol), np.cos(sol))
         print('num_sol=', sol)
         return sol
 
-    def minimize_dist(self):
+    def minimize_dist(self, X_Ia=None):
         x0 = np.array([np.pi, np.pi])
         try:
-            res = minimize(self.rotate_and_get_diff, x0, tol=1e-4)
+            res = minimize(self.rotate_and_get_diff, x0, args=(X_Ia,), tol=1e-4)
         except:
             print('Error while minimizing!')
             return np.array([0, 0])
@@ -41,10 +40,41 @@ class WBNumTessellationBase(WBTessellationBase):
         sol = res.x
         return sol
 
-    def rotate_and_get_diff(self, rotations):
-        br_X_Ia_rot = self._get_br_X_Ia(self.wb_cell_.X_Ia, rot=rotations[0])
-        ur_X_Ia_rot = self._get_ur_X_Ia(self.wb_cell_.X_Ia, rot=rotations[1])
-        diff = ur_X_Ia_rot[1] - br_X_Ia_rot[3]
+    polished_dist = tr.Float
+    '''Remaining gap between the glued nodes of the last polish_sol'''
+
+    def polish_sol(self, x0, X_Ia=None):
+        '''Refine an approximate solution (e.g. interpolated from a WBSolTable) by
+        Gauss-Newton iterations on the gap between the glued nodes, which converges
+        within a few evaluations for a close initial guess.
+        '''
+        res = least_squares(self.rotate_and_get_diff_a, x0, args=(X_Ia,), xtol=1e-10)
+        self.polished_dist = np.sqrt(2 * res.cost)
+        return res.x
+
+    def rotate_and_get_diff_a(self, rotations, X_Ia=None):
+        '''Gap between the glued nodes for the cell nodes X_Ia (of wb_cell_ if not given)'''
+        if X_Ia is None:
+            X_Ia = self.wb_cell_.X_Ia
+        br_X_Ia_rot = self._get_br_X_Ia(X_Ia, rot=rotations[0])
+        ur_X_Ia_rot = self._get_ur_X_Ia(X_Ia, rot=rotations[1])
+        return ur_X_Ia_rot[1] - br_X_Ia_rot[3]
+
+    def rotate_and_get_diff(self, rotations, X_Ia=None):
+        diff = self.rotate_and_get_diff_a(rotations, X_Ia)
         dist = np.sqrt(np.sum(diff * diff))
         #     print('dist=', dist)
         return dist
+
+    def get_rigidity_audit(self, gamma_range, rel_tol=1e-6, angle_tol=1e-6):
+        '''Deviations of the edge lengths and sector angles of the tessellated cells
+        folded along gamma_range (with the rotations sol of each step) from the
+        first step, see utils.rigidity_audit.get_rigidity_audit. Each step is
+        evaluated for a copy of the cell, the state of the tessellation is not changed.
+        '''
+        X_gIa = []
+        for gamma in gamma_range:
+            wb_cell = self.get_cell(gamma)
+            X_Ia, I_Fi = self.calc_mesh_for_tessellated_cells(wb_cell.X_Ia, self.get_cell_sol(wb_cell))
+            X_gIa.append(X_Ia)
+        return get_rigidity_audit(np.array(X_gIa), I_Fi, rel_tol=rel_tol, angle_tol=angle_tol)
@@ -0,0 +1,167 @@
+'''
+Tabulated rotation angles ``sol`` gluing the cells of the numeric and
+analytic 5-parameter tessellations.
+
+The angles are sampled offline on a regular grid of cell parameters
+using the exact solution of the tessellation (in parallel processes),
+interpolated by splines and checked against the exact solution in the
+center of each grid cell. At runtime the tessellation interpolates the
+table and falls back to the exact solution, started from the
+interpolated value, outside of the table or its tolerance.
+
+Indices: n - sample, a - parameter
+'''
+
+import contextlib
+import functools
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.interpolate import RegularGridInterpolator
+
+
+def _solve_sample(tessellation, param_names, x_a):
+    tessellation.wb_cell_.trait_set(**dict(zip(param_names, x_a)))
+    # the solvers report their intermediate results on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        return tessellation.solve_sol()
+
+
+_worker_tessellation = None
+
+
+def _init_worker(tessellation_factory):
+    global _worker_tessellation
+    _worker_tessellation = tessellation_factory()
+
+
+def _solve_sample_in_worker(param_names, x_a):
+    return _solve_sample(_worker_tessellation, param_names, x_a)
+
+
+def solve_sol_samples(tessellation_factory, param_names, x_na, n_jobs=1, chunksize=16):
+    '''Exact rotation angles sol_n2 for the samples x_na of the cell parameters
+    param_names. The tessellation_factory (e.g. the tessellation class) must be
+    picklable if n_jobs > 1, each process then constructs its own tessellation.
+    '''
+    if n_jobs > 1:
+        solve = functools.partial(_solve_sample_in_worker, tuple(param_names))
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(tessellation_factory,)) as executor:
+            sol_n2 = list(executor.map(solve, x_na, chunksize=chunksize))
+    else:
+        tessellation = tessellation_factory()
+        sol_n2 = [_solve_sample(tessellation, param_names, x_a) for x_a in x_na]
+    return np.array(sol_n2, dtype=np.float_).reshape(-1, 2)
+
+
+def get_angle_diff(phi_1, phi_2):
+    '''Absolute difference of angles considering the periodicity'''
+    return np.abs(np.arctan2(np.sin(phi_1 - phi_2), np.cos(phi_1 - phi_2)))
+
+
+# samples on each side of a grid cell entering its interpolation
+STENCIL_RADIUS = {'nearest': 1, 'linear': 1, 'slinear': 1, 'cubic': 2, 'quintic': 3}
+
+
+def get_stencil_cells(sample_grid, r):
+    '''Grid cells within r samples of a True entry of sample_grid along
+    each axis, i.e. the cells with the sample in their interpolation stencil
+    '''
+    cell_grid = np.asarray(sample_grid, dtype=np.bool_)
+    for a in range(cell_grid.ndim):
+        pad = [(0, 0)] * cell_grid.ndim
+        pad[a] = (r - 1, r - 1)
+        cell_grid = sliding_window_view(np.pad(cell_grid, pad), 2 * r, axis=a).any(axis=-1)
+    return cell_grid
+
+
+class WBSolTable:
+    '''Interpolation table of the rotation angles sol over a regular grid
+    of the cell parameters param_names with the coordinates axes.
+
+    The angles are interpolated through their cosine and sine to avoid
+    the jump at +-pi. err_grid holds the interpolation error estimated in
+    the center of each grid cell, it is infinite for the grid cells
+    with a sample without a solution in their interpolation stencil
+    (missing_cells), e.g. within two samples for the cubic interpolation.
+    '''
+
+    def __init__(self, param_names, axes, sol_grid, err_grid=None, method='cubic'):
+        self.param_names = tuple(param_names)
+        self.axes = tuple(np.asarray(axis, dtype=np.float_) for axis in axes)
+        self.sol_grid = np.asarray(sol_grid, dtype=np.float_)
+        self.method = str(method)
+        missing_grid = ~np.all(np.isfinite(self.sol_grid), axis=-1)
+        self.missing_cells = get_stencil_cells(missing_grid, STENCIL_RADIUS.get(self.method, 2))
+        if err_grid is None:
+            err_grid = np.full([len(axis) - 1 for axis in self.axes], np.inf)
+        self.err_grid = np.where(self.missing_cells, np.inf, np.asarray(err_grid, dtype=np.float_))
+        cs_grid = np.concatenate([np.cos(self.sol_grid), np.sin(self.sol_grid)], axis=-1)
+        # samples without solution are covered by infinite errors in err_grid
+        cs_grid[~np.isfinite(cs_grid)] = 0
+        self._cs_interp = RegularGridInterpolator(self.axes, cs_grid, method=self.method,
+                                                  bounds_error=False, fill_value=np.nan)
+
+    @classmethod
+    def tabulate(cls, tessellation_factory, param_ranges, method='cubic', n_jobs=1):
+        '''Sample the exact solution of the tessellation on the regular grid given by
+        param_ranges {name: (min, max, n)} and in the centers of the grid cells
+        to estimate the interpolation error.
+        '''
+        param_names = list(param_ranges)
+        axes = [np.linspace(*param_ranges[name]) for name in param_names]
+        mid_axes = [(axis[1:] + axis[:-1]) / 2 for axis in axes]
+        x_na = np.array(np.meshgrid(*axes, indexing='ij')).reshape(len(axes), -1).T
+        x_mid_na = np.array(np.meshgrid(*mid_axes, indexing='ij')).reshape(len(axes), -1).T
+        sol_n2 = solve_sol_samples(tessellation_factory, param_names,
+                                   np.vstack([x_na, x_mid_na]), n_jobs=n_jobs)
+        sol_grid = sol_n2[:len(x_na)].reshape([len(axis) for axis in axes] + [2])
+        table = cls(param_names, axes, sol_grid, method=method)
+        err_n = np.max(get_angle_diff(table.interpolate_sol(x_mid_na), sol_n2[len(x_na):]), axis=-1)
+        err_n[np.isnan(err_n)] = np.inf
+        table.err_grid = np.where(table.missing_cells, np.inf, err_n.reshape([len(axis) for axis in mid_axes]))
+        return table
+
+    def interpolate_sol(self, x_na):
+        '''Interpolated rotation angles sol_n2 (nan outside of the table)'''
+        cs_n4 = self._cs_interp(np.atleast_2d(x_na))
+        return np.arctan2(cs_n4[:, 2:], cs_n4[:, :2])
+
+    def interpolate(self, x_na):
+        '''Interpolated rotation angles sol_n2 at the parameters x_na and the error
+        estimate err_n of their grid cells (infinite outside of the table).
+        '''
+        x_na = np.atleast_2d(np.asarray(x_na, dtype=np.float_))
+        sol_n2 = self.interpolate_sol(x_na)
+        lower = np.array([axis[0] for axis in self.axes])
+        upper = np.array([axis[-1] for axis in self.axes])
+        inside_n = np.all((x_na >= lower) & (x_na <= upper), axis=-1)
+        cell_an = tuple(np.clip(np.searchsorted(axis, x_n, side='right') - 1, 0, len(axis) - 2)
+                        for axis, x_n in zip(self.axes, x_na.T))
+        err_n = np.where(inside_n, self.err_grid[cell_an], np.inf)
+        return sol_n2, err_n
+
+    def save(self, path):
+        axes = {'axis_%d' % i: axis for i, axis in enumerate(self.axes)}
+        np.savez_compressed(path, param_names=np.array(self.param_names), method=np.array(self.method),
+                            sol_grid=self.sol_grid, err_grid=self.err_grid, **axes)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            param_names = [str(name) for name in data['param_names']]
+            axes = [data['axis_%d' % i] for i in range(len(param_names))]
+            return cls(param_names, axes, data['sol_grid'], data['err_grid'], method=str(data['method']))
+
+
+if __name__ == '__main__':
+    from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_5p_beta import WBTessellation5PBeta
+
+    table = WBSolTable.tabulate(WBTessellation5PBeta,
+                                dict(gamma=(0.3, 1.3, 11), eta=(1.0, 2.0, 6), zeta=(0.5, 1.0, 6)),
+                                n_jobs=4)
+    print('max. error estimate', np.max(table.err_grid[np.isfinite(table.err_grid)]))
+    table.save('wb_sol_table_5p_beta.npz')
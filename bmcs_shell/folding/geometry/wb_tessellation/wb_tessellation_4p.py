@@ -1,4 +1,3 @@
-import json
 import time
 
 import bmcs_utils.api as bu
@@ -7,11 +6,15 @@ import numpy as np
 import traits.api as tr
 import matplotlib.pyplot as plt
 
-from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p import \
-    WBCell4Param, axis_angle_to_q, qv_mult
+from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p import WBCell4Param
 from bmcs_shell.folding.geometry.wb_geo_utils import WBGeoUtils
+from bmcs_shell.folding.geometry import wb_kernel
+from bmcs_shell.folding.geometry.fold_file import get_fold_edges, write_fold_file
 
 from bmcs_shell.folding.utils.dihedral_angles import get_dih_angles
+from bmcs_shell.folding.utils.mesh_writers import write_mesh_frames, write_ply_file, write_stl_file
+from bmcs_shell.folding.utils.self_intersection import get_first_self_intersection
+from bmcs_shell.folding.utils.rigidity_audit import get_rigidity_audit
 
 class WBTessellation4P(bu.Model):
     name = 'WB Tessellation 4P'
@@ -69,13 +72,10 @@ class WBTessellation4P(bu.Model):
         if not self.show_folding_path_btn:
             return
 
-        gamma_tmp = self.gamma
         n_gamma = 30
         X_gIa = np.zeros((n_gamma, *self.X_Ia_trimmed.shape))
         for i, gamma in enumerate(np.linspace(np.pi / 2 - 0.001, self.gamma, n_gamma)):
-            self.gamma = gamma
-            X_gIa[i, ...] = self.X_Ia_trimmed
-        self.gamma = gamma_tmp
+            X_gIa[i, ...] = self.get_X_Ia_trimmed(gamma)
 
         self.pb.objects[k3d_name] = []
 
@@ -134,41 +134,19 @@ class WBTessellation4P(bu.Model):
     )
 
     def get_phi_range(self, delta_phi):
-        return np.arange(-(self.n_phi_plus - 1), self.n_phi_plus) * delta_phi
+        return wb_kernel.get_phi_range(delta_phi, self.n_phi_plus)
 
     def get_X_phi_range(self,delta_phi, R_0):
         """Given an array of angles and radius return an array of coordinates
         """
-        phi_range = self.get_phi_range((delta_phi))
-        return np.array([np.fabs(R_0) * np.sin(phi_range),
-                         np.fabs(R_0) * np.cos(phi_range) + R_0]).T
+        return wb_kernel.get_X_phi_range(delta_phi, R_0, self.n_phi_plus)
 
     def get_X_x_range(self,delta_x):
-        return np.arange(-(self.n_x_plus - 1), self.n_x_plus) * delta_x
+        return wb_kernel.get_X_x_range(delta_x, self.n_x_plus)
 
     cell_map = tr.Property
     def _get_cell_map(self):
-        delta_x = self.wb_cell.delta_x
-        delta_phi = self.wb_cell.delta_phi
-        R_0 = self.wb_cell.R_0
-
-        X_x_range = self.get_X_x_range(delta_x)
-        X_phi_range = self.get_X_phi_range(delta_phi, R_0)
-        n_idx_x = len(X_x_range)
-        n_idx_phi = len(X_phi_range)
-        idx_x = np.arange(n_idx_x)
-        idx_phi = np.arange(n_idx_phi)
-
-        idx_x_ic = idx_x[(n_idx_x) % 2::2]
-        idx_x_id = idx_x[(n_idx_x + 1) % 2::2]
-        idx_phi_ic = idx_phi[(n_idx_phi) % 2::2]
-        idx_phi_id = idx_phi[(n_idx_phi + 1) % 2::2]
-
-        n_ic = len(idx_x_ic) * len(idx_phi_ic)
-        n_id = len(idx_x_id) * len(idx_phi_id)
-
-        n_cells = n_ic + n_id
-        return n_cells, n_ic, n_id, idx_x_ic, idx_x_id, idx_phi_ic, idx_phi_id
+        return wb_kernel.get_cell_map(self.n_phi_plus, self.n_x_plus)
 
     n_cells = tr.Property
     def _get_n_cells(self):
@@ -180,60 +158,62 @@ class WBTessellation4P(bu.Model):
     def _get_X_Ia_const_change(self):
         return np.copy(self.X_Ia_no_constraint)
 
+    chunk_size = bu.Int(4096)
+    '''Maximum number of cells processed at once when generating
+    the nodes and facets of the tessellation.
+    '''
+
+    def get_cell_row_chunks(self):
+        '''Split the cells into slices of complete rows along phi
+        with at most chunk_size cells (at least one row per slice).
+        '''
+        return wb_kernel.get_cell_row_chunks(self.n_phi_plus, self.n_x_plus, self.chunk_size)
+
+    X_phi_Ia = tr.Property(depends_on='+GEO')
+    '''Nodal coordinates of the cell rotated into each of the phi positions
+    phi - position, I - node, a - dimension
+    '''
+    @tr.cached_property
+    def _get_X_phi_Ia(self):
+        return wb_kernel.get_X_phi_Ia(self.wb_cell.X_Ia, self.wb_cell.delta_phi,
+                                      self.wb_cell.R_0, self.n_phi_plus)
+
+    def get_X_cells_Ia(self, c_range=slice(None)):
+        '''Nodal coordinates of the cells within the slice c_range
+        c - cell, I - node, a - dimension
+        '''
+        idx_x_c, idx_phi_c, _ = self.cell_grid
+        X_x_range = self.get_X_x_range(self.wb_cell.delta_x)
+        return wb_kernel.get_X_cells_Ia(self.X_phi_Ia, X_x_range, idx_x_c, idx_phi_c, c_range)
+
     X_cells_Ia = tr.Property(depends_on='+GEO')
     '''Array with nodal coordinates of uncoupled cells
     I - node, a - dimension
     '''
     @tr.cached_property
     def _get_X_cells_Ia(self):
+        return self.get_X_cells_Ia().reshape(-1, 3)
 
-        delta_x = self.wb_cell.delta_x
-        delta_phi = self.wb_cell.delta_phi
-        R_0 = self.wb_cell.R_0
-
-        X_Ia_wb_rot = np.copy(self.wb_cell.X_Ia)
-        X_Ia_wb_rot[...,2] -= R_0
-        X_cIa = np.array([X_Ia_wb_rot], dtype=np.float_)
-        rotation_axes = np.array([[1, 0, 0]], dtype=np.float_)
-        rotation_angles = self.get_phi_range(delta_phi)
-        q = axis_angle_to_q(rotation_axes, rotation_angles)
-        X_dIa = qv_mult(q, X_cIa)
-        X_dIa[...,2] += R_0
-
-        X_x_range = self.get_X_x_range(delta_x)
-        X_phi_range = self.get_X_phi_range(delta_phi, R_0)
-        n_idx_x = len(X_x_range)
-        n_idx_phi = len(X_phi_range)
-        idx_x = np.arange(n_idx_x)
-        idx_phi = np.arange(n_idx_phi)
-
-        idx_x_ic = idx_x[(n_idx_x) % 2::2]
-        idx_x_id = idx_x[(n_idx_x + 1) % 2::2]
-        idx_phi_ic = idx_phi[(n_idx_phi) % 2::2]
-        idx_phi_id = idx_phi[(n_idx_phi + 1) % 2::2]
-
-        X_E = X_x_range[idx_x_ic]
-        X_F = X_x_range[idx_x_id]
-
-        X_CIa = X_dIa[idx_phi_ic]
-        X_DIa = X_dIa[idx_phi_id]
-
-        expand = np.array([1,0,0])
-        X_E_a = np.einsum('i,j->ij', X_E, expand)
-        X_ECIa = X_CIa[np.newaxis,:,:,:] + X_E_a[:,np.newaxis,np.newaxis,:]
-        X_F_a = np.einsum('i,j->ij', X_F, expand)
-        X_FDIa = X_DIa[np.newaxis,:,:,:] + X_F_a[:,np.newaxis,np.newaxis,:]
-
-        X_Ia = np.vstack([X_ECIa.flatten().reshape(-1,3), X_FDIa.flatten().reshape(-1,3)])
-        return X_Ia
+    X_unique_Ia = tr.Property(depends_on='+GEO')
+    '''Nodal coordinates of the merged nodes generated in chunks of cell rows
+    without the coordinates of all uncoupled cells
+    I - node, a - dimension
+    '''
+    @tr.cached_property
+    def _get_X_unique_Ia(self):
+        idx_x_c, idx_phi_c, _ = self.cell_grid
+        idx_unique, _ = self.unique_node_map
+        X_x_range = self.get_X_x_range(self.wb_cell.delta_x)
+        return wb_kernel.get_X_unique_Ia(self.X_phi_Ia, X_x_range, idx_x_c, idx_phi_c,
+                                         idx_unique, self.get_cell_row_chunks())
 
     I_cells_Fi = tr.Property(depends_on='+GEO')
     @tr.cached_property
     def _get_I_cells_Fi(self):
-        I_Fi_cell = self.wb_cell.I_Fi
+        I_Fi_cell = self.wb_cell.I_Fi.astype(np.int32)
         n_I_cell = self.wb_cell.n_I
         n_cells = self.n_cells
-        i_range = np.arange(n_cells) * n_I_cell
+        i_range = np.arange(n_cells, dtype=np.int32) * n_I_cell
         I_Fi = (I_Fi_cell[np.newaxis,:,:] + i_range[:, np.newaxis, np.newaxis]).reshape(-1, 3)
         return I_Fi
 
@@ -253,8 +233,7 @@ class WBTessellation4P(bu.Model):
     ''' Valley lines-node mapping '''
     def _get_I_V_Li(self):
         _, idx_remap = self.unique_node_map
-        I_Li = np.unique(np.sort(idx_remap[self.I_cells_V_Li], axis=1), axis=0)
-        return I_Li
+        return wb_kernel.get_cells_I_Li(self.wb_cell.I_V_Li, self.wb_cell.n_I, idx_remap)
 
     I_cells_M_Li = tr.Property(depends_on='+GEO')
     ''' Mountain lines-node mapping (uncombined)'''
@@ -266,14 +245,13 @@ class WBTessellation4P(bu.Model):
     ''' Mountain lines-node mapping '''
     def _get_I_M_Li(self):
         _, idx_remap = self.unique_node_map
-        I_Li = np.unique(np.sort(idx_remap[self.I_cells_M_Li], axis=1), axis=0)
-        return I_Li
+        return wb_kernel.get_cells_I_Li(self.wb_cell.I_M_Li, self.wb_cell.n_I, idx_remap)
 
     def _get_shell_lines_uncombined_I_Li(self, I_Li_cell):
         n_I_cell = self.wb_cell.n_I
         n_cells = self.n_cells
-        i_range = np.arange(n_cells) * n_I_cell
-        I_Li = (I_Li_cell[np.newaxis, :, :] + i_range[:, np.newaxis, np.newaxis]).reshape(-1, 2)
+        i_range = np.arange(n_cells, dtype=np.int32) * n_I_cell
+        I_Li = (I_Li_cell.astype(np.int32)[np.newaxis, :, :] + i_range[:, np.newaxis, np.newaxis]).reshape(-1, 2)
         return I_Li
 
 
@@ -282,56 +260,101 @@ class WBTessellation4P(bu.Model):
     '''
     @tr.cached_property
     def _get_X_Ia_no_constraint(self):
-        idx_unique, _ = self.unique_node_map
-        X_Ia = self.X_cells_Ia[idx_unique]
         if self.trim_half_cells_along_x:
             _, cells_out_xyj = self.cells_in_out_xyj
-            X_Ia[cells_out_xyj[-1, :, 3]] = (X_Ia[cells_out_xyj[-1, :, 3]] + X_Ia[cells_out_xyj[-1, :, 4]]) / 2
-            X_Ia[cells_out_xyj[0, :, 4]] = (X_Ia[cells_out_xyj[0, :, 3]] + X_Ia[cells_out_xyj[0, :, 4]]) / 2
-        return X_Ia
+            return wb_kernel.align_nodes_along_x(self.X_unique_Ia, cells_out_xyj,
+                                                 self._get_idx_of_nodes_to_align())
+        return np.copy(self.X_unique_Ia)
+
+    def _get_idx_of_nodes_to_align(self):
+        return wb_kernel.NODES_TO_ALIGN_4P
 
     X_Ia = tr.Property(depends_on='+GEO')
     '''Array with nodal coordinates I - node, a - dimension
     '''
     @tr.cached_property
     def _get_X_Ia(self):
-        X_Ia = self.X_Ia_no_constraint
-        if self.constraint_coord_idx == 0 and self.constraint_node_idx == 0:
-            return X_Ia
-        else:
-            X_Ia_const_change = self.X_Ia_const_change
-            coord_idx = self.constraint_coord_idx
-            node_idx = self.constraint_node_idx
-            const_X_Ia = np.copy(X_Ia)
-            if coord_idx == -1:
-                diff = X_Ia[node_idx, :] - X_Ia_const_change[node_idx, :]
-                const_X_Ia[:, :] = X_Ia[:, :] - diff[np.newaxis]
-            else:
-                diff = X_Ia[node_idx, coord_idx] - X_Ia_const_change[node_idx, coord_idx]
-                const_X_Ia[:, coord_idx] = X_Ia[:, coord_idx] - diff[np.newaxis]
-            return const_X_Ia
+        return wb_kernel.apply_node_constraint(self.X_Ia_no_constraint, self.X_Ia_const_change,
+                                               self.constraint_node_idx, self.constraint_coord_idx)
 
     X_Ia_trimmed = tr.Property(depends_on='+GEO')
     '''Array with nodal coordinates I - node, a - dimension
     '''
     @tr.cached_property
     def _get_X_Ia_trimmed(self):
-        return self.X_Ia[np.sort(np.unique(self.I_Fi.flatten()))] if self.is_trimmed else self.X_Ia
+        return wb_kernel.get_trimmed(self.X_Ia, self.I_Fi)[0] if self.is_trimmed else self.X_Ia
+
+    def get_c(self, gamma):
+        '''Parameter c of the cell folded to the angle gamma
+        '''
+        return self.c
+
+    def get_X_Ia(self, gamma):
+        '''Nodal coordinates of the tessellation folded to the angle gamma
+        evaluated by the geometry kernel without changing the state
+        (gamma) of the tessellation
+        '''
+        X_Ia_cell, delta_x, delta_phi, R_0 = self.wb_cell.get_kinematics(
+            gamma, self.a, self.b, self.get_c(gamma))
+        idx_x_c, idx_phi_c, _ = self.cell_grid
+        idx_unique, _ = self.unique_node_map
+        X_phi_Ia = wb_kernel.get_X_phi_Ia(X_Ia_cell, delta_phi, R_0, self.n_phi_plus)
+        X_Ia = wb_kernel.get_X_unique_Ia(X_phi_Ia, self.get_X_x_range(delta_x), idx_x_c, idx_phi_c,
+                                         idx_unique, self.get_cell_row_chunks())
+        if self.trim_half_cells_along_x:
+            _, cells_out_xyj = self.cells_in_out_xyj
+            X_Ia = wb_kernel.align_nodes_along_x(X_Ia, cells_out_xyj, self._get_idx_of_nodes_to_align())
+        return wb_kernel.apply_node_constraint(X_Ia, self.X_Ia_const_change,
+                                               self.constraint_node_idx, self.constraint_coord_idx)
+
+    def get_X_Ia_trimmed(self, gamma):
+        '''Trimmed nodal coordinates of the tessellation folded to the angle gamma
+        '''
+        X_Ia = self.get_X_Ia(gamma)
+        return wb_kernel.get_trimmed(X_Ia, self.I_Fi)[0] if self.is_trimmed else X_Ia
+
+    X_Ia_p = tr.Property(depends_on='+GEO')
+    '''Derivatives of the nodal coordinates with respect to the cell
+    parameters wb_cell.kinematics_params, I - node, a - dimension, p - parameter
+    '''
+    @tr.cached_property
+    def _get_X_Ia_p(self):
+        wb_cell = self.wb_cell
+        X_Ia_cell_p, delta_x_p, delta_phi_p, R_0_p = wb_cell.kinematics_p
+        idx_x_c, idx_phi_c, _ = self.cell_grid
+        idx_unique, _ = self.unique_node_map
+        X_phi_Iap = wb_kernel.get_X_phi_Ia_p(wb_cell.X_Ia, X_Ia_cell_p, wb_cell.delta_phi, delta_phi_p,
+                                             wb_cell.R_0, R_0_p, self.n_phi_plus)
+        X_x_range_p = wb_kernel.get_X_x_range_p(delta_x_p, self.n_x_plus)
+        X_Iap = wb_kernel.get_X_unique_Ia(X_phi_Iap, X_x_range_p, idx_x_c, idx_phi_c,
+                                          idx_unique, self.get_cell_row_chunks())
+        if self.trim_half_cells_along_x:
+            _, cells_out_xyj = self.cells_in_out_xyj
+            X_Iap = wb_kernel.align_nodes_along_x(X_Iap, cells_out_xyj, self._get_idx_of_nodes_to_align())
+        return wb_kernel.apply_node_constraint_p(X_Iap, self.constraint_node_idx, self.constraint_coord_idx)
+
+    X_Ia_trimmed_p = tr.Property(depends_on='+GEO')
+    '''Derivatives of the trimmed nodal coordinates, see X_Ia_p
+    '''
+    @tr.cached_property
+    def _get_X_Ia_trimmed_p(self):
+        return wb_kernel.get_trimmed(self.X_Ia_p, self.I_Fi)[0] if self.is_trimmed else self.X_Ia_p
 
     I_Li = tr.Property(depends_on='+GEO')
     '''Lines-node mapping
     '''
     def _get_I_Li(self):
         _, idx_remap = self.unique_node_map
-        I_Li = np.unique(np.sort(idx_remap[self.I_cells_Li], axis=1), axis=0)
-        return I_Li
+        return wb_kernel.get_cells_I_Li(self.wb_cell.I_Li, self.wb_cell.n_I, idx_remap)
 
     I_Fi_ = tr.Property(depends_on='+GEO')
-    '''Facet - node mapping
+    '''Facet - node mapping (untrimmed) generated in chunks of cell rows
     '''
+    @tr.cached_property
     def _get_I_Fi_(self):
         _, idx_remap = self.unique_node_map
-        return idx_remap[self.I_cells_Fi]
+        return wb_kernel.get_cells_I_Fi(self.wb_cell.I_Fi, self.wb_cell.n_I, idx_remap,
+                                        self.get_cell_row_chunks())
 
     I_Fi_trimmed = tr.Property(depends_on='+GEO')
     '''Facet - node mapping
@@ -339,18 +362,8 @@ class WBTessellation4P(bu.Model):
     @tr.cached_property
     def _get_I_Fi_trimmed(self):
         if self.is_trimmed:
-            I_Fi = self.I_Fi
             # Reindexing I_Fi to match the new X_Ia (after trimming)
-            I_Fi_shape = I_Fi.shape
-            I_Fi_flat = I_Fi.flatten()
-
-            old_indices = np.sort(np.unique(I_Fi.flatten()))
-            new_indices = np.arange(old_indices.size)
-
-            I_Fi_flat_reindexed = np.copy(I_Fi_flat)
-            for old_index, new_index in zip(old_indices, new_indices):
-                I_Fi_flat_reindexed[I_Fi_flat == old_index] = new_index
-            return I_Fi_flat_reindexed.reshape(I_Fi_shape)
+            return wb_kernel.get_trimmed(self.X_Ia, self.I_Fi)[1]
         else:
             return self.I_Fi
 
@@ -359,35 +372,14 @@ class WBTessellation4P(bu.Model):
     '''
     @tr.cached_property
     def _get_I_Fi(self):
-        _, idx_remap = self.unique_node_map
-        I_Fi = idx_remap[self.I_cells_Fi]
-
         if self.trim_half_cells_along_y or self.trim_half_cells_along_x:
-            cells_in_xyfi_, cells_out_xyfi_ = self.cells_in_out_xyfi
-            cells_in_xyfi = np.copy(cells_in_xyfi_)
-            cells_out_xyfi = np.copy(cells_out_xyfi_)
-            along_x_first_cell, along_x_last_cell, along_y_first_cell, along_y_last_cell = self._get_idx_of_facets_to_trim()
-            if self.trim_half_cells_along_y:
-                # Set extended facets to -1 indicies (to mark it for later removal)
-                cells_out_xyfi[:, 0, along_y_first_cell, :] = -1
-                cells_out_xyfi[:, -1, along_y_last_cell, :] = -1
-            if self.trim_half_cells_along_x:
-                # Remove half cells along x
-                cells_out_xyfi[0, :, along_x_first_cell, :] = -1
-                cells_out_xyfi[-1, :, along_x_last_cell, :] = -1
-
-            # Delete extended facets
-            I_Fi = np.vstack((cells_in_xyfi.reshape((-1, 3)), cells_out_xyfi.reshape((-1, 3))))
-            F_m = I_Fi.flatten()
-            I_Fi = np.delete(F_m, np.where(F_m == -1)).reshape((-1, 3))
-        return I_Fi
+            return wb_kernel.trim_I_Fi(self.F_cfi, self.n_phi_plus, self.n_x_plus,
+                                       self._get_idx_of_facets_to_trim(),
+                                       self.trim_half_cells_along_y, self.trim_half_cells_along_x)
+        return self.I_Fi_
 
     def _get_idx_of_facets_to_trim(self):
-        along_y_first_cell = (0, 2, 4)
-        along_y_last_cell = (1, 3, 5)
-        along_x_first_cell = (4, 5)
-        along_x_last_cell = (2, 3)
-        return along_x_first_cell, along_x_last_cell, along_y_first_cell, along_y_last_cell
+        return wb_kernel.FACETS_TO_TRIM_4P
 
     cells_in_out_xyfi = tr.Property(depends_on='+GEO')
     ''' Convenience indexing for inner and outer cells in the tessellation where (x, y cell index along x and y; 
@@ -397,10 +389,10 @@ class WBTessellation4P(bu.Model):
         mesh_elem_num = self.cell_mesh_surf_elem_num
         F_cfi = self.F_cfi
         n_x_in, n_x_out, n_y_in, n_y_out, cells_in_indices, cells_out_indices = self.cells_in_out_info
-        cells_out_cfi = F_cfi[cells_out_indices]
-        cells_out_xyfi = cells_out_cfi.reshape((n_x_out, n_y_out, mesh_elem_num, 3))
-        cells_in_cfi = F_cfi[cells_in_indices]
-        cells_in_xyfi = cells_in_cfi.reshape((n_x_in, n_y_in, mesh_elem_num, 3))
+        # the inner and outer cells are contiguous so that the slices are views
+        n_in = len(cells_in_indices)
+        cells_out_xyfi = F_cfi[n_in:n_in + len(cells_out_indices)].reshape((n_x_out, n_y_out, mesh_elem_num, 3))
+        cells_in_xyfi = F_cfi[:n_in].reshape((n_x_in, n_y_in, mesh_elem_num, 3))
         return cells_in_xyfi, cells_out_xyfi
 
     cell_mesh_surf_elem_num = tr.Property()
@@ -412,14 +404,9 @@ class WBTessellation4P(bu.Model):
     j is cell nodes indices in order)'''
     @tr.cached_property
     def _get_cells_in_out_xyj(self):
-        F_cfi = self.F_cfi
-        n_x_in, n_x_out, n_y_in, n_y_out, cells_in_indices, cells_out_indices = self.cells_in_out_info
-        I_cj = np.unique(F_cfi.reshape((F_cfi.shape[0], -1)), axis=1)
-        cells_out_cj = I_cj[cells_out_indices]
-        cells_in_cj = I_cj[cells_in_indices]
-        cells_out_xyj = cells_out_cj.reshape((n_x_out, n_y_out, self.cell_node_num))
-        cells_in_xyj = cells_in_cj.reshape((n_x_in, n_y_in, self.cell_node_num))
-        return cells_in_xyj, cells_out_xyj
+        _, idx_remap = self.unique_node_map
+        return wb_kernel.get_cells_in_out_xyj(idx_remap, self.n_phi_plus, self.n_x_plus,
+                                              self.cell_node_num)
 
     cell_node_num = tr.Property()
     def _get_cell_node_num(self):
@@ -429,17 +416,7 @@ class WBTessellation4P(bu.Model):
     ''' n_x_in, n_x_out, n_y_in, n_y_out are number of inner and outer cells along x and y'''
     @tr.cached_property
     def _get_cells_in_out_info(self):
-        n_x_real = 2 * self.n_x_plus - 1
-        n_y_real = self.n_phi_plus
-        n_x_in = int(n_x_real / 2)
-        n_x_out = n_x_in + 1
-        n_y_in = n_y_real - 1
-        n_y_out = n_y_real
-        cells_num_in = n_x_in * n_y_in
-        cells_num_out = n_x_out * n_y_out
-        cells_in_indices = np.arange(cells_num_in)
-        cells_out_indices = np.arange(cells_num_in, cells_num_in + cells_num_out)
-        return n_x_in, n_x_out, n_y_in, n_y_out, cells_in_indices, cells_out_indices
+        return wb_kernel.get_cells_in_out_info(self.n_phi_plus, self.n_x_plus)
 
     F_cfi = tr.Property(depends_on='+GEO')
     ''' Convenience indexing where (c cell index, f facet index, i indices of facet's nodes)'''
@@ -449,19 +426,49 @@ class WBTessellation4P(bu.Model):
         I_Fi = self.I_Fi_
         return I_Fi.reshape((self.n_cells, self.cell_mesh_surf_elem_num, 3))
 
+    cell_grid = tr.Property(depends_on='+GEO')
+    '''Position of the cells within the (x, phi) index space of the tessellation.
+    Returns the x and phi indices of each cell c in the order of X_cells_Ia and
+    the grid of cell numbers with -1 at positions not occupied by a cell.
+    '''
+    @tr.cached_property
+    def _get_cell_grid(self):
+        return wb_kernel.get_cell_grid(self.n_phi_plus, self.n_x_plus)
+
+    I_shared_pairs = tr.Property(depends_on='+GEO')
+    '''Pairs of coinciding nodes in the numbering of X_cells_Ia derived from the
+    neighbourhood table I_shared of the cell.
+    '''
+    @tr.cached_property
+    def _get_I_shared_pairs(self):
+        return wb_kernel.get_shared_pairs(self.n_phi_plus, self.n_x_plus,
+                                          self.wb_cell.I_shared, self.wb_cell.n_I)
+
     node_match_threshold = tr.Property(depends_on='+GEO')
 
     def _get_node_match_threshold(self):
         min_length = np.min([self.a, self.b, self.c])
-        return min_length * 1e-3
+        return min_length * 1e-6
 
     unique_node_map = tr.Property(depends_on='+GEO')
     '''Property containing the mapping between the crease pattern nodes
     with duplicate nodes and pattern with compressed nodes array.
-    The criterion for removing a node is geometric, the threshold
-    is specified in node_match_threshold.
+    The coinciding nodes are identified topologically using the pairs of
+    shared nodes between neighbouring cells so that no geometric
+    comparison is needed. Each group of coinciding nodes is represented
+    by the node with the lowest index.
     '''
+    @tr.cached_property
     def _get_unique_node_map(self):
+        n_I = self.n_cells * self.wb_cell.n_I
+        return wb_kernel.get_unique_node_map(n_I, self.I_shared_pairs)
+
+    unique_node_map_geo = tr.Property(depends_on='+GEO')
+    '''Geometric variant of unique_node_map comparing the distances between
+    all pairs of nodes, the threshold is specified in node_match_threshold.
+    Its quadratic complexity limits it to checking the topological node map.
+    '''
+    def _get_unique_node_map_geo(self):
         # reshape the coordinates in array of segments to the shape (n_N, n_D
         x_0 = self.X_cells_Ia
         # construct distance vectors between every pair of nodes
@@ -500,13 +507,8 @@ class WBTessellation4P(bu.Model):
     I_CDij = tr.Property(depends_on='+GEO')
     @tr.cached_property
     def _get_I_CDij(self):
-        n_cells, n_ic, n_id, _, x_cell_idx, _, y_cell_idx = self.cell_map
-        x_idx, y_idx = x_cell_idx / 2, y_cell_idx / 2
-        n_x_, n_y_ = len(x_idx), len(y_idx)
-        I_cell_offset = (n_ic + np.arange(n_x_ * n_y_).reshape(n_x_, n_y_)) * self.wb_cell.n_I
-        I_CDij_map = (I_cell_offset.T[:, :, np.newaxis, np.newaxis] +
-                      self.wb_cell.I_boundary[np.newaxis, np.newaxis, :, :])
-        return I_CDij_map
+        return wb_kernel.get_I_CDij(self.n_phi_plus, self.n_x_plus,
+                                    self.wb_cell.I_boundary, self.wb_cell.n_I)
 
     is_trimmed = tr.Property(depends_on='+GEO')
 
@@ -644,8 +646,7 @@ class WBTessellation4P(bu.Model):
             gamma = self.gamma
 
         if type == 'pattern':
-            self.gamma = np.pi/2-0.0001
-            gamma = self.gamma
+            gamma = np.pi/2-0.0001
 
         fig = None
         if ax is None:
@@ -658,26 +659,22 @@ class WBTessellation4P(bu.Model):
         if type != 'pattern':
             self.plot_folding_pattern(trimmed=trimmed, ax=ax, gamma=gamma, color='red', view='top')
 
-        gamma_temp = self.gamma
-        self.gamma = gamma
-
-        self.plot_formwork_points(ax=ax, type=type)
-
-        self.gamma = gamma_temp
+        self.plot_formwork_points(ax=ax, type=type, gamma=gamma)
 
         if fig is not None:
             fig.show()
             return fig, ax
 
-    def plot_formwork_points(self, ax=None, type='fixed_base'):
+    def plot_formwork_points(self, ax=None, type='fixed_base', gamma=None):
         fig = None
         if ax is None:
             fig, ax = plt.subplots()
             fig.set_size_inches(8.5, 8.5)
 
-        x = self.X_Ia_trimmed[:, 0]
-        y = self.X_Ia_trimmed[:, 1]
-        z_orig = self.X_Ia_trimmed[:, 2]
+        X_Ia = self.X_Ia_trimmed if gamma is None else self.get_X_Ia_trimmed(gamma)
+        x = X_Ia[:, 0]
+        y = X_Ia[:, 1]
+        z_orig = X_Ia[:, 2]
         z = np.copy(z_orig)
         n = np.arange(x.size)
 
@@ -733,8 +730,6 @@ class WBTessellation4P(bu.Model):
         :trimmed (boolean): False: full original tessellation, True: if some cells are trimmed, plot the trimmed tessellation.
         However, the trimmed variant doesn't distinguish valley and mountain folds for now.
         """
-        gamma_temp = self.gamma
-        self.gamma = gamma
         print('Plot tessellation with gamma=', round(np.rad2deg(gamma), 2), '°')
         if ax is None:
             fig, ax = plt.subplots()
@@ -750,20 +745,21 @@ class WBTessellation4P(bu.Model):
             raise Exception('No valid value has been provided for argument "view"')
 
         if trimmed:
-            X_I1 = self.X_Ia_trimmed[:, coord_1]
-            X_I2 = self.X_Ia_trimmed[:, coord_2]
+            X_Ia = self.get_X_Ia_trimmed(gamma)
+            X_I1 = X_Ia[:, coord_1]
+            X_I2 = X_Ia[:, coord_2]
             triangles = self.I_Fi_trimmed
             ax.triplot(X_I1, X_I2, triangles, lw=1.2, c=color)
         else:
-            V_lines = self.X_Ia[self.I_V_Li]
-            M_lines = self.X_Ia[self.I_M_Li]
+            X_Ia = self.get_X_Ia(gamma)
+            V_lines = X_Ia[self.I_V_Li]
+            M_lines = X_Ia[self.I_M_Li]
             for i_line in range(V_lines.shape[0]):
                 ax.plot(V_lines[i_line, :, coord_1], V_lines[i_line, :, coord_2], '--', c=color)
             for i_line in range(M_lines.shape[0]):
                 ax.plot(M_lines[i_line, :, coord_1], M_lines[i_line, :, coord_2], c=color)
 
         ax.axis('equal')
-        self.gamma = gamma_temp
         if 'fig' in locals():
             fig.show()
             return fig, ax
@@ -771,11 +767,29 @@ class WBTessellation4P(bu.Model):
     def get_dih_angles(self):
         return get_dih_angles(self.X_Ia_trimmed, self.I_Fi_trimmed)
 
-    def export_fold_file(self, path=None):
+    def get_first_self_intersection(self, gamma_range, leaf_size=4, rel_tol=1e-6):
+        '''First fold angle in gamma_range at which the (trimmed) tessellation
+        penetrates itself and the pairs of the penetrating facets of I_Fi_trimmed,
+        (None, empty array) if the folding path is free of self-intersections
+        '''
+        return get_first_self_intersection(self.get_X_Ia_trimmed, self.I_Fi_trimmed, gamma_range,
+                                           leaf_size=leaf_size, rel_tol=rel_tol)
+
+    def get_rigidity_audit(self, gamma_range, rel_tol=1e-6, angle_tol=1e-6):
+        '''Deviations of the edge lengths and sector angles of the (trimmed) tessellation
+        folded along gamma_range from the first fold angle,
+        see utils.rigidity_audit.get_rigidity_audit
+        '''
+        X_gIa = np.array([self.get_X_Ia_trimmed(gamma) for gamma in gamma_range])
+        return get_rigidity_audit(X_gIa, self.I_Fi_trimmed, rel_tol=rel_tol, angle_tol=angle_tol)
+
+    def export_fold_file(self, path=None, indent=4, compress=None):
         # See https://github.com/edemaine/fold/blob/master/doc/spec.md for fold file specification
         # Viewer: https://edemaine.github.io/fold/examples/foldviewer.html
+        # indent=None writes a compact file, compress=True (or path ending with .gz) a gzip file
+        I_Ei, assignment_E = get_fold_edges(self.I_Fi, self.I_M_Li, self.I_V_Li)
 
-        output_data = {
+        meta = {
             "file_spec": 1,
             "file_creator": "BMCS software suite",
             "file_author": "RWTH Aachen - Institute of Structural Concrete",
@@ -783,23 +797,32 @@ class WBTessellation4P(bu.Model):
             "file_classes": ["singleModel"],
             "frame_title": "Preliminary Base Crease Pattern",
             "frame_classes": ["creasePattern"],
-            "vertices_coords": self.X_Ia.tolist(),
-            "faces_vertices": self.I_Fi.tolist(),
-            # To be completed
         }
 
         if path is None:
             path = time.strftime("%Y%m%d-%H%M%S") + '-shell.fold'
 
-        with open(path, 'w') as outfile:
-            json.dump(output_data, outfile, sort_keys=True, indent=4)
+        write_fold_file(path, self.X_Ia, self.I_Fi, I_Ei, assignment_E, meta=meta,
+                        indent=indent, compress=compress)
+
+    def export_stl_file(self, path=None):
+        '''Binary STL file of the tessellation, e.g. for 3D printing'''
+        write_stl_file(path or self.get_file_name() + '.stl', self.X_Ia, self.I_Fi)
+
+    def export_ply_file(self, path=None):
+        '''Binary PLY file of the tessellation'''
+        write_ply_file(path or self.get_file_name() + '.ply', self.X_Ia, self.I_Fi)
+
+    def export_folding_frames(self, gamma_range, path='wb_tessellation_%04d.ply', writer=write_ply_file):
+        '''One file of the (trimmed) tessellation per fold angle in gamma_range,
+        path contains the format of the frame number
+        '''
+        X_tIa = [self.get_X_Ia_trimmed(gamma) for gamma in gamma_range]
+        return write_mesh_frames(path, X_tIa, self.I_Fi_trimmed, writer=writer)
 
     @tr.observe('plot_points_diff_btn')
     def plot_points_diff(self, event=None):
-        gamma_tmp = self.gamma
-        self.gamma = np.pi / 2 - 0.0001
-        X_Ia0 = self.X_Ia_trimmed
-        self.gamma = gamma_tmp
+        X_Ia0 = self.get_X_Ia_trimmed(np.pi / 2 - 0.0001)
         X_Ia1 = self.X_Ia_trimmed
         X_Ia_diff = X_Ia1 - X_Ia0
         print('Node num.: Coords. in folded state (x_diff, y_diff, z_diff)')
@@ -43,18 +43,5 @@ class WBTessellation4PEx(WBTessellation4P):
         along_x_last_cell = (4, 5)
         return along_x_first_cell, along_x_last_cell, along_y_first_cell, along_y_last_cell
 
-
-    X_Ia_no_constraint = tr.Property(depends_on='+GEO')
-    '''Array with nodal coordinates I - node, a - dimension
-    '''
-    @tr.cached_property
-    def _get_X_Ia_no_constraint(self):
-        idx_unique, _ = self.unique_node_map
-        X_Ia = self.X_cells_Ia[idx_unique]
-        if self.trim_half_cells_along_x:
-            _, cells_out_xyj = self.cells_in_out_xyj
-            X_Ia[cells_out_xyj[-1, :, 0]] = (X_Ia[cells_out_xyj[-1, :, 0]] + X_Ia[cells_out_xyj[-1, :, 1]]) / 2
-            X_Ia[cells_out_xyj[-1, :, 4]] = (X_Ia[cells_out_xyj[-1, :, 4]] + X_Ia[cells_out_xyj[-1, :, 5]]) / 2
-            X_Ia[cells_out_xyj[0, :, 1]] = (X_Ia[cells_out_xyj[0, :, 0]] + X_Ia[cells_out_xyj[0, :, 1]]) / 2
-            X_Ia[cells_out_xyj[0, :, 5]] = (X_Ia[cells_out_xyj[0, :, 4]] + X_Ia[cells_out_xyj[0, :, 5]]) / 2
-        return X_Ia
\ No newline at end of file
+    def _get_idx_of_nodes_to_align(self):
+        return (-1, 0, 1), (-1, 4, 5), (0, 1, 0), (0, 5, 4)
@@ -2,6 +2,7 @@ import bmcs_utils.api as bu
 import numpy as np
 import traits.api as tr
 
+from bmcs_shell.folding.geometry import wb_kernel
 from bmcs_shell.folding.geometry.wb_cell.wb_cell import WBCell
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p_ex import WBCell4ParamEx
 from bmcs_shell.folding.geometry.wb_tessellation.wb_tessellation_4p import WBTessellation4P
@@ -24,15 +25,14 @@ class WBTessellation4PExFlat(WBTessellation4P):
     c = tr.Property(depends_on='+GEO')
     @tr.cached_property
     def _get_c(self):
+        c = self.get_c(self.gamma)
+        self.last_c = c
+        return c
+
+    def get_c(self, gamma):
         if self.fix_c:
             return self.last_c
-        else:
-            c = self.a * (1 - np.sin(self.gamma)) / np.cos(self.gamma) ** 2
-            # TODO: this round is a workaround because the wb_cell will accept only 5-multiplication c values
-            #  (c_max = 2000 and it has 400 steps), make c steps 2000 in wb_cell to improve accuracy (but slow render)
-            c = 5 * round(c/5)
-            self.last_c = c
-            return c
+        return wb_kernel.get_c_4p_flat(gamma, self.a)
 
     ipw_view = bu.View(
         bu.Item('gamma', latex=r'\gamma', editor=bu.FloatRangeEditor(
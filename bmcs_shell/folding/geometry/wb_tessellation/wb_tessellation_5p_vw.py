@@ -30,9 +30,7 @@ class WBTessellation5PVW(WBNumTessellation):
         bu.Item('sol_num'),
     )
 
-    sol = tr.Property(depends_on='+GEO')
-    @tr.cached_property
-    def _get_sol(self):
+    def solve_sol(self, x0=None, wb_cell=None):
         # rhos, sigmas = self.get_3_cells_angles()
         # print('original sigmas=', sigmas)
         # print('original rhos=', rhos)
@@ -61,17 +59,18 @@ class WBTessellation5PVW(WBNumTessellation):
         sol_num = self.sol_num
 
         # Solving with only 4th solution
-        rhos, sigmas = self.get_3_cells_angles(sol_num=sol_num)
+        rhos, sigmas = self.get_3_cells_angles(sol_num=sol_num, wb_cell=wb_cell)
         sol = np.array([sigmas[0], rhos[0]])
         print('Ana. solution:', sol)
         return sol
 
-    def get_3_cells_angles(self, sol_num=None):
-        a = self.wb_cell_.a
-        b = self.wb_cell_.b
-        c = self.wb_cell_.c
-        gamma = self.wb_cell_.gamma
-        beta = self.wb_cell_.beta
+    def get_3_cells_angles(self, sol_num=None, wb_cell=None):
+        wb_cell = self.wb_cell_ if wb_cell is None else wb_cell
+        a = wb_cell.a
+        b = wb_cell.b
+        c = wb_cell.c
+        gamma = wb_cell.gamma
+        beta = wb_cell.beta
 
         cos_psi1 = ((b ** 2 - a ** 2) - a * sqrt(a ** 2 + b ** 2) * cos(beta)) / (b * sqrt(a ** 2 + b ** 2) * sin(beta))
         sin_psi1 = sqrt(
@@ -7,7 +7,7 @@ import k3d
 import numpy as np
 import traits.api as tr
 
-from bmcs_shell.folding.geometry.math_utils import get_rot_matrix_around_vector, get_best_rot_and_trans_3d
+from bmcs_shell.folding.geometry.math_utils import get_best_rot_and_trans_3d
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_4p import WBCell4Param
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_5p_xur import WBCell5ParamXur
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_5p_2gammas import WBCell5P2Gammas
@@ -15,6 +15,8 @@ from bmcs_shell.folding.geometry.wb_cell.wb_cell_5p_2betas import WBCell5Param2B
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_5p_phi import WBCell5ParamPhi
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_5p_beta import WBCell5ParamBeta
 from bmcs_shell.folding.geometry.wb_cell.wb_cell_5p_vw import WBCell5ParamVW
+from bmcs_shell.folding.geometry.wb_tessellation.wb_sol_table import WBSolTable
+from bmcs_shell.folding.utils.rotation import rotate_points
 
 
 class WBTessellationBase(bu.Model):
@@ -102,24 +104,44 @@ class WBTessellationBase(bu.Model):
         return self.rotate_cell(translated_X_Ia, v1_ids, angle=np.pi)
 
     def rotate_cell(self, cell_X_Ia, v1_ids, angle=np.pi):
-        # Rotating around vector #######
-        # 1. Bringing back to origin (because rotating is around a vector originating from origin)
-        cell_X_Ia_copy = np.copy(cell_X_Ia)
-        cell_X_Ia = cell_X_Ia_copy - cell_X_Ia_copy[v1_ids[1]]
-
-        # 2. Rotating
-        rot_around_v1 = get_rot_matrix_around_vector(cell_X_Ia[v1_ids[0]] - cell_X_Ia[v1_ids[1]], angle)
-        cell_X_Ia = np.einsum('ba, Ia -> Ib', rot_around_v1, cell_X_Ia)
-
-        # 3. Bringing back in position
-        return cell_X_Ia + cell_X_Ia_copy[v1_ids[1]]
+        '''Rotate the cell nodes by angle around the axis through the nodes v1_ids'''
+        X_center_a = cell_X_Ia[v1_ids[1]]
+        return rotate_points(cell_X_Ia, cell_X_Ia[v1_ids[0]] - X_center_a, angle, X_center_a)
 
     def get_sol(self, base_cell_X_Ia, glued_cell_X_Ia, side='r'):
         return np.array([np.pi, np.pi])
 
-    sol = tr.Property(depends_on='+GEO')
+    sol_table = tr.Instance(WBSolTable)
+    '''Optional table of precomputed solutions, see WBSolTable.tabulate'''
+
+    sol_tol = bu.Float(1e-4)
+    '''Accepted interpolation error of the tabulated solution'''
+
+    sol = tr.Property(depends_on='+GEO, sol_table, sol_tol')
     @tr.cached_property
     def _get_sol(self):
+        return self.get_cell_sol(self.wb_cell_)
+
+    def get_cell_sol(self, wb_cell):
+        '''Rotation angles of the glued cells for the cell wb_cell (of the type of wb_cell_)'''
+        if self.sol_table is None:
+            return self.solve_sol(wb_cell=wb_cell)
+        x_a = [getattr(wb_cell, name) for name in self.sol_table.param_names]
+        sol_n2, err_n = self.sol_table.interpolate(x_a)
+        if err_n[0] <= self.sol_tol:
+            return sol_n2[0]
+        # Outside of the table or its tolerance, polish the interpolated value by the exact solution
+        return self.solve_sol(x0=sol_n2[0] if np.all(np.isfinite(sol_n2)) else None, wb_cell=wb_cell)
+
+    def get_cell(self, gamma):
+        '''Copy of the cell folded to the angle gamma, the cell wb_cell_ is not changed'''
+        wb_cell = self.wb_cell_.clone_traits()
+        wb_cell.gamma = gamma
+        return wb_cell
+
+    def solve_sol(self, x0=None, wb_cell=None):
+        '''Exact solution of the rotation angles for the cell wb_cell (wb_cell_ if not given),
+        x0 is an initial guess for iterative solvers'''
         # No solution is provided in base class, a default value is provided for visualization
         return np.array([np.pi, np.pi])
 
@@ -0,0 +1,33 @@
+'''
+Tracing of the peak memory allocated during a computation.
+'''
+
+import tracemalloc
+
+
+class PeakMemory(object):
+    '''Context manager recording the peak memory in bytes allocated
+    by Python objects and numpy arrays within the block::
+
+        with PeakMemory() as mem:
+            X_Ia = wbt.X_Ia
+        print(mem.peak)
+    '''
+
+    def __init__(self):
+        self.peak = 0
+
+    def __enter__(self):
+        self._stop = not tracemalloc.is_tracing()
+        if self._stop:
+            tracemalloc.start()
+        self._current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *args):
+        _, peak = tracemalloc.get_traced_memory()
+        self.peak = peak - self._current
+        if self._stop:
+            tracemalloc.stop()
+        return False
@@ -0,0 +1,116 @@
+'''
+Disk cache of generated meshes.
+
+A mesh is stored as a ``.npz`` file of its arrays (e.g. ``X_Id``,
+``I_Fi`` and optional quality data) named by the hash of the input
+arrays and the meshing options. The files are written to a temporary
+file in the cache directory and atomically renamed, so that several
+processes can share the cache without locking: a reader either finds a
+complete file or none. Hits refresh the modification time of the file,
+the least recently used files are evicted when the total size of the
+cache exceeds its limit.
+'''
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+CACHE_VERSION = 1
+
+
+class MeshCache(object):
+    '''Cache of the meshes in the directory cache_dir limited to max_bytes::
+
+        cache = MeshCache('~/.cache/bmcs_shell/meshes')
+        mesh = cache.get_or_create(generate, X_Ia=X_Ia, I_Fi=I_Fi, mesh_size=50)
+    '''
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def get_key(**inputs):
+        '''Hash of the input arrays and options given as keyword arguments'''
+        h = hashlib.sha256(b'bmcs_shell.mesh_cache.%d' % CACHE_VERSION)
+        for name in sorted(inputs):
+            value = inputs[name]
+            h.update(name.encode())
+            if isinstance(value, np.ndarray):
+                value = np.ascontiguousarray(value)
+                h.update(json.dumps([value.dtype.str, value.shape]).encode())
+                h.update(value.tobytes())
+            else:
+                h.update(json.dumps(value, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def get(self, key):
+        '''Dictionary of the cached arrays, None if the key is not cached'''
+        path = self.get_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            os.utime(path)
+        except (OSError, ValueError):
+            # missing, evicted meanwhile or damaged
+            return None
+        return arrays
+
+    def put(self, key, arrays):
+        '''Store the dictionary of arrays under the key'''
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.get_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def get_or_create(self, generate, **inputs):
+        '''Cached arrays for the inputs, on a miss they are generated
+        by generate() returning a dictionary of arrays and stored
+        '''
+        key = self.get_key(**inputs)
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = generate()
+            self.put(key, arrays)
+        return arrays
+
+    def evict(self):
+        '''Remove the least recently used meshes exceeding max_bytes'''
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npz'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,129 @@
+'''
+Bulk writers of triangular meshes.
+
+The coordinate and index arrays of the text formats are formatted in
+chunks of rows by a single string formatting operation per chunk and
+streamed to the file, so that neither Python loops over the rows nor
+the complete text of large meshes in memory are needed. Files with the
+suffix ``.gz`` (or with ``compress=True``) are written gzip compressed.
+
+The binary STL and PLY files are assembled as numpy structured arrays
+of the facet and vertex records and written with a single call.
+
+Indices: I - node, a - dimension, F - facet, i - facet node,
+t - frame
+'''
+
+import gzip
+
+import numpy as np
+
+CHUNK_SIZE = 10000
+
+
+def open_output(path, compress=None):
+    '''Text file opened for writing, gzip compressed if compress is True
+    or if compress is None and the path ends with .gz
+    '''
+    if compress is None:
+        compress = str(path).endswith('.gz')
+    if compress:
+        # low compression level, the higher ones are much slower for little gain
+        return gzip.open(path, 'wt', compresslevel=1)
+    return open(path, 'w')
+
+
+def open_input(path):
+    '''Text file opened for reading, gzip compressed files are
+    recognized by their magic number
+    '''
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    return gzip.open(path, 'rt') if compressed else open(path, 'r')
+
+
+def write_rows(f, A, row_fmt, sep='', chunk_size=CHUNK_SIZE):
+    '''Write the rows of the two-dimensional array A formatted by row_fmt
+    (e.g. 'v %r %r %r\\n') and separated by sep to the file f.
+    Floats formatted by %r are written with the shortest exact representation.
+    '''
+    A = np.asarray(A)
+    for n_0 in range(0, len(A), chunk_size):
+        A_chunk = A[n_0:n_0 + chunk_size]
+        if n_0 > 0:
+            f.write(sep)
+        f.write(sep.join([row_fmt] * len(A_chunk)) % tuple(A_chunk.ravel().tolist()))
+
+
+def write_obj_file(path, X_Ia, I_Fi, compress=None, chunk_size=CHUNK_SIZE):
+    '''Write the nodes X_Ia and the triangular facets I_Fi as Wavefront OBJ file
+    '''
+    X_Ia, I_Fi = np.asarray(X_Ia, dtype=np.float_), np.asarray(I_Fi)
+    with open_output(path, compress) as f:
+        f.write('# Vertices: (%d)\n' % len(X_Ia))
+        write_rows(f, X_Ia, 'v %r %r %r\n', chunk_size=chunk_size)
+        f.write('\n# Tri Facets: (%d)\n' % len(I_Fi))
+        write_rows(f, I_Fi + 1, 'f %d %d %d\n', chunk_size=chunk_size)
+
+
+def _write_buffer(path, header, *records):
+    with open(path, 'wb') as f:
+        f.write(header)
+        for record in records:
+            f.write(record.tobytes())
+
+
+def write_stl_file(path, X_Ia, I_Fi, header='bmcs_shell'):
+    '''Write the nodes X_Ia and the triangular facets I_Fi as binary STL file,
+    the facet normals are evaluated from the nodes
+    '''
+    X_Fia = np.asarray(X_Ia, dtype=np.float_)[np.asarray(I_Fi)]
+    n_Fa = np.cross(X_Fia[:, 1] - X_Fia[:, 0], X_Fia[:, 2] - X_Fia[:, 0])
+    norm_F = np.linalg.norm(n_Fa, axis=-1)
+    n_Fa /= np.where(norm_F > 0, norm_F, 1)[:, np.newaxis]
+    record_F = np.zeros(len(X_Fia), dtype=[('n_a', '<f4', (3,)), ('X_ia', '<f4', (3, 3)), ('attr', '<u2')])
+    record_F['n_a'] = n_Fa
+    record_F['X_ia'] = X_Fia
+    header = header.encode('ascii')[:80].ljust(80, b' ')
+    _write_buffer(path, header + np.uint32(len(record_F)).astype('<u4').tobytes(), record_F)
+
+
+def write_ply_file(path, X_Ia, I_Fi, attributes=None):
+    '''Write the nodes X_Ia and the triangular facets I_Fi as binary PLY file,
+    attributes is a dictionary of per node values (e.g. the displacement
+    magnitude) written as additional vertex properties
+    '''
+    X_Ia, I_Fi = np.asarray(X_Ia), np.asarray(I_Fi)
+    attributes = attributes or {}
+    vertex_dtype = [(name, '<f4') for name in ('x', 'y', 'z')] + [(name, '<f4') for name in attributes]
+    record_I = np.zeros(len(X_Ia), dtype=vertex_dtype)
+    for a, name in enumerate(('x', 'y', 'z')):
+        record_I[name] = X_Ia[:, a]
+    for name, value_I in attributes.items():
+        record_I[name] = value_I
+    record_F = np.zeros(len(I_Fi), dtype=[('n_i', 'u1'), ('I_i', '<i4', (3,))])
+    record_F['n_i'] = 3
+    record_F['I_i'] = I_Fi
+    header = '\n'.join(
+        ['ply', 'format binary_little_endian 1.0', 'comment bmcs_shell',
+         'element vertex %d' % len(record_I)] +
+        ['property float %s' % name for name, _ in vertex_dtype] +
+        ['element face %d' % len(record_F), 'property list uchar int vertex_indices', 'end_header\n'])
+    _write_buffer(path, header.encode('ascii'), record_I, record_F)
+
+
+def write_mesh_frames(path, X_tIa, I_Fi, attributes_t=None, writer=write_ply_file):
+    '''Write the configurations X_tIa of the mesh I_Fi into one file per frame
+    using writer (write_ply_file or write_stl_file). The path contains
+    the format of the frame number, e.g. 'shell_%04d.ply'. attributes_t is
+    a dictionary of per frame and node values passed to write_ply_file.
+    Returns the paths of the written files.
+    '''
+    paths = []
+    for t, X_Ia in enumerate(X_tIa):
+        kw = {}
+        if attributes_t:
+            kw['attributes'] = {name: value_tI[t] for name, value_tI in attributes_t.items()}
+        paths.append(path % t)
+        writer(paths[-1], X_Ia, I_Fi, **kw)
+    return paths
@@ -0,0 +1,77 @@
+'''
+Audit of the rigidity of the facets along a folding path.
+
+Rigid folding preserves the lengths of all facet edges and the sector
+angles at the facet corners. Both are evaluated for all facets and all
+configurations ``g`` of the folding path in one batched computation and
+compared with a reference configuration, typically the first (flat)
+one. The maximum deviations per configuration provide the curves to
+be plotted over the fold angle, the edges and facets exceeding the
+tolerances point to the offending parts of the pattern.
+
+Indices: g - configuration, I - node, a - dimension, F - facet,
+i - facet node (corner), E - edge
+'''
+
+import numpy as np
+
+from bmcs_shell.folding.utils.vector_acos import get_theta
+
+
+def get_facet_edges(I_Fi):
+    '''Unique edges I_Ei (with ascending node numbers) of the facets I_Fi
+    and the edge numbers E_Fi of the facet sides running from the corner i
+    to the corner i + 1.
+    '''
+    I_Fi = np.asarray(I_Fi)
+    I_Fi2 = np.sort(np.stack([I_Fi, np.roll(I_Fi, -1, axis=1)], axis=-1), axis=-1).astype(np.int64)
+    # integer keys of the node pairs are much faster to sort than rows,
+    # int64 as the products of int32 node numbers overflow for large meshes
+    n_I = I_Fi.max(initial=-1) + 1
+    key_E, E_Fi = np.unique(I_Fi2[..., 0] * n_I + I_Fi2[..., 1], return_inverse=True)
+    I_Ei = np.column_stack([key_E // n_I, key_E % n_I]).astype(I_Fi.dtype)
+    return I_Ei, E_Fi.reshape(I_Fi.shape)
+
+
+def get_edge_lengths(X_gIa, I_Ei):
+    '''Lengths L_gE of the edges I_Ei in all configurations X_gIa
+    '''
+    X_gIa = np.asarray(X_gIa, dtype=np.float_)
+    return np.linalg.norm(X_gIa[..., I_Ei[:, 1], :] - X_gIa[..., I_Ei[:, 0], :], axis=-1)
+
+
+def get_sector_angles(X_gIa, I_Fi):
+    '''Sector angles theta_gFi at the corners of the facets I_Fi
+    in all configurations X_gIa
+    '''
+    X_gFia = np.asarray(X_gIa, dtype=np.float_)[..., I_Fi, :]
+    X_0_gFia = X_gFia
+    X_1_gFia = np.roll(X_gFia, -1, axis=-2)
+    X_2_gFia = np.roll(X_gFia, -2, axis=-2)
+    return get_theta(X_1_gFia - X_0_gFia, X_2_gFia - X_0_gFia)
+
+
+def get_rigidity_audit(X_gIa, I_Fi, X_Ia_ref=None, rel_tol=1e-6, angle_tol=1e-6):
+    '''Deviations of the configurations X_gIa of the facets I_Fi from the
+    reference configuration X_Ia_ref (the first configuration by default).
+
+    Returns the maximum relative edge length deviation dL_g and the maximum
+    sector angle deviation dtheta_g for each configuration, the edges I_Ei
+    with a length deviation exceeding rel_tol and the facets F with a sector
+    angle deviation exceeding angle_tol in any configuration. Facets with
+    coincident nodes in the reference configuration (e.g. the skipped cells
+    of WBNumTessellation collapsed to the origin) are not audited.
+    '''
+    X_gIa = np.asarray(X_gIa, dtype=np.float_)
+    I_Fi = np.asarray(I_Fi).reshape(-1, 3)
+    X_Ia_ref = X_gIa[0] if X_Ia_ref is None else np.asarray(X_Ia_ref, dtype=np.float_)
+    X_Fia_ref = X_Ia_ref[I_Fi]
+    F_F = np.where(np.all(np.linalg.norm(np.roll(X_Fia_ref, -1, axis=1) - X_Fia_ref, axis=-1) > 0, axis=1))[0]
+    I_Fi = I_Fi[F_F]
+    I_Ei, _ = get_facet_edges(I_Fi)
+    L_E_ref = get_edge_lengths(X_Ia_ref, I_Ei)
+    dL_gE = np.abs(get_edge_lengths(X_gIa, I_Ei) - L_E_ref) / L_E_ref
+    dtheta_gFi = np.abs(get_sector_angles(X_gIa, I_Fi) - get_sector_angles(X_Ia_ref, I_Fi))
+    dL_E, dtheta_F = np.max(dL_gE, axis=0), np.max(dtheta_gFi, axis=(0, -1))
+    return (np.max(dL_gE, axis=-1, initial=0), np.max(dtheta_gFi, axis=(-2, -1), initial=0),
+            I_Ei[dL_E > rel_tol], F_F[dtheta_F > angle_tol])
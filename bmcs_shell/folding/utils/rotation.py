@@ -0,0 +1,156 @@
+'''
+Rigid rotations of point sets in quaternion and matrix form.
+
+All functions operate in double precision and are vectorized over
+an arbitrary number of rotations and points. Quaternions are stored
+with the components in the first index, i.e. ``q[0]`` is the real
+part ``w`` and ``q[1:]`` is the vector part ``(x, y, z)``, so that
+an array of ``n`` rotations has the shape ``(4, n)``. Vectors and
+points carry their spatial components ``a`` in the last index.
+'''
+
+import numpy as np
+
+
+def v_normalize(v):
+    '''Return unit vectors of an array of vectors ``v[..., a]``.
+    Zero vectors are returned unchanged.
+    '''
+    v = np.asarray(v, dtype=np.float_)
+    norm_v = np.sqrt(np.einsum('...a,...a->...', v, v))
+    norm_v = np.where(norm_v == 0, 1.0, norm_v)
+    return v / norm_v[..., np.newaxis]
+
+
+def q_normalize(q):
+    '''Normalize an array of quaternions ``q[4, ...]``.
+    '''
+    q = np.asarray(q, dtype=np.float_)
+    norm_q = np.sqrt(np.einsum('i...,i...->...', q, q))
+    norm_q = np.where(norm_q == 0, 1.0, norm_q)
+    return q / norm_q
+
+
+def q_mult(q1, q2):
+    '''Hamilton product of two broadcastable arrays of quaternions.
+    '''
+    w1, x1, y1, z1 = q1
+    w2, x2, y2, z2 = q2
+    return np.array([
+        w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+        w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+        w1 * y2 + y1 * w2 + z1 * x2 - x1 * z2,
+        w1 * z2 + z1 * w2 + x1 * y2 - y1 * x2
+    ], dtype=np.float_)
+
+
+def q_conjugate(q):
+    '''Conjugate of the normalized quaternions ``q[4, ...]``.
+    '''
+    w, x, y, z = q_normalize(q)
+    return np.array([w, -x, -y, -z], dtype=np.float_)
+
+
+def axis_angle_to_q(v, theta):
+    '''Unit quaternions ``q[4, n]`` of rotations by the angles
+    ``theta[n]`` around the axes ``v[n, a]``. A single axis
+    ``v[1, a]`` is broadcasted against all angles.
+    '''
+    theta = np.asarray(theta, dtype=np.float_)
+    v_ = v_normalize(v)
+    half_theta = theta / 2
+    sin_theta = np.sin(half_theta)
+    q = np.empty((4,) + np.broadcast(v_[..., 0], theta).shape, dtype=np.float_)
+    q[0] = np.cos(half_theta)
+    q[1:] = np.einsum('...a,...->a...', v_, sin_theta)
+    return q
+
+
+def q_to_axis_angle(q):
+    '''Inverse of :func:`axis_angle_to_q` returning the angles and
+    the unit rotation axes ``v[n, a]``.
+    '''
+    w, v = q[0], q[1:]
+    theta = np.arccos(np.clip(w, -1.0, 1.0)) * 2.0
+    return theta, v_normalize(np.moveaxis(v, 0, -1))
+
+
+def qv_mult(q, u):
+    '''Rotate the points ``u[c, p, a]`` using the quaternions ``q[4, c]``.
+
+    The index ``c`` of the points is broadcasted against the rotations,
+    i.e. a single set of points ``u[1, p, a]`` is rotated by all
+    quaternions. Instead of the two explicit Hamilton products
+    :math:`q u q^*` the equivalent expression
+
+    .. math::
+        u' = u + w t + r \\times t, \\quad t = 2 r \\times u
+
+    with the real part :math:`w` and vector part :math:`r` of
+    the normalized quaternion is evaluated to avoid temporaries.
+    Returns an array ``x[c, p, a]``.
+    '''
+    w, r_x, r_y, r_z = q_normalize(q)[:, :, np.newaxis]
+    u = np.asarray(u, dtype=np.float_)
+    u_x, u_y, u_z = u[..., 0], u[..., 1], u[..., 2]
+    t_x = 2 * (r_y * u_z - r_z * u_y)
+    t_y = 2 * (r_z * u_x - r_x * u_z)
+    t_z = 2 * (r_x * u_y - r_y * u_x)
+    x = np.empty(np.broadcast(w, u_x).shape + (3,), dtype=np.float_)
+    x[..., 0] = u_x + w * t_x + r_y * t_z - r_z * t_y
+    x[..., 1] = u_y + w * t_y + r_z * t_x - r_x * t_z
+    x[..., 2] = u_z + w * t_z + r_x * t_y - r_y * t_x
+    return x
+
+
+def q_to_rot_matrix(q):
+    '''Rotation matrices ``R[..., a, b]`` of the quaternions ``q[4, ...]``.
+    '''
+    w, x, y, z = q_normalize(q)
+    R = np.empty(w.shape + (3, 3), dtype=np.float_)
+    R[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    R[..., 0, 1] = 2 * (x * y - z * w)
+    R[..., 0, 2] = 2 * (x * z + y * w)
+    R[..., 1, 0] = 2 * (x * y + z * w)
+    R[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    R[..., 1, 2] = 2 * (y * z - x * w)
+    R[..., 2, 0] = 2 * (x * z - y * w)
+    R[..., 2, 1] = 2 * (y * z + x * w)
+    R[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return R
+
+
+def axis_angle_to_rot_matrix(v, theta):
+    '''Rotation matrices ``R[..., a, b]`` for the rotations by ``theta[...]``
+    around the axes ``v[..., a]`` given by the Rodrigues formula.
+    '''
+    theta = np.asarray(theta, dtype=np.float_)
+    v_ = v_normalize(v)
+    v_, theta = np.broadcast_arrays(v_, theta[..., np.newaxis])
+    theta = theta[..., 0]
+    c, s = np.cos(theta), np.sin(theta)
+    x, y, z = np.moveaxis(v_, -1, 0)
+    # cross product matrix of the axis
+    K = np.zeros(theta.shape + (3, 3), dtype=np.float_)
+    K[..., 0, 1], K[..., 0, 2] = -z, y
+    K[..., 1, 0], K[..., 1, 2] = z, -x
+    K[..., 2, 0], K[..., 2, 1] = -y, x
+    vv = np.einsum('...a,...b->...ab', v_, v_)
+    delta = np.identity(3)
+    return (c[..., np.newaxis, np.newaxis] * delta +
+            s[..., np.newaxis, np.newaxis] * K +
+            (1 - c)[..., np.newaxis, np.newaxis] * vv)
+
+
+def rotate_points(X_pa, v, theta, X_center_a=None):
+    '''Rotate the points ``X_pa[..., p, a]`` around the axes ``v[c, a]``
+    by the angles ``theta[c]`` about the centers ``X_center_a[c, a]``
+    (origin if not specified). The leading dimensions of the points
+    are broadcasted against the rotations. Returns ``X_cpa[c, p, a]``.
+    '''
+    R_cba = np.swapaxes(axis_angle_to_rot_matrix(v, theta), -1, -2)
+    X_pa = np.asarray(X_pa, dtype=np.float_)
+    if X_center_a is None:
+        return X_pa @ R_cba
+    X_center_a = np.asarray(X_center_a, dtype=np.float_)[..., np.newaxis, :]
+    return (X_pa - X_center_a) @ R_cba + X_center_a
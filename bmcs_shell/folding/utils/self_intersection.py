@@ -0,0 +1,195 @@
+'''
+Self-intersection check of triangulated facet meshes ``(X_Ia, I_Fi)``
+along a folding trajectory.
+
+The facet triangles are organized in a bounding volume hierarchy (BVH)
+of axis aligned boxes. The tree is built once from the Morton order of
+the facet centroids and stored as a complete binary tree with
+``leaf_size`` facets per leaf, so that its boxes can be refitted for
+every new configuration of the nodes by a few vectorized reductions
+without rebuilding it. The tree is traversed level by level for all
+pairs of boxes at once, facets sharing an edge are excluded and the
+remaining candidate pairs are checked by vectorized triangle-triangle
+tests. The facets sharing a single node are tested without it, so that
+only their opposite edges can penetrate the other facet.
+
+Indices: I - node, a - dimension, F - facet, i - facet node,
+m - candidate facet pair, l - leaf, s - facet slot in the leaves
+'''
+
+import numpy as np
+
+
+def _get_morton_codes(X_Fa, n_bits=10):
+    '''Morton codes of the points X_Fa quantized to n_bits per dimension
+    '''
+    X_min_a, X_max_a = np.min(X_Fa, axis=0), np.max(X_Fa, axis=0)
+    L_a = np.where(X_max_a > X_min_a, X_max_a - X_min_a, 1.0)
+    q_Fa = ((X_Fa - X_min_a) / L_a * (2 ** n_bits - 1)).astype(np.int64)
+    code_F = np.zeros(len(X_Fa), dtype=np.int64)
+    for bit in range(n_bits):
+        for a in range(3):
+            code_F |= ((q_Fa[:, a] >> bit) & 1) << (3 * bit + a)
+    return code_F
+
+
+def _boxes_overlap(min_1a, max_1a, min_2a, max_2a):
+    return np.all((min_1a <= max_2a) & (min_2a <= max_1a), axis=-1)
+
+
+def _edges_pierce_triangles(X_mia, Y_mia, tol_m):
+    '''Flags whether an edge of the triangles X_mia crosses the interior
+    of the triangles Y_mia. Contacts within the distance tol_m (touching
+    vertices and edges, coplanar triangles) are not reported.
+    '''
+    Y_0a, Y_1a, Y_2a = Y_mia[:, 0], Y_mia[:, 1], Y_mia[:, 2]
+    n_ma = np.cross(Y_1a - Y_0a, Y_2a - Y_0a)
+    norm_n_m = np.linalg.norm(n_ma, axis=-1)
+    norm_n_m[norm_n_m == 0] = np.inf  # degenerate triangles cannot be pierced
+    n_ma = n_ma / norm_n_m[:, np.newaxis]
+    # signed distances of the edge ends from the plane of the triangle
+    d_mi = np.einsum('mia,ma->mi', X_mia - Y_0a[:, np.newaxis], n_ma)
+    d_P_mi, d_Q_mi = d_mi, np.roll(d_mi, -1, axis=1)
+    tol_mi = tol_m[:, np.newaxis]
+    crossing_mi = (((d_P_mi > tol_mi) & (d_Q_mi < -tol_mi)) |
+                   ((d_P_mi < -tol_mi) & (d_Q_mi > tol_mi)))
+    # crossing points of the edges with the plane
+    t_mi = np.where(crossing_mi, d_P_mi / np.where(crossing_mi, d_P_mi - d_Q_mi, 1), 0)
+    X_P_mia = X_mia
+    X_Q_mia = np.roll(X_mia, -1, axis=1)
+    X_c_mia = X_P_mia + t_mi[..., np.newaxis] * (X_Q_mia - X_P_mia)
+    # in-plane distances of the crossing points from the edges of the triangle
+    inside_mi = crossing_mi
+    for k in range(3):
+        Y_ka, Y_la = Y_mia[:, k], Y_mia[:, (k + 1) % 3]
+        e_ma = Y_la - Y_ka
+        norm_e_m = np.linalg.norm(e_ma, axis=-1)
+        norm_e_m[norm_e_m == 0] = np.inf
+        w_mi = np.einsum('mia,ma->mi', np.cross(e_ma[:, np.newaxis], X_c_mia - Y_ka[:, np.newaxis]),
+                         n_ma) / norm_e_m[:, np.newaxis]
+        inside_mi = inside_mi & (w_mi > tol_mi)
+    return np.any(inside_mi, axis=1)
+
+
+def get_triangles_intersect(X_mia, Y_mia, rel_tol=1e-6):
+    '''Vectorized intersection test of the pairs of triangles X_mia, Y_mia.
+    Two triangles penetrate each other if an edge of one of them crosses the
+    interior of the other one. Contacts closer than rel_tol times the longest
+    edge of the pair are considered as touching and not reported.
+    '''
+    X_mia = np.asarray(X_mia, dtype=np.float_)
+    Y_mia = np.asarray(Y_mia, dtype=np.float_)
+    L_mi = np.concatenate([np.linalg.norm(np.roll(X_mia, -1, axis=1) - X_mia, axis=-1),
+                           np.linalg.norm(np.roll(Y_mia, -1, axis=1) - Y_mia, axis=-1)], axis=1)
+    tol_m = rel_tol * np.max(L_mi, axis=1, initial=0)
+    return (_edges_pierce_triangles(X_mia, Y_mia, tol_m) |
+            _edges_pierce_triangles(Y_mia, X_mia, tol_m))
+
+
+class FacetBVH:
+    '''Bounding volume hierarchy of the facets I_Fi of a mesh with fixed
+    topology. The tree is built for the nodal coordinates X_Ia and refitted
+    to the new coordinates of the nodes by refit(X_Ia).
+    '''
+
+    def __init__(self, X_Ia, I_Fi, leaf_size=4):
+        self.I_Fi = np.asarray(I_Fi).reshape(-1, 3)
+        self.leaf_size = int(leaf_size)
+        n_F = len(self.I_Fi)
+        n_leaves = 1
+        while n_leaves * self.leaf_size < n_F:
+            n_leaves *= 2
+        # facets in the leaf slots in Morton order, padded with -1
+        X_Fa = np.asarray(X_Ia, dtype=np.float_)[self.I_Fi].mean(axis=1)
+        self.F_s = np.full(n_leaves * self.leaf_size, -1, dtype=np.int_)
+        if n_F:
+            self.F_s[:n_F] = np.argsort(_get_morton_codes(X_Fa), kind='stable')
+        self.refit(X_Ia)
+
+    def refit(self, X_Ia):
+        '''Update the boxes of the facets and of all tree levels (root first)
+        for the nodal coordinates X_Ia.
+        '''
+        self.X_Ia = np.asarray(X_Ia, dtype=np.float_)
+        X_Fia = self.X_Ia[self.I_Fi]
+        self.min_Fa, self.max_Fa = np.min(X_Fia, axis=1), np.max(X_Fia, axis=1)
+        valid_s = self.F_s >= 0
+        min_sa = np.where(valid_s[:, np.newaxis], self.min_Fa[self.F_s], np.inf)
+        max_sa = np.where(valid_s[:, np.newaxis], self.max_Fa[self.F_s], -np.inf)
+        min_la = np.min(min_sa.reshape(-1, self.leaf_size, 3), axis=1)
+        max_la = np.max(max_sa.reshape(-1, self.leaf_size, 3), axis=1)
+        boxes = [(min_la, max_la)]
+        while len(boxes[0][0]) > 1:
+            min_la, max_la = boxes[0]
+            boxes.insert(0, (np.min(min_la.reshape(-1, 2, 3), axis=1),
+                             np.max(max_la.reshape(-1, 2, 3), axis=1)))
+        self.boxes = boxes
+        return self
+
+    def get_candidate_pairs(self):
+        '''Pairs of facets F_m2 (F_m0 < F_m1) with overlapping boxes
+        that do not share an edge
+        '''
+        pairs_m2 = np.zeros((1, 2), dtype=np.int_)
+        child_k2 = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+        for min_na, max_na in self.boxes[1:]:
+            pairs_m2 = (2 * pairs_m2[:, np.newaxis, :] + child_k2).reshape(-1, 2)
+            pairs_m2 = pairs_m2[pairs_m2[:, 0] <= pairs_m2[:, 1]]
+            i_m, j_m = pairs_m2.T
+            pairs_m2 = pairs_m2[_boxes_overlap(min_na[i_m], max_na[i_m], min_na[j_m], max_na[j_m])]
+        # facet slots of the overlapping leaves
+        l_1m, l_2m = pairs_m2.T
+        ls = self.leaf_size
+        s_k = np.arange(ls)
+        s_1m = (l_1m[:, np.newaxis, np.newaxis] * ls + s_k[:, np.newaxis]).repeat(ls, axis=2).ravel()
+        s_2m = (l_2m[:, np.newaxis, np.newaxis] * ls + s_k[np.newaxis, :]).repeat(ls, axis=1).ravel()
+        F_1m, F_2m = self.F_s[s_1m], self.F_s[s_2m]
+        keep_m = (F_1m >= 0) & (F_2m >= 0) & (s_1m < s_2m)
+        F_1m, F_2m = F_1m[keep_m], F_2m[keep_m]
+        keep_m = _boxes_overlap(self.min_Fa[F_1m], self.max_Fa[F_1m], self.min_Fa[F_2m], self.max_Fa[F_2m])
+        F_1m, F_2m = F_1m[keep_m], F_2m[keep_m]
+        # exclude the adjacent facets sharing an edge
+        I_1mi, I_2mi = self.I_Fi[F_1m], self.I_Fi[F_2m]
+        adjacent_m = np.sum(I_1mi[:, :, np.newaxis] == I_2mi[:, np.newaxis, :], axis=(1, 2)) > 1
+        F_m2 = np.sort(np.column_stack([F_1m, F_2m])[~adjacent_m], axis=1)
+        return F_m2.reshape(-1, 2)
+
+    def get_intersecting_pairs(self, X_Ia=None, rel_tol=1e-6):
+        '''Pairs of penetrating facets F_m2 for the nodal coordinates X_Ia
+        (refitting the tree) or the current state of the tree
+        '''
+        if X_Ia is not None:
+            self.refit(X_Ia)
+        F_m2 = self.get_candidate_pairs()
+        X_Fia = self.X_Ia[self.I_Fi]
+        X_1mia, X_2mia = X_Fia[F_m2[:, 0]], X_Fia[F_m2[:, 1]]
+        # the node shared by a pair is moved to the first position of both
+        # facets, it lies exactly in the plane of the other facet and its
+        # edges cannot cross it
+        I_1mi, I_2mi = self.I_Fi[F_m2[:, 0]], self.I_Fi[F_m2[:, 1]]
+        m, i, j = np.nonzero(I_1mi[:, :, np.newaxis] == I_2mi[:, np.newaxis, :])
+        k_3 = np.arange(3)
+        X_1mia[m] = X_1mia[m[:, np.newaxis], (i[:, np.newaxis] + k_3) % 3]
+        X_2mia[m] = X_2mia[m[:, np.newaxis], (j[:, np.newaxis] + k_3) % 3]
+        intersect_m = get_triangles_intersect(X_1mia, X_2mia, rel_tol)
+        F_m2 = F_m2[intersect_m]
+        return F_m2[np.lexsort((F_m2[:, 1], F_m2[:, 0]))]
+
+
+def get_first_self_intersection(get_X_Ia, I_Fi, gamma_range, leaf_size=4, rel_tol=1e-6):
+    '''Sweep the folding trajectory given by the function get_X_Ia(gamma)
+    over the fold angles gamma_range for the mesh with the fixed facets I_Fi.
+    The bounding volume hierarchy is built for the first configuration and
+    refitted for the following ones. Returns the first fold angle with
+    penetrating facets and the pairs of these facets F_m2, or
+    (None, empty F_m2) if the mesh does not penetrate itself.
+    '''
+    bvh = None
+    for gamma in gamma_range:
+        X_Ia = get_X_Ia(gamma)
+        if bvh is None:
+            bvh = FacetBVH(X_Ia, I_Fi, leaf_size)
+        F_m2 = bvh.get_intersecting_pairs(X_Ia, rel_tol)
+        if len(F_m2):
+            return gamma, F_m2
+    return None, np.zeros((0, 2), dtype=np.int_)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from bmcs_shell.folding.analysis.wb_shell_adaptive_analysis import WBShellAdaptiveAnalysis
+from bmcs_shell.folding.analysis.wb_shell_analysis import WBShellAnalysis
+from bmcs_shell.folding.analysis.wb_shell_linear_analysis import WBShellLinearAnalysis
+from bmcs_shell.folding.analysis.wb_shell_substructured_analysis import WBShellSubstructuredAnalysis
+from bmcs_shell.folding.analysis.wb_shell_super_element_analysis import WBShellSuperElementAnalysis
+from bmcs_shell.folding.analysis.wb_shell_symmetric_analysis import WBShellSymmetricAnalysis
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+
+@pytest.fixture(scope='module')
+def analysis():
+    '''Shell supported at all boundary nodes, which removes the folding
+    mechanism of the membrane model, and loaded at its highest nodes'''
+    analysis = WBShellAnalysis()
+    analysis.geo.trait_set(n_phi_plus=3, n_x_plus=3)
+    geo = analysis.geo
+    I_Ei, E_Fi = get_facet_edges(geo.I_Fi)
+    fixed_nodes = np.unique(I_Ei[np.bincount(E_Fi.ravel()) == 1])
+    z_I = geo.X_Ia[:, 2]
+    loaded_nodes = np.where(z_I > np.max(z_I) - 1e-6)[0]
+    analysis.bcs.bc_fixed_array = np.array([[I, 0, 0, 0] for I in fixed_nodes], dtype=np.float_)
+    analysis.bcs.bc_loaded_array = np.array([[I, np.nan, np.nan, -1000] for I in loaded_nodes],
+                                            dtype=np.float_)
+    return analysis
+
+
+@pytest.mark.parametrize('cls, rtol', [(WBShellSubstructuredAnalysis, 1e-12),
+                                       (WBShellSuperElementAnalysis, 1e-12),
+                                       (WBShellSymmetricAnalysis, 1e-12),
+                                       (WBShellAdaptiveAnalysis, 1e-7)])
+def test_same_solution(analysis, cls, rtol):
+    U_ref = WBShellLinearAnalysis(analysis=analysis).run()
+    derived = cls(analysis=analysis)
+    if isinstance(derived, WBShellAdaptiveAnalysis):
+        derived.max_steps = 1
+    derived.run()
+    assert np.max(np.abs(derived.U_o - U_ref)) <= rtol * np.max(np.abs(U_ref))
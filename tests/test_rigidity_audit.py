@@ -0,0 +1,23 @@
+import numpy as np
+
+from bmcs_shell.folding.utils.rigidity_audit import get_facet_edges
+
+# triangulated grid of n x n nodes, more than 46341 nodes make the products
+# of the int32 node numbers overflow
+n = 220
+I_0 = (np.arange(n - 1)[:, np.newaxis] * n + np.arange(n - 1)).ravel()
+I_Fi = np.vstack([np.column_stack([I_0, I_0 + 1, I_0 + n + 1]),
+                  np.column_stack([I_0, I_0 + n + 1, I_0 + n])])
+
+
+def test_facet_edges_int32():
+    assert n * n > 46341
+    I_Ei, E_Fi = get_facet_edges(I_Fi.astype(np.int32))
+    I64_Ei, E64_Fi = get_facet_edges(I_Fi.astype(np.int64))
+    assert I_Ei.dtype == np.int32
+    assert np.array_equal(I_Ei, I64_Ei)
+    assert np.array_equal(E_Fi, E64_Fi)
+    assert len(I_Ei) == 3 * (n - 1) ** 2 + 2 * (n - 1)
+    # the edges reproduce the facet sides
+    I_Fi2 = np.sort(np.stack([I_Fi, np.roll(I_Fi, -1, axis=1)], axis=-1), axis=-1)
+    assert np.array_equal(I_Ei[E_Fi], I_Fi2)
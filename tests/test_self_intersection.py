@@ -0,0 +1,26 @@
+import numpy as np
+
+from bmcs_shell.folding.utils.self_intersection import FacetBVH, get_triangles_intersect
+
+# two facets sharing the node 0, the edge 3-4 of the second one pierces the first one
+X_Ia = np.array([[0, 0, 0], [2, -1, 0], [2, 1, 0], [1, 0, -1], [1.5, 0, 1]], dtype=np.float_)
+I_Fi = np.array([[0, 1, 2], [0, 3, 4]])
+
+
+def test_vertex_fan_penetration():
+    assert get_triangles_intersect(X_Ia[I_Fi[:1]], X_Ia[I_Fi[1:]])[0]
+    F_m2 = FacetBVH(X_Ia, I_Fi).get_intersecting_pairs()
+    assert F_m2.tolist() == [[0, 1]]
+
+
+def test_vertex_fan_touching():
+    # the second facet folded above the first one only touches it in the shared node
+    X_touch_Ia = np.copy(X_Ia)
+    X_touch_Ia[3, 2] = 0.5
+    F_m2 = FacetBVH(X_touch_Ia, I_Fi).get_intersecting_pairs()
+    assert len(F_m2) == 0
+
+
+def test_edge_neighbours_excluded():
+    I_edge_Fi = np.array([[0, 1, 2], [0, 2, 4]])
+    assert len(FacetBVH(X_Ia, I_edge_Fi).get_candidate_pairs()) == 0
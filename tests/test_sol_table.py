@@ -0,0 +1,24 @@
+import numpy as np
+
+from bmcs_shell.folding.geometry.wb_tessellation.wb_sol_table import WBSolTable, get_stencil_cells
+
+
+def test_stencil_cells():
+    missing = np.zeros((7, 6), dtype=np.bool_)
+    missing[3, 0] = True
+    cells = get_stencil_cells(missing, 2)
+    assert cells.shape == (6, 5)
+    # cubic stencil of the cell i spans the samples i - 1 ... i + 2
+    assert np.array_equal(np.where(cells.any(axis=1))[0], [1, 2, 3, 4])
+    assert np.array_equal(np.where(cells.any(axis=0))[0], [0, 1])
+    assert np.array_equal(np.where(get_stencil_cells(missing, 1).any(axis=1))[0], [2, 3])
+
+
+def test_missing_samples_in_err_grid():
+    axes = [np.linspace(0, 1, 7), np.linspace(0, 1, 6)]
+    sol_grid = np.zeros((7, 6, 2))
+    sol_grid[3, 0, 1] = np.nan
+    table = WBSolTable(['gamma', 'eta'], axes, sol_grid, np.zeros((6, 5)))
+    assert np.array_equal(np.isinf(table.err_grid), get_stencil_cells(np.isnan(sol_grid[..., 1]), 2))
+    _, err_n = table.interpolate([[0.5, 0.05], [0.5, 0.95], [0.05, 0.05]])
+    assert err_n.tolist() == [np.inf, 0, 0]